@@ -0,0 +1,266 @@
+"""
+[신규] 의미 기반 답변 캐시 (워커 메모리 벡터 인덱스 + Redis 미러)
+
+같은 뜻의 질문("아동수당 어떻게 받아요?" / "아동수당 신청 방법")은 검색 → 랭킹 → 번역을 다시 할 필요가 없습니다.
+process_job이 질문 임베딩을 만든 직후 최근 답변의 질문 임베딩과 비교해, 기준 이상이면 저장된 답변을 바로 반환합니다.
+
+- 메모리: 정규화된 임베딩 행렬(최대 SEMANTIC_CACHE_MAX_ENTRIES행) → 내적 1번으로 코사인 유사도 계산
+  (수천 건 규모에서는 근사 인덱스보다 정확하고 충분히 빠름)
+- 같은 답변 조건(언어 + 나이/대상/검색어)인 항목끼리만 비교 (요청 병합 키와 같은 필드: COALESCE_CONTEXT_FIELDS)
+- 만료(TTL) 항목 제외, 가득 차면 가장 오래 안 쓴 항목(LRU)부터 교체
+- Redis: sem:v2:entry:{id} (TTL) + sem:v2:page:{page_id} 집합 → 재시작/다른 워커가 이어받고,
+  인덱서가 바뀐 페이지를 참조한 항목을 삭제 (invalidate_answer_pages)
+- 워커는 인덱스 버전이 바뀌면 Redis에서 사라진 항목을 메모리에서도 제거
+"""
+
+import os
+import json
+import time
+import uuid
+import base64
+import threading
+from typing import Optional, List, Dict, Any, Callable, Iterable
+
+import numpy as np
+
+from coalescing import COALESCE_CONTEXT_FIELDS
+
+SEMANTIC_CACHE_ENABLED = os.getenv("SEMANTIC_CACHE", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "2000"))
+SEMANTIC_CACHE_TTL_SECONDS = int(os.getenv("SEMANTIC_CACHE_TTL_SECONDS", str(12 * 3600)))
+
+# [수정] 답변 조건(context) 형식이 바뀌면 버전을 올려 이전 형식으로 저장된 항목을 쓰지 않음 (이전 키는 TTL로 정리)
+SEM_KEY_VERSION = "v2"
+SEM_ENTRY_PREFIX = f"sem:{SEM_KEY_VERSION}:entry:"
+SEM_PAGE_PREFIX = f"sem:{SEM_KEY_VERSION}:page:"
+
+# 인덱스 버전 확인 주기 (초)
+VERSION_CHECK_SECONDS = 30.0
+
+
+def answer_context(lang: str, extracted_info: Optional[Dict[str, Any]]) -> str:
+    """
+    같은 질문이라도 답변이 달라지는 조건 (답변 언어 + 나이/대상/검색어)
+    [수정] 나이만 보면 "아동수당 신청" / "양육수당 신청"처럼 가까운 질문이 다른 사업의 답변을 받을 수 있어
+    워커 검색 결과를 바꾸는 필드(요청 병합 키와 동일)를 모두 포함
+    """
+    info = extracted_info or {}
+    context = {k: info.get(k) for k in COALESCE_CONTEXT_FIELDS}
+    return f"{lang}|{json.dumps(context, ensure_ascii=False, sort_keys=True)}"
+
+
+def _normalize(embedding) -> Optional[np.ndarray]:
+    vec = np.asarray(embedding, dtype=np.float32)
+    norm = float(np.linalg.norm(vec))
+    if vec.ndim != 1 or norm == 0.0:
+        return None
+    return vec / norm
+
+
+class SemanticAnswerCache:
+    L2_RETRY_AFTER = 30.0
+
+    def __init__(self, redis_conn, version_fn: Optional[Callable[[], Optional[str]]] = None,
+                 threshold: float = SEMANTIC_CACHE_THRESHOLD, max_entries: int = SEMANTIC_CACHE_MAX_ENTRIES,
+                 ttl: int = SEMANTIC_CACHE_TTL_SECONDS):
+        self.redis = redis_conn
+        self.version_fn = version_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._matrix: Optional[np.ndarray] = None   # (max_entries, dim), 빈 슬롯은 0
+        self._slots: List[Optional[Dict[str, Any]]] = [None] * max_entries
+        self._by_id: Dict[str, int] = {}
+        self._warmed = False
+        self._version = None
+        self._version_checked = 0.0
+        self._l2_skip_until = 0.0
+        self.stats = dict.fromkeys(("hits", "misses", "stores", "evictions", "invalidated", "l2_errors"), 0)
+
+    # --- Redis 미러 ---
+    def _l2_available(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._l2_skip_until
+
+    def _l2_failed(self, e: Exception):
+        self.stats["l2_errors"] += 1
+        self._l2_skip_until = time.monotonic() + self.L2_RETRY_AFTER
+        print(f"⚠️ [AnswerCache] Redis 오류 → {self.L2_RETRY_AFTER:.0f}초간 메모리만 사용: {e}")
+
+    def _warm(self):
+        """첫 조회 시 Redis에 남아 있는 항목을 메모리로 적재 (최근 저장 순)"""
+        self._warmed = True
+        if not self._l2_available():
+            return
+        try:
+            keys = list(self.redis.scan_iter(match=SEM_ENTRY_PREFIX + "*", count=500))
+            raws = self.redis.mget(keys) if keys else []
+            entries = [json.loads(raw) for raw in raws if raw]
+        except Exception as e:
+            self._l2_failed(e)
+            return
+        entries.sort(key=lambda entry: entry["created_at"])
+        for entry in entries[-self.max_entries:]:
+            vec = np.frombuffer(base64.b64decode(entry.pop("embedding")), dtype=np.float32)
+            self._insert_locked(entry, vec)
+        if entries:
+            print(f"♻️ [AnswerCache] Redis에서 {min(len(entries), self.max_entries)}건 적재")
+
+    def _check_version(self):
+        """인덱스 버전이 바뀌면 인덱서가 삭제한 항목(Redis에 없는 키)을 메모리에서도 제거"""
+        now = time.monotonic()
+        if self.version_fn is None or now - self._version_checked < VERSION_CHECK_SECONDS:
+            return
+        self._version_checked = now
+        try:
+            version = self.version_fn()
+        except Exception:
+            return
+        if version == self._version:
+            return
+        first_check = self._version is None
+        self._version = version
+        if first_check or not self._by_id or not self._l2_available():
+            return
+        ids = list(self._by_id)
+        try:
+            pipe = self.redis.pipeline()
+            for entry_id in ids:
+                pipe.exists(SEM_ENTRY_PREFIX + entry_id)
+            exists = pipe.execute()
+        except Exception as e:
+            self._l2_failed(e)
+            return
+        removed = [entry_id for entry_id, ok in zip(ids, exists) if not ok]
+        for entry_id in removed:
+            self._remove_locked(entry_id)
+        if removed:
+            self.stats["invalidated"] += len(removed)
+            print(f"🧹 [AnswerCache] 인덱스 버전 변경 → 무효화된 답변 {len(removed)}건 제거")
+
+    # --- 메모리 인덱스 ---
+    def _remove_locked(self, entry_id: str):
+        slot = self._by_id.pop(entry_id, None)
+        if slot is not None:
+            self._slots[slot] = None
+            self._matrix[slot] = 0.0
+
+    def _insert_locked(self, entry: Dict[str, Any], vec: np.ndarray) -> bool:
+        if self._matrix is None:
+            self._matrix = np.zeros((self.max_entries, vec.shape[0]), dtype=np.float32)
+        elif self._matrix.shape[1] != vec.shape[0]:
+            return False  # 임베딩 모델이 바뀐 경우 (차원 불일치)
+
+        now = time.time()
+        free = [i for i, e in enumerate(self._slots) if e is None or e["created_at"] + self.ttl < now]
+        if free:
+            slot = free[0]
+        else:
+            slot = min(range(self.max_entries), key=lambda i: self._slots[i]["last_used"])
+            self.stats["evictions"] += 1
+        old = self._slots[slot]
+        if old is not None:
+            self._by_id.pop(old["id"], None)
+        entry.setdefault("last_used", entry["created_at"])
+        self._slots[slot] = entry
+        self._matrix[slot] = vec
+        self._by_id[entry["id"]] = slot
+        return True
+
+    def lookup(self, embedding, context: str) -> Optional[Dict[str, Any]]:
+        """유사도가 기준 이상인 같은 조건의 답변 (answer, page_ids, similarity) 또는 None"""
+        vec = _normalize(embedding)
+        if vec is None:
+            return None
+        with self._lock:
+            if not self._warmed:
+                self._warm()
+            self._check_version()
+            if self._matrix is None or self._matrix.shape[1] != vec.shape[0] or not self._by_id:
+                self.stats["misses"] += 1
+                return None
+            sims = self._matrix @ vec
+            now = time.time()
+            for slot in np.argsort(-sims):
+                similarity = float(sims[slot])
+                if similarity < self.threshold:
+                    break
+                entry = self._slots[slot]
+                if entry is None or entry["context"] != context or entry["created_at"] + self.ttl < now:
+                    continue
+                entry["last_used"] = now
+                self.stats["hits"] += 1
+                return {"answer": entry["answer"], "page_ids": list(entry["page_ids"]),
+                        "similarity": similarity, "question": entry.get("question")}
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, embedding, context: str, question: str, answer: str, page_ids: List[str]):
+        vec = _normalize(embedding)
+        if vec is None:
+            return
+        entry = {
+            "id": uuid.uuid4().hex, "context": context, "question": question, "answer": answer,
+            "page_ids": [p for p in page_ids if p], "created_at": time.time(),
+        }
+        with self._lock:
+            if not self._insert_locked(dict(entry), vec):
+                return
+            self.stats["stores"] += 1
+        if not self._l2_available():
+            return
+        try:
+            key = SEM_ENTRY_PREFIX + entry["id"]
+            entry["embedding"] = base64.b64encode(vec.tobytes()).decode("ascii")
+            pipe = self.redis.pipeline()
+            pipe.set(key, json.dumps(entry, ensure_ascii=False), ex=self.ttl)
+            for page_id in entry["page_ids"]:
+                pipe.sadd(SEM_PAGE_PREFIX + page_id, key)
+                pipe.expire(SEM_PAGE_PREFIX + page_id, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            self._l2_failed(e)
+
+    def invalidate_pages(self, page_ids: Iterable[str]) -> int:
+        """이 프로세스 메모리에서 해당 페이지를 참조하는 답변 제거"""
+        targets = set(page_ids)
+        with self._lock:
+            removed = [eid for eid, slot in self._by_id.items() if targets & set(self._slots[slot]["page_ids"])]
+            for entry_id in removed:
+                self._remove_locked(entry_id)
+            self.stats["invalidated"] += len(removed)
+        return len(removed)
+
+    def clear(self):
+        with self._lock:
+            self._slots = [None] * self.max_entries
+            self._by_id.clear()
+            self._matrix = None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, size=len(self._by_id), max_entries=self.max_entries, threshold=self.threshold)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+        return stats
+
+
+def invalidate_answer_pages(redis_conn, page_ids: Iterable[str]) -> int:
+    """[인덱서] 바뀌거나 삭제된 페이지를 참조한 답변 캐시 삭제 (삭제한 항목 수)"""
+    page_ids = [p for p in page_ids if p]
+    if redis_conn is None or not page_ids:
+        return 0
+    try:
+        set_keys = [SEM_PAGE_PREFIX + p for p in page_ids]
+        entry_keys = set()
+        for set_key in set_keys:
+            entry_keys.update(redis_conn.smembers(set_key))
+        if entry_keys:
+            redis_conn.delete(*entry_keys)
+        redis_conn.delete(*set_keys)
+        print(f"🧹 [AnswerCache] 변경 페이지 {len(page_ids)}건 → 답변 캐시 {len(entry_keys)}건 삭제")
+        return len(entry_keys)
+    except Exception as e:
+        print(f"⚠️ [AnswerCache] 무효화 실패 (TTL 후 정리됨): {e}")
+        return 0
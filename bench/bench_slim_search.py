@@ -0,0 +1,180 @@
+"""
+[벤치마크] 전체 행 검색 vs 슬림 검색 + 표시 결과만 조회 (SEARCH_SLIM)
+
+워커가 한 질문에 받는 후보(1차 15건 + 2차 20건)의 전송량과 처리 시간을 비교합니다.
+- 기본: 인덱서와 같은 모양의 합성 site_pages(다국어 제목/요약 8개 필드, 본문 수천 자)로
+  검색 → 중복 제거 → 로컬 랭킹 → (슬림: 표시 2건 조회) → 카드 포맷까지 측정
+  + 후보 전송량(JSON 바이트)과 응답 파싱 시간
+  + RPC 경로 추정: 왕복 지연(--rtt-ms)과 대역폭(--mbps) 기준 (슬림은 표시 2건 조회 왕복 1회 추가)
+- --live: 실제 Supabase에서 hybrid_search_v3 / hybrid_search_slim RPC 응답 크기와 지연 비교
+          (SUPABASE_URL/SUPABASE_KEY, GEMINI_API_KEYS 필요, sql/hybrid_search_slim.sql 적용 후)
+
+사용법: python -m bench.bench_slim_search [--docs 400] [--queries 200] [--lang en] [--rtt-ms 30] [--mbps 50] [--live]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import VectorIndex
+from local_rerank import rank_locally, DISPLAY_COUNT
+
+CATEGORIES = ["의료/재활", "교육/보육", "가족 지원", "돌봄/양육", "생활 지원"]
+WORDS = ["아동수당", "바우처", "발달", "검사", "치료", "돌봄", "보육료", "상담", "기저귀", "교통비", "장애", "다문화"]
+SUMMARY = "**지원 내용**\n• 월 10만원 지원\n**대상**\n• 만 8세 미만 아동\n**신청 방법**\n• 주민센터 방문 또는 복지로 온라인 신청\n"
+LIVE_QUESTIONS = ["아동수당 신청 방법", "발달 검사 받을 수 있는 곳", "장애아동 재활 치료 바우처", "어린이집 보육료 지원"]
+
+
+def percentiles(samples_ms: list) -> str:
+    p50, p95 = np.percentile(samples_ms, [50, 95])
+    return f"p50 {p50:.2f}ms / p95 {p95:.2f}ms"
+
+
+def synthetic_rows(n_docs: int, dim: int, rng, centers) -> list:
+    """run_indexer와 같은 metadata 모양 (요약/번역 길이는 실제 카드 수준)"""
+    rows = []
+    for i in range(n_docs):
+        words = rng.choice(WORDS, size=3, replace=False)
+        title = f"{words[0]} {words[1]} 사업"
+        rows.append({
+            "id": f"page{i}_0",
+            "page_id": f"page{i}",
+            "content": f"사업명: {title}\n" + (" ".join(words) + " 지원 대상 및 신청 방법 안내. ") * 60,
+            "metadata": {
+                "page_id": f"page{i}", "category": CATEGORIES[i % len(CATEGORIES)],
+                "sub_category_list": ["영유아", "장애"], "start_age": int(rng.integers(0, 36)),
+                "end_age": int(rng.integers(36, 96)), "title": title,
+                "page_url": f"https://www.notion.so/page{i}", "pre_summary": SUMMARY * 3,
+                "title_en": f"{title} (EN)", "pre_summary_en": "**Support Content**\n• Monthly support\n" * 8,
+                "title_zh": f"{title} (ZH)", "pre_summary_zh": "**支持内容**\n• 每月支持\n" * 10,
+                "title_vi": f"{title} (VI)", "pre_summary_vi": "**Nội dung hỗ trợ**\n• Hỗ trợ hàng tháng\n" * 8,
+            },
+            "embedding": (centers[i % len(centers)] + 0.8 * rng.standard_normal(dim)).astype(np.float32).tolist(),
+        })
+    return rows
+
+
+def _candidates(index: VectorIndex, query, keywords: list, slim: bool) -> list:
+    """search_supabase와 같은 2단계 검색 (1차 카테고리 15건 + 2차 전체 20건, 중복 id 제외)"""
+    text = " ".join(keywords)
+    rows = index.search(query, 0.45, 15, CATEGORIES[0], keywords, query_text=text, slim=slim)
+    seen = {r["id"] for r in rows}
+    rows += [r for r in index.search(query, 0.4, 20, None, keywords, query_text=text, slim=slim) if r["id"] not in seen]
+    return rows
+
+
+def _dedupe(rows: list) -> list:
+    seen, unique = set(), []
+    for doc in rows:
+        pid = doc["metadata"].get("page_id")
+        if pid not in seen:
+            seen.add(pid)
+            unique.append(doc)
+    return unique
+
+
+def _transfer_ms(n_bytes: int, mbps: float) -> float:
+    return n_bytes * 8 / (mbps * 1_000_000) * 1000
+
+
+def bench_synthetic(n_docs: int, n_queries: int, lang: str, rtt_ms: float, mbps: float, dim: int = 768):
+    import utils  # hydrate_display_results / format_search_results (Redis/Supabase 연결 시도가 있어 지연 import)
+
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((12, dim)).astype(np.float32)
+    index = VectorIndex(lambda: synthetic_rows(n_docs, dim, rng, centers), name="synthetic")
+    index.load()
+    utils.SEARCH_INDEX = index  # 표시 메타데이터를 합성 인덱스에서 조회
+
+    queries = centers[rng.integers(0, len(centers), n_queries)] + 0.8 * rng.standard_normal((n_queries, dim)).astype(np.float32)
+    report = {}
+    for slim in (False, True):
+        payload, hydrate_payload, parse_ms, pipeline_ms, counts = [], [], [], [], []
+        for i, query in enumerate(queries):
+            keywords = [WORDS[i % len(WORDS)], WORDS[(i + 3) % len(WORDS)]]
+            start = time.perf_counter()
+            rows = _candidates(index, query, keywords, slim)
+            body = json.dumps(rows, ensure_ascii=False).encode("utf-8")
+            parse_start = time.perf_counter()
+            rows = json.loads(body)  # RPC 응답 파싱 비용 (로컬 인덱스 경로에는 없음)
+            parse_ms.append((time.perf_counter() - parse_start) * 1000)
+
+            ranked = rank_locally(" ".join(keywords), _dedupe(rows), {"category": CATEGORIES[0]}).ranked
+            display = ranked[:DISPLAY_COUNT]
+            if slim:
+                display = utils.hydrate_display_results(display, lang)
+                fields = utils.fetch_display_metadata([d["metadata"]["page_id"] for d in display], lang)
+                hydrate_payload.append(len(json.dumps(list(fields.values()), ensure_ascii=False).encode("utf-8")))
+            utils.format_search_results([d["metadata"] for d in display])
+            pipeline_ms.append((time.perf_counter() - start) * 1000)
+            payload.append(len(body))
+            counts.append(len(rows))
+        report[slim] = {"payload": np.mean(payload), "hydrate": np.mean(hydrate_payload) if hydrate_payload else 0.0,
+                        "parse_ms": parse_ms, "pipeline_ms": pipeline_ms, "rows": np.mean(counts)}
+
+    print(f"\n📊 [SlimSearch] 합성 코퍼스 {n_docs}건 / 질의 {n_queries}개 / 표시 언어 {lang}")
+    for slim, label in ((False, "전체 행"), (True, "슬림")):
+        r = report[slim]
+        extra = f" + 표시 조회 {r['hydrate'] / 1024:.1f}KB" if slim else ""
+        print(f"   - {label:<5} 후보 {r['rows']:.1f}건, 전송 {r['payload'] / 1024:.1f}KB{extra}")
+        print(f"           응답 파싱 {percentiles(r['parse_ms'])} / 워커 처리(검색~포맷) {percentiles(r['pipeline_ms'])}")
+
+    full, slim = report[False], report[True]
+    full_rpc = rtt_ms + _transfer_ms(full["payload"], mbps) + np.median(full["parse_ms"])
+    slim_rpc = (rtt_ms + _transfer_ms(slim["payload"], mbps) + np.median(slim["parse_ms"])
+                + rtt_ms + _transfer_ms(slim["hydrate"], mbps))
+    print(f"   - 전송량 감소: {(1 - (slim['payload'] + slim['hydrate']) / full['payload']) * 100:.1f}%")
+    print(f"   - RPC 경로 추정 (왕복 {rtt_ms:.0f}ms, {mbps:.0f}Mbps): 전체 {full_rpc:.1f}ms → 슬림 {slim_rpc:.1f}ms "
+          f"(표시 조회 왕복 포함)")
+
+
+def bench_live(repeats: int = 3):
+    import utils
+    if not utils.supabase or not len(utils.GENAI_POOL):
+        print("⚠️ --live: Supabase/Gemini 설정이 없어 건너뜁니다.")
+        return
+    sizes = {"hybrid_search_v3": [], "hybrid_search_slim": []}
+    latency = {"hybrid_search_v3": [], "hybrid_search_slim": []}
+    for question in LIVE_QUESTIONS:
+        embedding = utils.get_gemini_embedding(question)
+        params = {"query_text": question, "query_embedding": embedding, "match_threshold": 0.4,
+                  "match_count": 20, "filter_category": None, "keywords_arr": question.split()}
+        for fn in sizes:
+            for _ in range(repeats):
+                start = time.perf_counter()
+                try:
+                    rows = utils.supabase.rpc(fn, params).execute().data
+                except Exception as e:
+                    print(f"⚠️ {fn} 호출 실패 (sql/hybrid_search_slim.sql 적용 여부 확인): {e}")
+                    return
+                latency[fn].append((time.perf_counter() - start) * 1000)
+            sizes[fn].append(len(json.dumps(rows, ensure_ascii=False).encode("utf-8")))
+
+    print("\n📊 [SlimSearch] 실제 RPC")
+    for fn in sizes:
+        print(f"   - {fn:<20} 응답 {np.mean(sizes[fn]) / 1024:.1f}KB / {percentiles(latency[fn])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="슬림 검색 + 표시 결과 조회 벤치마크")
+    parser.add_argument("--docs", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--lang", default="en", choices=["ko", "en", "vi", "zh"])
+    parser.add_argument("--rtt-ms", type=float, default=30.0)
+    parser.add_argument("--mbps", type=float, default=50.0)
+    parser.add_argument("--live", action="store_true")
+    args = parser.parse_args()
+
+    bench_synthetic(args.docs, args.queries, args.lang, args.rtt_ms, args.mbps)
+    if args.live:
+        bench_live()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+[벤치마크] 로컬 벡터 인덱스(search_index.VectorIndex) vs Supabase hybrid_search_v3 RPC
+
+- 기본: 합성 코퍼스(기본 400건 x 768차원)로 로컬 검색 지연(p50/p95/p99) 측정
+        + BM25 키워드 인덱스 단독 질의 지연과 아티팩트 크기
+- --live: 실제 site_pages를 적재하고, 샘플 질문 임베딩으로 RPC와 로컬 검색의 지연과
+          상위 5건 일치율을 비교 (SUPABASE_URL/SUPABASE_KEY, GEMINI_API_KEYS 필요)
+
+사용법: python -m bench.bench_vector_index [--docs 400] [--queries 500] [--live]
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from search_index import VectorIndex
+from bm25_index import BM25Index
+
+CATEGORIES = ["의료/재활", "교육/보육", "가족 지원", "돌봄/양육", "생활 지원"]
+WORDS = ["아동수당", "바우처", "발달", "검사", "치료", "돌봄", "보육료", "상담", "기저귀", "교통비", "장애", "다문화"]
+LIVE_QUESTIONS = [
+    "아동수당 신청 방법", "발달 검사 받을 수 있는 곳", "장애아동 재활 치료 바우처", "어린이집 보육료 지원",
+    "기저귀 분유 지원", "한부모 가정 지원금", "언어치료 비용", "아이돌봄 서비스 신청",
+]
+
+
+def percentiles(samples_ms: list) -> str:
+    p50, p95, p99 = np.percentile(samples_ms, [50, 95, 99])
+    return f"p50 {p50:.2f}ms / p95 {p95:.2f}ms / p99 {p99:.2f}ms"
+
+
+def synthetic_rows(n_docs: int, dim: int, rng, centers=None) -> list:
+    """주제 중심 벡터 + 잡음으로 문서 생성 (비슷한 사업끼리 유사도가 높은 실제 분포를 흉내)"""
+    rows = []
+    for i in range(n_docs):
+        words = rng.choice(WORDS, size=3, replace=False)
+        topic = centers[i % len(centers)] if centers is not None else 0.0
+        rows.append({
+            "id": f"page{i}_0",
+            "page_id": f"page{i}",
+            "content": " ".join(words) + " 지원 내용 " * 20,
+            "metadata": {"title": f"{words[0]} {words[1]} 사업", "category": CATEGORIES[i % len(CATEGORIES)],
+                         "start_age": int(rng.integers(0, 36)), "end_age": int(rng.integers(36, 96))},
+            "embedding": (topic + 0.8 * rng.standard_normal(dim)).astype(np.float32).tolist(),
+        })
+    return rows
+
+
+def bench_synthetic(n_docs: int, n_queries: int, dim: int = 768):
+    rng = np.random.default_rng(0)
+    centers = rng.standard_normal((12, dim)).astype(np.float32)
+    rows = synthetic_rows(n_docs, dim, rng, centers)
+    index = VectorIndex(lambda: rows, name="synthetic")
+    index.load()
+
+    queries = centers[rng.integers(0, len(centers), n_queries)] + 0.8 * rng.standard_normal((n_queries, dim)).astype(np.float32)
+    hits = [len(index.search(q, match_threshold=0.3, match_count=20)) for q in queries[:20]]
+    print(f"   (질의당 평균 결과 {np.mean(hits):.1f}건)")
+
+    for label, kwargs in [("전체 검색", {}), ("카테고리 필터", {"filter_category": CATEGORIES[0]}),
+                          ("카테고리 + 키워드", {"filter_category": CATEGORIES[0], "keywords": ["바우처", "검사", "발달"],
+                                                 "query_text": "발달 검사 바우처"}),
+                          ("카테고리 + 나이", {"filter_category": CATEGORIES[0], "user_age": 6})]:
+        samples = []
+        for q in queries:
+            start = time.perf_counter()
+            index.search(q, match_threshold=0.3, match_count=20, **kwargs)
+            samples.append((time.perf_counter() - start) * 1000)
+        print(f"   - {label:<14} {percentiles(samples)}")
+
+    start = time.perf_counter()
+    bm25 = BM25Index.build(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+    artifact = bm25.to_bytes()
+    print(f"   - BM25 생성 {build_ms:.0f}ms / 용어 {len(bm25.terms)}개 / 아티팩트 {len(artifact) / 1024:.1f}KB")
+    samples = []
+    for i in range(n_queries):
+        text = " ".join(WORDS[j % len(WORDS)] for j in range(i, i + 3))
+        start = time.perf_counter()
+        bm25.scores(text)
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"   - {'BM25 단독':<14} {percentiles(samples)}")
+
+
+def bench_live(repeats: int = 3):
+    import utils
+    if not utils.supabase or not len(utils.GENAI_POOL):
+        print("⚠️ --live: Supabase/Gemini 설정이 없어 건너뜁니다.")
+        return
+    index = VectorIndex(lambda: utils.fetch_site_pages(utils.supabase), name="live")
+    start = time.perf_counter()
+    index.load()
+    print(f"   - 적재: {index.snapshot()['size']}건, {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    rpc_ms, local_ms, overlaps = [], [], []
+    for question in LIVE_QUESTIONS:
+        embedding = utils.get_gemini_embedding(question)
+        keywords = question.split()
+        params = {"query_text": question, "query_embedding": embedding, "match_threshold": 0.4,
+                  "match_count": 20, "filter_category": None, "keywords_arr": keywords}
+        for _ in range(repeats):
+            start = time.perf_counter()
+            rpc_rows = utils.supabase.rpc("hybrid_search_v3", params).execute().data
+            rpc_ms.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            local_rows = index.search(embedding, 0.4, 20, None, keywords, query_text=question)
+            local_ms.append((time.perf_counter() - start) * 1000)
+
+        rpc_top = {r["id"] for r in rpc_rows[:5]}
+        local_top = {r["id"] for r in local_rows[:5]}
+        overlaps.append(len(rpc_top & local_top) / max(1, len(rpc_top)))
+
+    print(f"   - RPC   {percentiles(rpc_ms)}")
+    print(f"   - 로컬  {percentiles(local_ms)}")
+    print(f"   - 상위 5건 일치율 평균: {np.mean(overlaps) * 100:.0f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 벡터 인덱스 벤치마크")
+    parser.add_argument("--docs", type=int, default=400)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--live", action="store_true", help="실제 Supabase RPC와 비교")
+    args = parser.parse_args()
+
+    print(f"📊 [합성 코퍼스] 문서 {args.docs}건, 질의 {args.queries}개")
+    bench_synthetic(args.docs, args.queries)
+    if args.live:
+        print("📊 [실데이터] hybrid_search_v3 RPC vs 로컬 인덱스")
+        bench_live()
+
+
+if __name__ == "__main__":
+    main()
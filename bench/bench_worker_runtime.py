@@ -0,0 +1,162 @@
+"""
+[벤치마크] 동기 워커 루프 vs 비동기 워커 (WORKER_MODE=async) 처리량
+
+외부 서비스는 지연만 흉내 내는 가짜 백엔드로 바꿔 워커 런타임 자체의 처리량(jobs/sec)을 비교합니다.
+- 임베딩 / 키워드 확장 / 검색 / 랭킹 / Notion 로그: 각각 --latency-scale 배율의 고정 지연 (네트워크 대기)
+- Redis: fakeredis (동기/비동기 클라이언트가 같은 서버 공유)
+- 같은 작업 --jobs건을 큐에 넣고 결과가 모두 저장될 때까지의 시간 측정
+
+사용법: python -m bench.bench_worker_runtime [--jobs 40] [--concurrency 1 4 8 16] [--latency-scale 1.0] [--backend list|stream]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakeredis
+import fakeredis.aioredis
+
+from job_queue import JobQueue, JOB_QUEUE_KEY
+from job_results import result_key
+
+# 단계별 가짜 지연 (초): 실제 로그의 대략적인 중앙값
+STUB_LATENCY = {"embed": 0.25, "expand": 0.3, "search": 0.15, "rerank": 0.6, "notion": 0.3}
+
+
+def install_stub_backends(worker, scale: float):
+    """worker 모듈이 참조하는 외부 호출을 지연만 있는 가짜 함수로 교체"""
+    delay = {k: v * scale for k, v in STUB_LATENCY.items()}
+    doc = {"id": "p1_0", "page_id": "p1", "content": "아동수당", "similarity": 0.9,
+           "metadata": {"page_id": "p1", "title": "아동수당", "category": "생활 지원"}}
+
+    class StubNotion:
+        class pages:
+            @staticmethod
+            def create(**kwargs):
+                time.sleep(delay["notion"])
+
+    class StubRetry:
+        @staticmethod
+        def call(fn, site=None):
+            return fn()
+
+    async def embed_async(question):
+        await asyncio.sleep(delay["embed"])
+        return [0.1] * 8
+
+    async def search_async(*args, **kwargs):
+        await asyncio.sleep(delay["search"])
+        return [dict(doc)]
+
+    worker.get_gemini_embedding = lambda q: time.sleep(delay["embed"]) or [0.1] * 8
+    worker.get_gemini_embedding_async = embed_async
+    worker.expand_search_query = lambda q, ai_keywords=None: time.sleep(delay["expand"]) or ["아동수당"]
+    worker.search_supabase = lambda *a, **k: time.sleep(delay["search"]) or [dict(doc)]
+    worker.search_supabase_async = search_async
+    worker.rerank_search_results = lambda q, c, i=None: time.sleep(delay["rerank"]) or c
+    worker.hydrate_display_results = lambda docs, lang="ko": docs
+    worker.format_search_results = lambda metas: "".join(m["title"] for m in metas)
+    worker.notion = StubNotion()
+    worker.NOTION_RETRY = StubRetry()
+    worker.ANSWER_CACHE = None
+    worker.SEARCH_INDEX = None
+    worker.NOTION_LOG_DB_ID = "bench"
+    return sum(delay.values())
+
+
+class FakeBlockingQueue(JobQueue):
+    """fakeredis는 XREADGROUP의 BLOCK을 무시하고 바로 빈 응답을 주므로, 빈 응답이면 잠깐 쉼 (실제 Redis의 블로킹 흉내)"""
+
+    def pop(self, conn, timeout: float = 1.0):
+        job = super().pop(conn, timeout)
+        if job is None and self.is_stream:
+            time.sleep(0.01)
+        return job
+
+    async def pop_async(self, conn, timeout: float = 1.0):
+        job = await super().pop_async(conn, timeout)
+        if job is None and self.is_stream:
+            await asyncio.sleep(0.01)
+        return job
+
+
+def enqueue_jobs(redis_conn, worker, n_jobs: int) -> list:
+    # 스트림은 지우지 않음 (소비자 그룹 유지, 처리된 메시지는 ack 시 XDEL로 삭제됨)
+    redis_conn.delete(JOB_QUEUE_KEY, *[result_key(f"bench-{i}") for i in range(n_jobs)])
+    job_ids = [f"bench-{i}" for i in range(n_jobs)]
+    for job_id in job_ids:
+        job = {"job_id": job_id, "question": f"아동수당 신청 방법 {job_id}", "enqueued_at": time.time(),
+               "extracted_info": {"category": "생활 지원"}}
+        worker.JOB_QUEUE.enqueue(redis_conn, json.dumps(job, ensure_ascii=False).encode("utf-8"))
+    return job_ids
+
+
+def run_sync(worker, server, n_jobs: int) -> float:
+    redis_conn = fakeredis.FakeRedis(server=server)
+    worker.redis_client = redis_conn
+    job_ids = enqueue_jobs(redis_conn, worker, n_jobs)
+    result_keys = [result_key(j) for j in job_ids]
+    stop = threading.Event()
+    start = time.perf_counter()
+    thread = threading.Thread(target=worker.start_worker, args=(stop,), daemon=True)
+    thread.start()
+    while redis_conn.exists(*result_keys) < n_jobs:
+        time.sleep(0.01)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    thread.join()
+    return elapsed
+
+
+def run_async(worker, server, n_jobs: int, concurrency: int) -> float:
+    sync_conn = fakeredis.FakeRedis(server=server)
+    result_keys = [result_key(j) for j in enqueue_jobs(sync_conn, worker, n_jobs)]
+
+    async def _main():
+        redis_async = fakeredis.aioredis.FakeRedis(server=server)
+        stop = asyncio.Event()
+        start = time.perf_counter()
+        runner = asyncio.create_task(worker.start_worker_async(concurrency, stop, redis_async))
+        while await redis_async.exists(*result_keys) < n_jobs:
+            await asyncio.sleep(0.01)
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await runner
+        return elapsed
+
+    return asyncio.run(_main())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="동기/비동기 워커 처리량 비교 (가짜 백엔드)")
+    parser.add_argument("--jobs", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--backend", default="list", choices=["list", "stream"], help="작업 큐 백엔드")
+    args = parser.parse_args()
+
+    import worker  # utils 초기화(Redis/Supabase 연결 시도)가 있어 지연 import
+    worker.logger.setLevel("WARNING")
+    per_job = install_stub_backends(worker, args.latency_scale)
+    worker.JOB_QUEUE = FakeBlockingQueue(args.backend)
+    server = fakeredis.FakeServer()
+
+    print(f"\n📊 [WorkerRuntime] 작업 {args.jobs}건, 가짜 백엔드 지연 합계 {per_job:.2f}초/건, 큐 {args.backend}")
+    elapsed = run_sync(worker, server, args.jobs)
+    baseline = args.jobs / elapsed
+    print(f"   - 동기 루프          {elapsed:6.2f}초 / {baseline:6.2f} jobs/sec")
+    for concurrency in args.concurrency:
+        elapsed = run_async(worker, server, args.jobs, concurrency)
+        rate = args.jobs / elapsed
+        print(f"   - 비동기 (동시 {concurrency:>2}건) {elapsed:6.2f}초 / {rate:6.2f} jobs/sec (x{rate / baseline:.1f})")
+    print(f"   - 워커 통계: {worker.get_worker_runtime_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+[평가] 로컬 1차 의도 분류기 (intent_classifier.classify_intent_fast)
+
+라벨 세트(bench/intent_eval.jsonl)로 다음을 측정합니다.
+- 처리 비율: LLM 없이 로컬에서 처리한 질문의 비율
+- 정확도: 로컬에서 처리한 질문 중 intent/category/age가 모두 라벨과 일치한 비율
+  (임계값 미만으로 LLM에 넘긴 질문은 정확도 계산에서 제외)
+
+사용법: python -m bench.eval_intent [--threshold 0.85] [--verbose]
+"""
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import intent_classifier
+from intent_classifier import _classify
+
+EVAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "intent_eval.jsonl")
+FIELDS = ("intent", "category", "age")
+
+
+def load_cases(path: str = EVAL_PATH) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def evaluate(cases: list, threshold: float, verbose: bool = False) -> dict:
+    handled = correct = 0
+    field_errors = dict.fromkeys(FIELDS, 0)
+    for case in cases:
+        result = _classify(case["question"], case.get("chat_history"))
+        if result.confidence < threshold:
+            if verbose:
+                print(f"  ↪ LLM   {case['question']!r} ({result.reason}, {result.confidence:.2f})")
+            continue
+        handled += 1
+        wrong = [name for name in FIELDS if result.info.get(name) != case.get(name)]
+        for name in wrong:
+            field_errors[name] += 1
+        if not wrong:
+            correct += 1
+        else:
+            got = {name: result.info.get(name) for name in FIELDS}
+            want = {name: case.get(name) for name in FIELDS}
+            print(f"  ✗ 오답  {case['question']!r}: {got} (정답 {want})")
+    return {
+        "cases": len(cases),
+        "handled": handled,
+        "handled_ratio": round(handled / len(cases), 3) if cases else 0.0,
+        "accuracy": round(correct / handled, 3) if handled else 0.0,
+        "field_errors": field_errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 의도 분류기 평가")
+    parser.add_argument("--threshold", type=float, default=intent_classifier.FAST_INTENT_THRESHOLD)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    report = evaluate(load_cases(), args.threshold, args.verbose)
+    print(f"\n📊 [FastIntent] 임계값 {args.threshold}")
+    print(f"   - 라벨 질문: {report['cases']}개")
+    print(f"   - 로컬 처리: {report['handled']}개 ({report['handled_ratio'] * 100:.1f}%)")
+    print(f"   - 로컬 처리 정확도: {report['accuracy'] * 100:.1f}%")
+    print(f"   - 필드별 오답: {report['field_errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+[평가] 로컬 1차 재정렬 (local_rerank.rank_locally) Confidence Gate
+
+라벨 세트(bench/rerank_eval.jsonl: 질문 + 검색 엔진 순서의 후보/유사도 + 정답 사업명)와
+후보 문서 목록(bench/rerank_catalog.json)으로 다음을 측정합니다.
+- LLM 생략 비율: 로컬 순위가 확실해서 LLM 랭킹을 건너뛴 비율
+- 1위 정답률: 로컬 1위가 정답 사업 중 하나인 비율 (전체 / 생략한 케이스)
+- 상위 2개 변화율: 검색 엔진 순서 대비 로컬 순위에서 화면에 나가는 2개가 바뀐 비율
+- --llm: 모든 케이스에 Gemini 랭킹도 실행해 로컬 상위 2개와 LLM 상위 2개가 다른 비율 (GEMINI_API_KEYS 필요)
+
+사용법: python -m bench.eval_rerank [--margin 0.15] [--sweep] [--llm] [--verbose]
+"""
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import local_rerank
+from local_rerank import rank_locally, DISPLAY_COUNT
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+EVAL_PATH = os.path.join(BENCH_DIR, "rerank_eval.jsonl")
+CATALOG_PATH = os.path.join(BENCH_DIR, "rerank_catalog.json")
+
+
+def load_cases(path: str = EVAL_PATH, catalog_path: str = CATALOG_PATH) -> list:
+    with open(catalog_path, encoding="utf-8") as f:
+        catalog = {doc["title"]: doc for doc in json.load(f)}
+    cases = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            case = json.loads(line)
+            case["docs"] = []
+            for title, similarity in case["candidates"]:
+                doc = catalog[title]
+                meta = {k: doc[k] for k in ("title", "category", "start_age", "end_age")}
+                case["docs"].append({"id": title, "content": doc["content"], "metadata": meta, "similarity": similarity})
+            cases.append(case)
+    return cases
+
+
+def top_titles(docs: list, n: int = DISPLAY_COUNT) -> set:
+    return {doc["metadata"]["title"] for doc in docs[:n]}
+
+
+def evaluate(cases: list, margin: float, title_match=None, llm_rerank=None, verbose: bool = False) -> dict:
+    local_rerank.LOCAL_RERANK_MARGIN = margin
+    skipped = top1_correct = skipped_correct = changed_vs_engine = 0
+    llm_cases = llm_changed = llm_changed_skipped = 0
+    for case in cases:
+        info = {"category": case.get("category"), "age": case.get("age")}
+        ranking = rank_locally(case["question"], case["docs"], info, title_match=title_match)
+        local_top = ranking.ranked[0]["metadata"]["title"]
+        correct = local_top in case["relevant"]
+        top1_correct += correct
+        changed_vs_engine += top_titles(ranking.ranked) != top_titles(case["docs"])
+        if ranking.confident:
+            skipped += 1
+            skipped_correct += correct
+
+        llm_note = ""
+        if llm_rerank is not None:
+            llm_ranked = llm_rerank(case["question"], ranking.ranked) or ranking.ranked
+            diff = top_titles(llm_ranked) != top_titles(ranking.ranked)
+            llm_cases += 1
+            llm_changed += diff
+            llm_changed_skipped += diff and ranking.confident
+            llm_note = f" / LLM 상위2 {'변경' if diff else '동일'}"
+
+        if verbose or (ranking.confident and not correct):
+            mark = "⚡ 생략" if ranking.confident else "🤔 LLM "
+            wrong = "" if correct else " ✗"
+            print(f"  {mark} {case['question']!r}: 1위 {local_top} (차이 {ranking.margin:.3f}){wrong}{llm_note}")
+
+    n = len(cases)
+    report = {
+        "cases": n,
+        "skipped": skipped,
+        "skip_ratio": round(skipped / n, 3) if n else 0.0,
+        "top1_accuracy": round(top1_correct / n, 3) if n else 0.0,
+        "top1_accuracy_skipped": round(skipped_correct / skipped, 3) if skipped else 0.0,
+        "top2_changed_vs_engine": round(changed_vs_engine / n, 3) if n else 0.0,
+    }
+    if llm_cases:
+        report["top2_changed_vs_llm"] = round(llm_changed / llm_cases, 3)
+        report["top2_changed_vs_llm_skipped"] = round(llm_changed_skipped / skipped, 3) if skipped else 0.0
+    return report
+
+
+def print_report(report: dict, margin: float):
+    print(f"\n📊 [LocalRerank] 차이 기준 {margin} / 1위 최소 {local_rerank.LOCAL_RERANK_MIN_TOP}")
+    print(f"   - 라벨 케이스: {report['cases']}개")
+    print(f"   - LLM 생략: {report['skipped']}개 ({report['skip_ratio'] * 100:.1f}%)")
+    print(f"   - 로컬 1위 정답률: 전체 {report['top1_accuracy'] * 100:.1f}% / 생략 케이스 {report['top1_accuracy_skipped'] * 100:.1f}%")
+    print(f"   - 상위 2개 변화율 (검색 엔진 순서 대비): {report['top2_changed_vs_engine'] * 100:.1f}%")
+    if "top2_changed_vs_llm" in report:
+        print(f"   - 상위 2개 변화율 (LLM 랭킹 대비): 전체 {report['top2_changed_vs_llm'] * 100:.1f}% / "
+              f"생략 케이스 {report['top2_changed_vs_llm_skipped'] * 100:.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="로컬 재정렬 Confidence Gate 평가")
+    parser.add_argument("--margin", type=float, default=local_rerank.LOCAL_RERANK_MARGIN)
+    parser.add_argument("--sweep", action="store_true", help="차이 기준별 생략 비율/정답률 표")
+    parser.add_argument("--llm", action="store_true", help="Gemini 랭킹과 상위 2개 비교")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    import utils  # check_title_match / Gemini 랭킹 (Redis/Supabase 연결 시도가 있어 지연 import)
+    llm_rerank = None
+    if args.llm:
+        if not len(utils.GENAI_POOL):
+            print("⚠️ --llm: Gemini 키가 없어 LLM 비교를 건너뜁니다.")
+        else:
+            llm_rerank = utils._llm_rerank
+
+    cases = load_cases()
+    if args.sweep:
+        print("\n차이 기준 | LLM 생략 | 생략 케이스 1위 정답률")
+        for margin in (0.0, 0.05, 0.1, 0.15, 0.2, 0.3):
+            report = evaluate(cases, margin, utils.check_title_match)
+            print(f"   {margin:<6} | {report['skip_ratio'] * 100:5.1f}% | {report['top1_accuracy_skipped'] * 100:5.1f}%")
+        return
+
+    report = evaluate(cases, args.margin, utils.check_title_match, llm_rerank, args.verbose)
+    print_report(report, args.margin)
+
+
+if __name__ == "__main__":
+    main()
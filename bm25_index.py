@@ -0,0 +1,183 @@
+"""
+[신규] 로컬 BM25 키워드 인덱스 (hybrid_search_v3의 keywords_arr 가산점 대체)
+
+형태소 분석기 없이 한국어를 다루기 위해 한글 어절은 글자 2-gram으로 쪼개고
+("아동수당은" → 아동/동수/수당/당은), 영문/숫자는 단어 그대로 색인합니다.
+제목(x3) / 대상 특성(x2) / 본문(x1) 가중 빈도로 BM25 점수를 계산하고,
+search_index.VectorIndex가 벡터 유사도 순위와 RRF(Reciprocal Rank Fusion)로 합칩니다.
+
+- 인덱서(run_indexer)가 저장을 마치면 build → Redis/파일에 압축 아티팩트로 저장
+- API/워커는 검색 인덱스 적재 시 아티팩트를 읽고, 없거나 행 구성이 다르면 적재한 행으로 직접 생성
+- 질의 시에는 미리 계산한 (문서, 점수) 포스팅을 더하기만 하므로 수십 μs 수준
+"""
+
+import io
+import os
+import re
+import json
+from collections import Counter
+from typing import Optional, List, Dict, Any, Iterable
+
+import numpy as np
+
+BM25_ARTIFACT_KEY = "chatbot:search_index:bm25"
+BM25_INDEX_PATH = os.getenv("BM25_INDEX_PATH", "./chroma-data/bm25_index.npz")
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 필드 가중치 (인덱서의 임베딩 텍스트 가중치와 같은 비율)
+FIELD_WEIGHTS = {"title": 3, "targets": 2, "content": 1}
+
+_TOKEN_RE = re.compile(r"[가-힣]+|[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """한글 어절 → 글자 2-gram (한 글자 어절은 그대로), 영문/숫자 → 단어"""
+    tokens = []
+    for word in _TOKEN_RE.findall((text or "").lower()):
+        if len(word) > 2 and "가" <= word[0] <= "힣":
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+def _row_fields(row: Dict[str, Any]) -> Dict[str, str]:
+    meta = row.get("metadata") or {}
+    targets = meta.get("sub_category_list") or []
+    return {
+        "title": meta.get("title") or "",
+        "targets": " ".join(targets) if isinstance(targets, list) else str(targets),
+        "content": row.get("content") or "",
+    }
+
+
+class BM25Index:
+    """
+    CSR 형태의 역색인: terms[t] → postings[offsets[t]:offsets[t+1]] (문서 번호), tfs (가중 빈도)
+    문서 번호는 doc_ids 순서이며, 검색 인덱스가 site_pages 행 순서로 다시 맞춥니다.
+    """
+
+    def __init__(self, doc_ids: List[str], terms: List[str], offsets: np.ndarray, postings: np.ndarray,
+                 tfs: np.ndarray, doc_lengths: np.ndarray, k1: float = BM25_K1, b: float = BM25_B):
+        self.doc_ids = list(doc_ids)
+        self.terms = {term: i for i, term in enumerate(terms)}
+        self.offsets = offsets.astype(np.int64)
+        self.postings = postings.astype(np.int32)
+        self.tfs = tfs.astype(np.uint16)
+        self.doc_lengths = doc_lengths.astype(np.float32)
+        self.k1, self.b = k1, b
+
+        # 질의 시 더하기만 하도록 포스팅별 BM25 점수를 미리 계산
+        n_docs = len(self.doc_ids)
+        df = np.diff(self.offsets).astype(np.float32)
+        idf = np.log1p((n_docs - df + 0.5) / (df + 0.5))
+        avgdl = float(self.doc_lengths.mean()) if n_docs else 1.0
+        tf = self.tfs.astype(np.float32)
+        norm = k1 * (1 - b + b * self.doc_lengths[self.postings] / max(avgdl, 1e-6))
+        self.impacts = (np.repeat(idf, np.diff(self.offsets)) * tf * (k1 + 1) / (tf + norm)).astype(np.float32)
+
+    def __len__(self):
+        return len(self.doc_ids)
+
+    @classmethod
+    def build(cls, rows: Iterable[Dict[str, Any]]) -> "BM25Index":
+        """site_pages 행(id, content, metadata)으로 인덱스 생성"""
+        doc_ids, doc_lengths = [], []
+        term_docs: Dict[str, List[tuple]] = {}
+        for doc_no, row in enumerate(rows):
+            counts = Counter()
+            for field, text in _row_fields(row).items():
+                weight = FIELD_WEIGHTS[field]
+                for token in tokenize(text):
+                    counts[token] += weight
+            doc_ids.append(row.get("id"))
+            doc_lengths.append(sum(counts.values()))
+            for token, tf in counts.items():
+                term_docs.setdefault(token, []).append((doc_no, min(tf, 65535)))
+
+        terms = sorted(term_docs)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        postings, tfs = [], []
+        for i, term in enumerate(terms):
+            entries = term_docs[term]
+            offsets[i + 1] = offsets[i] + len(entries)
+            postings.extend(doc for doc, _ in entries)
+            tfs.extend(tf for _, tf in entries)
+        return cls(doc_ids, terms, offsets, np.array(postings, dtype=np.int32),
+                   np.array(tfs, dtype=np.uint16), np.array(doc_lengths, dtype=np.float32))
+
+    def scores(self, query_text: str) -> np.ndarray:
+        """문서별 BM25 점수 (doc_ids 순서, 일치하는 토큰이 없으면 0)"""
+        scores = np.zeros(len(self.doc_ids), dtype=np.float32)
+        for token in set(tokenize(query_text)):
+            t = self.terms.get(token)
+            if t is None:
+                continue
+            start, end = self.offsets[t], self.offsets[t + 1]
+            # 한 용어의 포스팅 안에서 문서 번호는 중복되지 않으므로 fancy index 덧셈으로 충분
+            scores[self.postings[start:end]] += self.impacts[start:end]
+        return scores
+
+    # --- 아티팩트 (np.savez_compressed) ---
+
+    def to_bytes(self) -> bytes:
+        buf = io.BytesIO()
+        terms_blob = "\n".join(sorted(self.terms, key=self.terms.get)).encode("utf-8")
+        np.savez_compressed(
+            buf,
+            doc_ids=np.frombuffer(json.dumps(self.doc_ids, ensure_ascii=False).encode("utf-8"), dtype=np.uint8),
+            terms=np.frombuffer(terms_blob, dtype=np.uint8),
+            offsets=self.offsets, postings=self.postings, tfs=self.tfs, doc_lengths=self.doc_lengths,
+            params=np.array([self.k1, self.b], dtype=np.float32),
+        )
+        return buf.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "BM25Index":
+        with np.load(io.BytesIO(data)) as z:
+            terms_blob = z["terms"].tobytes().decode("utf-8")
+            k1, b = (float(v) for v in z["params"])
+            return cls(json.loads(z["doc_ids"].tobytes().decode("utf-8")),
+                       terms_blob.split("\n") if terms_blob else [],
+                       z["offsets"], z["postings"], z["tfs"], z["doc_lengths"], k1=k1, b=b)
+
+    def save(self, path: str = BM25_INDEX_PATH) -> int:
+        data = self.to_bytes()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+        return len(data)
+
+    @classmethod
+    def load(cls, path: str = BM25_INDEX_PATH) -> Optional["BM25Index"]:
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
+
+
+def publish_bm25_artifact(redis_conn, index: BM25Index) -> bool:
+    """[인덱서] 아티팩트를 Redis에 저장 (GitHub Actions 인덱서와 API가 파일시스템을 공유하지 않으므로)"""
+    if redis_conn is None:
+        return False
+    try:
+        data = index.to_bytes()
+        redis_conn.set(BM25_ARTIFACT_KEY, data)
+        print(f"📦 [BM25] 아티팩트 저장: 문서 {len(index)}건, 용어 {len(index.terms)}개, {len(data) / 1024:.1f}KB")
+        return True
+    except Exception as e:
+        print(f"⚠️ [BM25] 아티팩트 저장 실패: {e}")
+        return False
+
+
+def load_bm25_artifact(redis_conn, path: str = BM25_INDEX_PATH) -> Optional[BM25Index]:
+    """[API/워커] Redis → 로컬 파일 순으로 아티팩트 읽기 (없으면 None → 적재한 행으로 직접 생성)"""
+    try:
+        data = redis_conn.get(BM25_ARTIFACT_KEY) if redis_conn is not None else None
+        if data:
+            return BM25Index.from_bytes(data)
+        return BM25Index.load(path)
+    except Exception as e:
+        print(f"⚠️ [BM25] 아티팩트 읽기 실패: {e}")
+        return None
@@ -0,0 +1,143 @@
+"""
+[신규] 동일 질문 요청 병합 (Single-flight / Request Coalescing)
+
+인기 질문("아동수당 신청 방법")이 몇 초 사이에 여러 사용자에게서 동시에 들어오면,
+요청마다 키워드 확장 → 임베딩 → hybrid_search_v3 → LLM 랭킹을 반복하게 됩니다.
+같은 (정규화된 질문 + 답변 언어 + 카테고리 + 의도 추출 결과)로 진행 중인 작업이 있으면 새 작업을 만들지 않고
+그 작업에 합류시켜 같은 결과를 받도록 합니다.
+(워커는 extracted_info의 나이/대상/검색어로 검색을 필터링하므로, 나이가 다른 사용자는 병합하지 않음)
+
+- SingleFlight: 프로세스 내부 병합 (동기/Vercel 모드, process_job 직접 실행 경로)
+- claim_inflight_async / release_inflight: Redis 기반 병합 (큐 모드, API 여러 대 + 워커 여러 대)
+"""
+
+import os
+import re
+import json
+import asyncio
+import hashlib
+import threading
+from typing import Optional, Callable, Any, Dict
+
+INFLIGHT_PREFIX = "chatbot:inflight:"
+# 진행 중 표시의 최대 수명 (워커가 죽어도 이 시간이 지나면 새 작업이 생성됨, 프론트 폴링 한도와 비슷하게)
+INFLIGHT_TTL_SECONDS = int(os.getenv("INFLIGHT_TTL_SECONDS", "120"))
+
+# 워커가 검색 필터/답변 캐시 문맥에 쓰는 extracted_info 필드 (값이 다르면 결과가 달라짐)
+COALESCE_CONTEXT_FIELDS = ("age", "sub_category", "search_keywords")
+
+_LANG_MARKERS = (("strictly in English", "en"), ("strictly in Vietnamese", "vi"), ("strictly in Chinese", "zh"))
+
+
+def detect_answer_language(question: str) -> str:
+    """프론트엔드가 붙이는 '(System: ... strictly in X)' 표식으로 답변 언어를 판별 (worker와 동일 규칙)"""
+    for marker, code in _LANG_MARKERS:
+        if marker in question:
+            return code
+    return "ko"
+
+
+def make_coalesce_key(question: str, category: Optional[str] = None, extracted_info: Optional[dict] = None) -> str:
+    """
+    정규화된 질문 + 답변 언어 + 카테고리로 병합 키 생성
+    [수정] extracted_info를 주면 워커 결과에 영향을 주는 나이/대상/검색어도 키에 포함
+    """
+    lang = detect_answer_language(question)
+    text = re.sub(r'\s*\(System[\s\S]*?\)', '', question, flags=re.IGNORECASE)
+    text = re.sub(r'\s+', ' ', text).strip().lower()
+    raw = f"{lang}|{category or ''}|{text}"
+    if extracted_info:
+        context = {k: extracted_info.get(k) for k in COALESCE_CONTEXT_FIELDS}
+        raw += "|" + json.dumps(context, ensure_ascii=False, sort_keys=True)
+    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+
+
+_stats = {"leaders": 0, "coalesced": 0}
+_stats_lock = threading.Lock()
+
+
+def _incr(field: str):
+    with _stats_lock:
+        _stats[field] += 1
+
+
+def get_coalesce_stats() -> dict:
+    with _stats_lock:
+        return dict(_stats)
+
+
+class SingleFlight:
+    """
+    [프로세스 내부] 같은 키로 진행 중인 작업이 있으면 그 결과를 함께 기다립니다.
+    작업은 별도 Task로 실행되므로, 먼저 요청한 클라이언트가 연결을 끊어도 합류한 요청들은 영향을 받지 않습니다.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, fn: Callable[[], Any]):
+        """fn은 코루틴 또는 Future(예: run_in_executor)를 반환하는 함수"""
+        task = self._inflight.get(key)
+        if task is None:
+            _incr("leaders")
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        else:
+            _incr("coalesced")
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def __len__(self):
+        return len(self._inflight)
+
+
+async def claim_inflight_async(redis_async, key: str, job_id: str) -> Optional[str]:
+    """
+    [큐 모드] 병합 키를 선점합니다.
+    - 선점 성공(새 작업을 큐에 넣어야 함) → None
+    - 이미 진행 중인 작업이 있음 → 그 작업의 job_id (클라이언트는 이 job_id로 결과를 폴링)
+    """
+    redis_key = INFLIGHT_PREFIX + key
+    for _ in range(2):
+        if await redis_async.set(redis_key, job_id, nx=True, ex=INFLIGHT_TTL_SECONDS):
+            _incr("leaders")
+            return None
+        existing = await redis_async.get(redis_key)
+        if existing:
+            _incr("coalesced")
+            return existing.decode('utf-8') if isinstance(existing, bytes) else existing
+        # 그 사이에 만료/해제됨 → 한 번 더 선점 시도
+    return None
+
+
+# 자신이 선점한 키만 지움 (TTL 만료 후 다른 작업이 선점한 키를 지우지 않도록)
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+def release_inflight(redis_sync, key: Optional[str], job_id: str):
+    """[워커] 결과 저장 후 병합 키 해제 (이후 같은 질문은 새 작업 또는 답변 캐시로 처리)"""
+    if not key:
+        return
+    try:
+        redis_sync.eval(_RELEASE_SCRIPT, 1, INFLIGHT_PREFIX + key, job_id)
+    except Exception as e:
+        print(f"⚠️ [Coalesce] 진행 중 표시 해제 실패 (TTL로 자동 만료): {e}")
+
+
+async def release_inflight_async(redis_async, key: Optional[str], job_id: str):
+    """[API] 큐 등록 실패 시 선점한 병합 키를 되돌림 / [비동기 워커] 결과 저장 후 병합 키 해제"""
+    if not key:
+        return
+    try:
+        await redis_async.eval(_RELEASE_SCRIPT, 1, INFLIGHT_PREFIX + key, job_id)
+    except Exception as e:
+        print(f"⚠️ [Coalesce] 진행 중 표시 해제 실패 (TTL로 자동 만료): {e}")
@@ -0,0 +1,226 @@
+"""
+[신규] 로컬 1차 의도 분류기 (LLM 호출 전 Fast Path)
+
+"고마워", "더 보여줘", "종료", 카테고리 버튼 탭처럼 규칙으로 확실히 판별되는 입력은
+Gemini/Groq 호출 없이 바로 처리합니다. 결과는 extract_info_from_question_async와 같은 모양의
+dict(intent, category, sub_category, age, keywords)이며, confidence가 임계값 미만이면 LLM에 맡깁니다.
+
+평가: python -m bench.eval_intent (bench/intent_eval.jsonl 라벨 세트로 정확도/처리 비율 측정)
+"""
+
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any
+
+# 이 값 이상이면 LLM 없이 로컬 결과 사용
+FAST_INTENT_THRESHOLD = float(os.getenv("FAST_INTENT_THRESHOLD", "0.85"))
+
+# 답변 카테고리 (DATABASE_IDS 키와 동일해야 검색 필터가 동작함)
+CATEGORIES = ["의료/재활", "교육/보육", "가족 지원", "돌봄/양육", "생활 지원"]
+
+# 일반 용어 → 카테고리 (LLM 프롬프트의 category 규칙과 동일)
+GENERIC_CATEGORY_KEYWORDS = {
+    "의료/재활": ["병원", "치료", "검사", "진단", "재활"],
+    "교육/보육": ["어린이집", "유치원", "교육", "보육", "학습"],
+    "가족 지원": ["상담", "부모", "가족"],
+    "돌봄/양육": ["돌봄", "양육", "활동지원"],
+    "생활 지원": ["바우처", "지원금", "수당", "셔틀", "교통", "차량", "기저귀", "통장"],
+}
+
+# 구체적인 사업명은 예상 밖의 카테고리에 있을 수 있으므로 category=None(전체 검색)
+SPECIFIC_SERVICES = [
+    "아동수당", "양육수당", "부모급여", "첫만남이용권", "첫만남", "기저귀바우처", "기저귀 바우처",
+    "발달재활서비스", "발달재활", "아이돌봄서비스", "아이돌봄", "언어치료", "두리활동", "영유아건강검진",
+]
+
+SUB_CATEGORIES = ["발달지연", "장애", "다문화", "한부모", "저소득"]
+
+PROFANITY = ["시발", "씨발", "ㅅㅂ", "ㅆㅂ", "병신", "ㅂㅅ", "개새끼", "좆", "존나", "fuck", "shit"]
+
+OUT_OF_SCOPE = ["날씨", "주식", "코인", "로또", "맛집", "영화", "weather", "stock"]
+
+# 이전 대화를 가리키는 표현 → 대화 맥락 해석이 필요하므로 LLM에 맡김
+HISTORY_REFERENCES = ["그거", "그것", "거기", "저거", "아까", "위에", "방금", "그럼"]
+
+# 나이/대상을 이어받을 최근 대화 수 (LLM 추출 프롬프트의 chat_history[-3:]와 동일)
+HISTORY_CONTEXT_TURNS = 3
+
+# 입력 전체가 아래 패턴과 일치할 때만 제어 의도로 판정 (공백/문장부호 제거 후 비교)
+_CONTROL_PATTERNS = [
+    ("exit", r"(종료|그만|그만할게|그만할래|끝|끝낼게|나갈게|bye|goodbye|exit|quit)(요|해줘|하기|할게요)?"),
+    ("reset", r"(처음으로|처음부터|초기화|리셋|다시시작|대화초기화|reset|restart)(해줘|할래|해주세요)?"),
+    ("show_more", r"(더|더보기|더보여줘|더보여주세요|더알려줘|더있어|더없어|다음|다음거|계속|다른거|다른거는|또|또있어|또뭐있어|more|next|showmore)(요)?"),
+    ("small_talk", r"(안녕|안녕하세요|하이|ㅎㅇ|반가워|반갑습니다|고마워|고맙습니다|감사|감사해요|감사합니다|땡큐|ㄱㅅ|hi|hello|hey|thanks|thankyou|xinchào|cảmơn|你好|谢谢)(요|용|~)*"),
+]
+
+_KOREAN_NUMERALS = {"한": 1, "두": 2, "세": 3, "네": 4, "다섯": 5, "여섯": 6, "일곱": 7}
+
+_PARTICLES = re.compile(r"(으로|에서|이요|은|는|이|가|을|를|에|의|도|로|요)$")
+_STOP_WORDS = {"있어", "있나요", "알려줘", "알려주세요", "궁금해", "뭐야", "어떻게", "방법", "해줘", "좀", "관련", "대한", "아기", "아이", "우리"}
+
+
+@dataclass
+class FastIntent:
+    info: Dict[str, Any]
+    confidence: float
+    reason: str = ""
+    handled: bool = field(init=False)
+
+    def __post_init__(self):
+        self.handled = self.confidence >= FAST_INTENT_THRESHOLD
+
+
+_stats = {"handled": 0, "deferred": 0}
+_stats_lock = threading.Lock()
+
+
+def get_fast_intent_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats["handled"] + stats["deferred"]
+    stats["handled_ratio"] = round(stats["handled"] / total, 3) if total else 0.0
+    return stats
+
+
+def _strip_system(question: str) -> str:
+    """프론트엔드가 붙이는 '(System: ... strictly in X)' 지시문 제거"""
+    return re.sub(r"\s*\(System[\s\S]*?\)", "", question, flags=re.IGNORECASE).strip()
+
+
+def extract_age_months(text: str) -> Optional[int]:
+    """'3살' → 36, '두 돌' → 24, '18개월' → 18, '신생아' → 0 (없으면 None)"""
+    m = re.search(r"(\d+)\s*개월", text)
+    if m: return int(m.group(1))
+    m = re.search(r"(\d+)\s*(살|세|돌)", text)
+    if m: return int(m.group(1)) * 12
+    m = re.search(r"(한|두|세|네|다섯|여섯|일곱)\s*(살|돌)", text)
+    if m: return _KOREAN_NUMERALS[m.group(1)] * 12
+    m = re.search(r"(\d+)\s*(months?|mos?)\b", text, flags=re.IGNORECASE)
+    if m: return int(m.group(1))
+    m = re.search(r"(\d+)\s*(years?|yrs?)\b", text, flags=re.IGNORECASE)
+    if m: return int(m.group(1)) * 12
+    if "신생아" in text: return 0
+    if "돌쟁이" in text or "돌아기" in text.replace(" ", ""): return 12
+    return None
+
+
+def _keywords(text: str) -> List[str]:
+    words = []
+    for token in re.sub(r"[^\w\s/]", " ", text).split():
+        token = _PARTICLES.sub("", token) if len(token) > 2 else token
+        if len(token) >= 2 and token not in _STOP_WORDS and not re.fullmatch(r"\d+(살|세|돌|개월)?", token):
+            words.append(token)
+    return words
+
+
+def _history_context(chat_history: Optional[list]) -> tuple:
+    """
+    [신규] 최근 사용자 발화에서 나이(개월)/대상 특성을 찾음 (가장 최근 값 우선)
+    "우리 아이 6개월이에요" → "어린이집 알려줘"처럼 앞에서 말한 나이를 LLM처럼 이어받기 위함
+    """
+    age, sub_category = None, None
+    for turn in reversed((chat_history or [])[-HISTORY_CONTEXT_TURNS:]):
+        if not isinstance(turn, dict) or turn.get("role") != "user":
+            continue
+        content = _strip_system(str(turn.get("content") or ""))
+        if age is None:
+            age = extract_age_months(content)
+        if sub_category is None:
+            compact = re.sub(r"\s+", "", content.lower())
+            sub_category = next((s for s in SUB_CATEGORIES if s in compact), None)
+    return age, sub_category
+
+
+def _result(intent=None, category=None, sub_category=None, age=None, keywords=None, confidence=0.0, reason=""):
+    info = {"intent": intent, "category": category, "sub_category": sub_category, "age": age, "keywords": keywords}
+    return FastIntent(info=info, confidence=confidence, reason=reason)
+
+
+def _classify(question: str, chat_history: Optional[list]) -> FastIntent:
+    text = _strip_system(question)
+    lowered = text.lower()
+    compact = re.sub(r"[\s.!?~,^ㅋㅠㅜ]+", "", lowered)
+    if not compact:
+        return _result(confidence=0.0, reason="empty")
+
+    # 1. 비속어
+    if any(word in compact for word in PROFANITY):
+        return _result(intent="safety_block", confidence=0.97, reason="profanity")
+
+    # 2. 제어 의도 (입력 전체가 패턴과 일치할 때만)
+    for intent, pattern in _CONTROL_PATTERNS:
+        if re.fullmatch(pattern, compact):
+            return _result(intent=intent, confidence=0.95, reason=f"pattern:{intent}")
+
+    # 외국어 질문은 번역/키워드 변환이 필요하므로 LLM에 맡김
+    if not re.search(r"[가-힣]", text):
+        return _result(confidence=0.1, reason="non_korean")
+
+    # 3. 복지와 무관한 질문
+    service_words = [w for words in GENERIC_CATEGORY_KEYWORDS.values() for w in words] + SPECIFIC_SERVICES
+    has_service_word = any(w.replace(" ", "") in compact for w in service_words)
+    if any(w in compact for w in OUT_OF_SCOPE) and not has_service_word:
+        return _result(intent="out_of_scope", confidence=0.9, reason="out_of_scope")
+
+    # 4. 검색 질문: 나이/대상/카테고리 추출
+    if chat_history and any(ref in compact for ref in HISTORY_REFERENCES):
+        return _result(confidence=0.3, reason="history_reference")
+
+    age = extract_age_months(text)
+    sub_category = next((s for s in SUB_CATEGORIES if s in compact), None)
+    keywords = _keywords(text)
+
+    # [수정] 이전 대화가 있으면 질문에 없는 나이/대상은 최근 사용자 발화에서 이어받음
+    if chat_history:
+        # 나이/대상만 답한 경우("6개월이에요")는 앞 질문의 카테고리를 이어받아야 하므로 LLM에 맡김
+        names_category = any(c.replace(" ", "") in compact for c in CATEGORIES)
+        if (age is not None or sub_category) and len(keywords) <= 2 and not has_service_word and not names_category:
+            return _result(sub_category=sub_category, age=age, confidence=0.4, reason="history_followup")
+        history_age, history_sub = _history_context(chat_history)
+        if age is None:
+            age = history_age
+        if sub_category is None:
+            sub_category = history_sub
+
+    # 카테고리 버튼 탭 ("6개월 아기 의료/재활")
+    exact = [c for c in CATEGORIES if c.replace(" ", "") in compact]
+    if len(exact) == 1:
+        return _result(category=exact[0], sub_category=sub_category, age=age, keywords=keywords or None,
+                       confidence=0.95, reason="category_name")
+
+    specific = [s for s in SPECIFIC_SERVICES if s.replace(" ", "") in compact]
+    if specific:
+        return _result(sub_category=sub_category, age=age, keywords=keywords or specific,
+                       confidence=0.9, reason="specific_service")
+
+    # 대상 특성 단어 안의 일반 용어는 제외 ("한부모" 속 "부모" → 가족 지원 아님)
+    generic_text = compact
+    for s in SUB_CATEGORIES:
+        generic_text = generic_text.replace(s, " ")
+    matched = {c for c, words in GENERIC_CATEGORY_KEYWORDS.items() if any(w in generic_text for w in words)}
+    if len(matched) == 1:
+        return _result(category=matched.pop(), sub_category=sub_category, age=age, keywords=keywords or None,
+                       confidence=0.85, reason="generic_category")
+    if len(matched) > 1:
+        return _result(sub_category=sub_category, age=age, keywords=keywords or None,
+                       confidence=0.5, reason="ambiguous_category")
+
+    # 나이/대상만 있고 서비스 단어가 없으면 카테고리 선택 요청
+    if (age is not None or sub_category) and len(keywords) <= 2:
+        return _result(intent="clarify_category", sub_category=sub_category, age=age,
+                       confidence=0.9, reason="age_or_target_only")
+
+    return _result(sub_category=sub_category, age=age, keywords=keywords or None, confidence=0.2, reason="unknown")
+
+
+def classify_intent_fast(question: str, chat_history: Optional[list] = None) -> FastIntent:
+    """
+    로컬 규칙으로 의도/카테고리/나이를 판별합니다.
+    result.handled가 True면 LLM 없이 result.info를 그대로 사용해도 됩니다.
+    """
+    result = _classify(question or "", chat_history)
+    with _stats_lock:
+        _stats["handled" if result.handled else "deferred"] += 1
+    return result
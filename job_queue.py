@@ -0,0 +1,372 @@
+"""
+[신규] 작업 큐 백엔드 (list / stream 선택: JOB_QUEUE_BACKEND)
+
+list (기존): API가 RPUSH → 워커가 BLPOP. 꺼낸 순간 큐에서 사라지므로
+            워커가 처리 중에 죽으면(OOM/강제 종료) 작업이 유실되고 사용자는 시간 초과까지 기다림.
+stream: Redis Streams 소비자 그룹
+  - API: XADD chatbot:job_stream (MAXLEN ~ JOB_STREAM_MAXLEN)
+  - 워커: XREADGROUP으로 받고, 결과 저장 후 XACK (+ XDEL로 스트림 정리)
+  - 확인(ack)되지 않은 채 JOB_VISIBILITY_TIMEOUT_SECONDS 이상 지난 작업은 다른 워커가 XAUTOCLAIM으로 가져감
+  - [수정] 처리 중인 작업은 가시성 시간의 1/3마다 XCLAIM ... JUSTID로 임대를 연장
+    → 오래 걸리지만 정상 진행 중인 작업은 회수되지 않고, 워커가 죽거나 멈춘 경우만 회수됨
+    (JOB_MAX_LEASE_SECONDS가 지나면 연장을 멈춤: 작업 하나가 무한정 붙잡히지 않도록)
+  - 배달 횟수가 JOB_MAX_DELIVERIES를 넘는 작업(워커를 계속 죽이는 작업)은 chatbot:job_stream:dlq로 옮김
+    → 워커가 오류 결과를 저장해 사용자 폴링이 바로 끝나도록 함
+
+워커와 API는 같은 JobQueue를 쓰며, 동기(redis_client) / 비동기(redis_async_client) 연결 모두 지원합니다.
+"""
+
+import os
+import time
+import socket
+import threading
+from dataclasses import dataclass
+from typing import Optional, List
+
+JOB_QUEUE_BACKEND = os.getenv("JOB_QUEUE_BACKEND", "list").lower()
+# 임대 연장이 끊긴 작업(워커 종료/멈춤)을 다른 워커가 가져가기까지의 시간
+# - 처리 중인 작업은 이 시간의 1/3마다 연장되므로 작업 처리 시간보다 짧아도 됨
+# - 프론트엔드 폴링 한도(120초)보다 짧아야 회수된 작업의 결과를 사용자가 받음
+JOB_VISIBILITY_TIMEOUT_SECONDS = float(os.getenv("JOB_VISIBILITY_TIMEOUT_SECONDS", "60"))
+# 작업 1건의 임대를 연장하는 최대 시간 (초): 처리가 멈춘 작업도 결국 회수되도록 (WORKER_STUCK_SECONDS와 같게)
+JOB_MAX_LEASE_SECONDS = float(os.getenv("JOB_MAX_LEASE_SECONDS", "300"))
+JOB_MAX_DELIVERIES = int(os.getenv("JOB_MAX_DELIVERIES", "3"))
+JOB_STREAM_MAXLEN = int(os.getenv("JOB_STREAM_MAXLEN", "10000"))
+
+JOB_QUEUE_KEY = "chatbot:job_queue"
+JOB_STREAM_KEY = "chatbot:job_stream"
+JOB_STREAM_GROUP = "workers"
+JOB_DLQ_KEY = "chatbot:job_stream:dlq"
+
+# 유휴 작업 회수 확인 주기 (초): 매 작업마다 XAUTOCLAIM을 호출하지 않도록
+RECLAIM_CHECK_SECONDS = 5.0
+
+
+@dataclass
+class QueuedJob:
+    payload: bytes
+    message_id: Optional[str] = None  # stream: ack/dead-letter에 쓰는 메시지 id
+    deliveries: int = 1               # 배달 횟수 (회수된 작업은 2 이상)
+
+
+def _decode(value) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+def _is_busygroup(e: Exception) -> bool:
+    return "BUSYGROUP" in str(e)
+
+
+def _is_nogroup(e: Exception) -> bool:
+    return "NOGROUP" in str(e)
+
+
+class JobQueue:
+    def __init__(self, backend: str = JOB_QUEUE_BACKEND, visibility_timeout: float = JOB_VISIBILITY_TIMEOUT_SECONDS,
+                 max_deliveries: int = JOB_MAX_DELIVERIES, maxlen: int = JOB_STREAM_MAXLEN,
+                 max_lease: float = JOB_MAX_LEASE_SECONDS):
+        if backend not in ("list", "stream"):
+            raise ValueError(f"JOB_QUEUE_BACKEND는 list 또는 stream이어야 합니다: {backend}")
+        self.backend = backend
+        self.visibility_ms = int(visibility_timeout * 1000)
+        self.max_deliveries = max_deliveries
+        self.maxlen = maxlen
+        self._group_ready = False
+        self._last_reclaim = 0.0
+        # [신규] 이 프로세스가 처리 중인 메시지 id → 받은 시각 (임대 연장 대상)
+        self.renew_interval = max(1.0, visibility_timeout / 3)
+        self.max_lease = max_lease
+        self._leases = {}
+        self._lease_lock = threading.Lock()
+        self._last_renew = 0.0
+        self._renewer: Optional[threading.Thread] = None
+        self.stats = dict.fromkeys(("enqueued", "delivered", "reclaimed", "acked", "dead_lettered",
+                                    "renewed", "lease_lost", "lease_expired"), 0)
+
+    @property
+    def is_stream(self) -> bool:
+        return self.backend == "stream"
+
+    @property
+    def consumer(self) -> str:
+        # fork 후에도 프로세스마다 다른 이름이 되도록 호출 시점의 pid 사용
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    def _reclaim_due(self) -> bool:
+        now = time.monotonic()
+        if now - self._last_reclaim < RECLAIM_CHECK_SECONDS:
+            return False
+        self._last_reclaim = now
+        return True
+
+    def _job_from_entry(self, message_id, fields, deliveries: int = 1) -> QueuedJob:
+        job = QueuedJob(payload=fields.get(b"job") or fields.get("job"), message_id=_decode(message_id),
+                        deliveries=deliveries)
+        with self._lease_lock:
+            self._leases[job.message_id] = time.monotonic()
+        return job
+
+    # --- [신규] 처리 중 작업의 임대 연장 ---
+    def release(self, job: QueuedJob):
+        """처리가 끝난 작업을 임대 연장 대상에서 제외 (ack/DLQ 시 자동, ack 없이 포기할 때 직접 호출)"""
+        if job.message_id is None:
+            return
+        with self._lease_lock:
+            self._leases.pop(job.message_id, None)
+
+    def _leases_due(self) -> List[str]:
+        """연장할 메시지 id (주기가 안 됐으면 빈 목록). 최대 임대 시간이 지난 작업은 연장을 멈춤"""
+        now = time.monotonic()
+        with self._lease_lock:
+            if not self._leases or now - self._last_renew < self.renew_interval:
+                return []
+            self._last_renew = now
+            expired = [mid for mid, taken_at in self._leases.items() if now - taken_at > self.max_lease]
+            for mid in expired:
+                del self._leases[mid]
+            ids = list(self._leases)
+        if expired:
+            self.stats["lease_expired"] += len(expired)
+            print(f"⚠️ [JobQueue] {self.max_lease:.0f}초 넘게 처리 중인 작업 {len(expired)}건 → 임대 연장 중단 (다른 워커가 회수)")
+        return ids
+
+    def _split_owned(self, ids: List[str], pending: list) -> List[str]:
+        """아직 이 소비자 소유인 id만 남김 (이미 다른 워커가 회수한 작업을 XCLAIM으로 빼앗지 않도록)"""
+        owned = {_decode(entry["message_id"]) for entry in pending}
+        with self._lease_lock:
+            # 조회 사이에 ack된 작업은 제외 (이미 release됨)
+            lost = [mid for mid in ids if mid not in owned and mid in self._leases]
+            for mid in lost:
+                del self._leases[mid]
+        if lost:
+            self.stats["lease_lost"] += len(lost)
+            print(f"⚠️ [JobQueue] 처리 중인 작업 {len(lost)}건이 이미 회수됨 (연장이 늦음) → 중복 처리될 수 있음")
+        return [mid for mid in ids if mid in owned]
+
+    def renew(self, conn):
+        """[워커] 처리 중인 작업의 유휴 시간을 0으로 (XCLAIM JUSTID: 배달 횟수는 늘지 않음)"""
+        if not self.is_stream:
+            return
+        ids = self._leases_due()
+        if not ids:
+            return
+        pending = conn.xpending_range(JOB_STREAM_KEY, JOB_STREAM_GROUP, "-", "+", max(100, len(ids) * 2),
+                                      consumername=self.consumer)
+        owned = self._split_owned(ids, pending)
+        if owned:
+            conn.xclaim(JOB_STREAM_KEY, JOB_STREAM_GROUP, self.consumer, min_idle_time=0,
+                        message_ids=owned, justid=True)
+            self.stats["renewed"] += len(owned)
+
+    async def renew_async(self, conn):
+        if not self.is_stream:
+            return
+        ids = self._leases_due()
+        if not ids:
+            return
+        pending = await conn.xpending_range(JOB_STREAM_KEY, JOB_STREAM_GROUP, "-", "+", max(100, len(ids) * 2),
+                                            consumername=self.consumer)
+        owned = self._split_owned(ids, pending)
+        if owned:
+            await conn.xclaim(JOB_STREAM_KEY, JOB_STREAM_GROUP, self.consumer, min_idle_time=0,
+                              message_ids=owned, justid=True)
+            self.stats["renewed"] += len(owned)
+
+    def start_renewer(self, conn):
+        """[동기 워커] 작업 처리 중에도 임대를 연장하는 백그라운드 스레드 (fork 후 워커에서 호출)"""
+        if not self.is_stream or self._renewer is not None:
+            return
+
+        def _run():
+            while True:
+                time.sleep(1.0)
+                try:
+                    self.renew(conn)
+                except Exception as e:
+                    print(f"⚠️ [JobQueue] 임대 연장 실패: {e}")
+
+        self._renewer = threading.Thread(target=_run, name="job-lease", daemon=True)
+        self._renewer.start()
+
+    # --- 동기 (워커) ---
+    def _ensure_group(self, conn):
+        if self._group_ready:
+            return
+        try:
+            # id=0: 그룹이 생기기 전에 API가 넣은 작업도 처리
+            conn.xgroup_create(JOB_STREAM_KEY, JOB_STREAM_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if not _is_busygroup(e):
+                raise
+        self._group_ready = True
+
+    def enqueue(self, conn, payload: bytes):
+        if self.is_stream:
+            conn.xadd(JOB_STREAM_KEY, {"job": payload}, maxlen=self.maxlen, approximate=True)
+        else:
+            conn.rpush(JOB_QUEUE_KEY, payload)
+        self.stats["enqueued"] += 1
+
+    def _reclaim(self, conn) -> Optional[QueuedJob]:
+        if not self._reclaim_due():
+            return None
+        _, entries, *_ = conn.xautoclaim(JOB_STREAM_KEY, JOB_STREAM_GROUP, self.consumer,
+                                         min_idle_time=self.visibility_ms, start_id="0-0", count=1)
+        if not entries:
+            return None
+        message_id, fields = entries[0]
+        pending = conn.xpending_range(JOB_STREAM_KEY, JOB_STREAM_GROUP, message_id, message_id, 1)
+        deliveries = pending[0]["times_delivered"] if pending else 2
+        self._last_reclaim = 0.0  # 더 남아 있을 수 있으므로 다음 호출에서 다시 확인
+        self.stats["reclaimed"] += 1
+        return self._job_from_entry(message_id, fields or {}, deliveries)
+
+    def pop(self, conn, timeout: float = 1.0) -> Optional[QueuedJob]:
+        """작업 1건 (없으면 timeout초 대기 후 None)"""
+        if not self.is_stream:
+            result = conn.blpop(JOB_QUEUE_KEY, timeout=timeout)
+            if not result:
+                return None
+            self.stats["delivered"] += 1
+            return QueuedJob(payload=result[1])
+        self._ensure_group(conn)
+        try:
+            job = self._reclaim(conn)
+            if job is not None:
+                return job
+            response = conn.xreadgroup(JOB_STREAM_GROUP, self.consumer, {JOB_STREAM_KEY: ">"}, count=1,
+                                       block=int(timeout * 1000))
+        except Exception as e:
+            if _is_nogroup(e):
+                self._group_ready = False  # 스트림이 삭제됨 (관리자 초기화 등) → 다음 호출에서 그룹 다시 생성
+            raise
+        if not response:
+            return None
+        message_id, fields = response[0][1][0]
+        self.stats["delivered"] += 1
+        return self._job_from_entry(message_id, fields)
+
+    def ack(self, conn, job: QueuedJob):
+        """결과 저장 후 호출 (list는 꺼낼 때 이미 삭제됨)"""
+        if not self.is_stream or job.message_id is None:
+            return
+        pipe = conn.pipeline()
+        pipe.xack(JOB_STREAM_KEY, JOB_STREAM_GROUP, job.message_id)
+        pipe.xdel(JOB_STREAM_KEY, job.message_id)
+        pipe.execute()
+        self.stats["acked"] += 1
+        self.release(job)
+
+    def dead_letter(self, conn, job: QueuedJob, reason: str):
+        """처리할 수 없는 작업을 DLQ 스트림으로 옮기고 원래 메시지는 ack"""
+        if not self.is_stream or job.message_id is None:
+            return
+        pipe = conn.pipeline()
+        pipe.xadd(JOB_DLQ_KEY, {"job": job.payload, "reason": reason, "message_id": job.message_id,
+                                "deliveries": job.deliveries}, maxlen=self.maxlen, approximate=True)
+        pipe.xack(JOB_STREAM_KEY, JOB_STREAM_GROUP, job.message_id)
+        pipe.xdel(JOB_STREAM_KEY, job.message_id)
+        pipe.execute()
+        self.stats["dead_lettered"] += 1
+        self.release(job)
+
+    # --- 비동기 (API / 비동기 워커) ---
+    async def _ensure_group_async(self, conn):
+        if self._group_ready:
+            return
+        try:
+            await conn.xgroup_create(JOB_STREAM_KEY, JOB_STREAM_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if not _is_busygroup(e):
+                raise
+        self._group_ready = True
+
+    async def enqueue_async(self, conn, payload: bytes):
+        if self.is_stream:
+            await conn.xadd(JOB_STREAM_KEY, {"job": payload}, maxlen=self.maxlen, approximate=True)
+        else:
+            await conn.rpush(JOB_QUEUE_KEY, payload)
+        self.stats["enqueued"] += 1
+
+    async def _reclaim_async(self, conn) -> Optional[QueuedJob]:
+        if not self._reclaim_due():
+            return None
+        _, entries, *_ = await conn.xautoclaim(JOB_STREAM_KEY, JOB_STREAM_GROUP, self.consumer,
+                                               min_idle_time=self.visibility_ms, start_id="0-0", count=1)
+        if not entries:
+            return None
+        message_id, fields = entries[0]
+        pending = await conn.xpending_range(JOB_STREAM_KEY, JOB_STREAM_GROUP, message_id, message_id, 1)
+        deliveries = pending[0]["times_delivered"] if pending else 2
+        self._last_reclaim = 0.0
+        self.stats["reclaimed"] += 1
+        return self._job_from_entry(message_id, fields or {}, deliveries)
+
+    async def pop_async(self, conn, timeout: float = 1.0) -> Optional[QueuedJob]:
+        if not self.is_stream:
+            result = await conn.blpop(JOB_QUEUE_KEY, timeout=timeout)
+            if not result:
+                return None
+            self.stats["delivered"] += 1
+            return QueuedJob(payload=result[1])
+        await self._ensure_group_async(conn)
+        try:
+            job = await self._reclaim_async(conn)
+            if job is not None:
+                return job
+            response = await conn.xreadgroup(JOB_STREAM_GROUP, self.consumer, {JOB_STREAM_KEY: ">"}, count=1,
+                                             block=int(timeout * 1000))
+        except Exception as e:
+            if _is_nogroup(e):
+                self._group_ready = False
+            raise
+        if not response:
+            return None
+        message_id, fields = response[0][1][0]
+        self.stats["delivered"] += 1
+        return self._job_from_entry(message_id, fields)
+
+    async def ack_async(self, conn, job: QueuedJob):
+        if not self.is_stream or job.message_id is None:
+            return
+        pipe = conn.pipeline()
+        pipe.xack(JOB_STREAM_KEY, JOB_STREAM_GROUP, job.message_id)
+        pipe.xdel(JOB_STREAM_KEY, job.message_id)
+        await pipe.execute()
+        self.stats["acked"] += 1
+        self.release(job)
+
+    async def dead_letter_async(self, conn, job: QueuedJob, reason: str):
+        if not self.is_stream or job.message_id is None:
+            return
+        pipe = conn.pipeline()
+        pipe.xadd(JOB_DLQ_KEY, {"job": job.payload, "reason": reason, "message_id": job.message_id,
+                                "deliveries": job.deliveries}, maxlen=self.maxlen, approximate=True)
+        pipe.xack(JOB_STREAM_KEY, JOB_STREAM_GROUP, job.message_id)
+        pipe.xdel(JOB_STREAM_KEY, job.message_id)
+        await pipe.execute()
+        self.stats["dead_lettered"] += 1
+        self.release(job)
+
+    # --- 운영 지표 ---
+    def depth(self, conn) -> dict:
+        """[API] /admin/stats: 대기 작업 수 (stream이면 처리 중 / DLQ 포함)"""
+        try:
+            if not self.is_stream:
+                return {"backend": "list", "queued": conn.llen(JOB_QUEUE_KEY)}
+            info = {"backend": "stream", "stream_length": conn.xlen(JOB_STREAM_KEY), "dead_letters": conn.xlen(JOB_DLQ_KEY)}
+            try:
+                summary = conn.xpending(JOB_STREAM_KEY, JOB_STREAM_GROUP)
+                info["pending"] = summary.get("pending", 0)
+                info["consumers_with_pending"] = len(summary.get("consumers") or [])
+            except Exception:
+                info["pending"] = 0  # 아직 워커가 그룹을 만들지 않음
+            return info
+        except Exception as e:
+            return {"backend": self.backend, "error": str(e)}
+
+    def snapshot(self) -> dict:
+        with self._lease_lock:
+            leased = len(self._leases)
+        return dict(self.stats, backend=self.backend, visibility_timeout_s=self.visibility_ms / 1000,
+                    max_deliveries=self.max_deliveries, leased=leased)
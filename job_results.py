@@ -0,0 +1,202 @@
+"""
+[신규] 작업 결과 저장소 (작업별 키 + TTL + 압축)
+
+기존에는 모든 결과를 하나의 해시(chatbot:job_results)에 HSET하고 만료를 두지 않아,
+/admin/clear_cache를 실행하기 전까지 지금까지 보낸 모든 답변 HTML이 Redis에 쌓였습니다.
+
+- 결과는 chatbot:job_result:{job_id} 문자열 키에 저장, 보관 기간(TTL)이 지나면 Redis가 삭제
+  - 정상 답변: JOB_RESULT_TTL_SECONDS (기본 1시간, 피드백/더보기까지 충분)
+  - 오류 결과: JOB_RESULT_ERROR_TTL_SECONDS (기본 5분, 사용자가 폴링을 끝낼 만큼만)
+- JOB_RESULT_COMPRESS_MIN_BYTES 이상인 결과는 zlib 압축 ("Z:" 접두사로 구분, 카드 HTML은 보통 1/4 이하로 줄어듦)
+- 읽기: 작업별 키 → 없으면 기존 해시 (배포 전환 중 이전 워커가 저장한 결과)
+- result_store_report(): /admin/stats용 결과 수 / 표본 크기 기반 메모리 추정 / 압축 비율
+- [신규] 완료 알림: 결과 저장과 함께 chatbot:job_done 채널에 job_id 발행
+  → API의 ResultWaiter(구독 연결 1개)가 /get_result?wait=N 요청을 깨움 (1초 폴링 대체)
+"""
+
+import os
+import json
+import zlib
+import asyncio
+from collections import defaultdict
+from typing import Optional, Dict, Set
+
+JOB_RESULT_PREFIX = "chatbot:job_result:"
+LEGACY_JOB_RESULTS_KEY = "chatbot:job_results"
+
+JOB_RESULT_TTL_SECONDS = int(os.getenv("JOB_RESULT_TTL_SECONDS", "3600"))
+JOB_RESULT_ERROR_TTL_SECONDS = int(os.getenv("JOB_RESULT_ERROR_TTL_SECONDS", "300"))
+# 0이면 압축하지 않음
+JOB_RESULT_COMPRESS_MIN_BYTES = int(os.getenv("JOB_RESULT_COMPRESS_MIN_BYTES", "1024"))
+
+_COMPRESSED_MARK = b"Z:"
+
+JOB_DONE_CHANNEL = "chatbot:job_done"
+# 롱 폴링 대기 중 저장소를 다시 확인하는 주기 (초): 구독 재연결 중 놓친 알림이 있어도 이 시간 안에 응답
+WAIT_RECHECK_SECONDS = 5.0
+
+# 메모리 보고 시 크기를 재는 표본 키 수
+REPORT_SAMPLE_KEYS = 200
+
+
+def result_key(job_id: str) -> str:
+    return JOB_RESULT_PREFIX + job_id
+
+
+def encode_result(result: dict) -> bytes:
+    raw = json.dumps(result, ensure_ascii=False).encode("utf-8")
+    if JOB_RESULT_COMPRESS_MIN_BYTES and len(raw) >= JOB_RESULT_COMPRESS_MIN_BYTES:
+        packed = _COMPRESSED_MARK + zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            return packed
+    return raw
+
+
+def decode_result(data: bytes) -> dict:
+    if data.startswith(_COMPRESSED_MARK):
+        data = zlib.decompress(data[len(_COMPRESSED_MARK):])
+    return json.loads(data.decode("utf-8"))
+
+
+def _ttl_for(result: dict) -> int:
+    return JOB_RESULT_ERROR_TTL_SECONDS if result.get("status") == "error" else JOB_RESULT_TTL_SECONDS
+
+
+def store_result(conn, job_id: str, result: dict):
+    """[워커] 결과 저장 (TTL 포함) + 완료 알림"""
+    pipe = conn.pipeline()
+    pipe.set(result_key(job_id), encode_result(result), ex=_ttl_for(result))
+    pipe.publish(JOB_DONE_CHANNEL, job_id)
+    pipe.execute()
+
+
+async def store_result_async(conn, job_id: str, result: dict):
+    pipe = conn.pipeline()
+    pipe.set(result_key(job_id), encode_result(result), ex=_ttl_for(result))
+    pipe.publish(JOB_DONE_CHANNEL, job_id)
+    await pipe.execute()
+
+
+def load_result(conn, job_id: str) -> Optional[dict]:
+    """[API] 결과 조회 (없으면 None)"""
+    data = conn.get(result_key(job_id))
+    if data is None:
+        data = conn.hget(LEGACY_JOB_RESULTS_KEY, job_id)
+        if data is None:
+            return None
+    return decode_result(data)
+
+
+async def load_result_async(conn, job_id: str) -> Optional[dict]:
+    data = await conn.get(result_key(job_id))
+    if data is None:
+        data = await conn.hget(LEGACY_JOB_RESULTS_KEY, job_id)
+        if data is None:
+            return None
+    return decode_result(data)
+
+
+class ResultWaiter:
+    """
+    [API] 롱 폴링: 결과가 저장될 때까지(또는 timeout까지) 비동기로 대기
+    - 프로세스당 구독 연결 1개 (chatbot:job_done), job_id별 Future를 깨움
+    - Future 등록 → 저장소 확인 순서라서, 확인 직후 저장된 결과의 알림도 놓치지 않음
+    """
+
+    def __init__(self, redis_async, channel: str = JOB_DONE_CHANNEL, recheck_seconds: float = WAIT_RECHECK_SECONDS):
+        self.redis = redis_async
+        self.channel = channel
+        self.recheck_seconds = recheck_seconds
+        self._waiters: Dict[str, Set[asyncio.Future]] = defaultdict(set)
+        self._listener: Optional[asyncio.Task] = None
+        self.stats = dict.fromkeys(("waits", "immediate", "waited", "timeouts", "listener_errors"), 0)
+
+    def _ensure_listener(self):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+    async def _listen(self):
+        backoff = 1.0
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.channel)
+                backoff = 1.0
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    job_id = message["data"].decode("utf-8") if isinstance(message["data"], bytes) else message["data"]
+                    for future in self._waiters.pop(job_id, ()):
+                        if not future.done():
+                            future.set_result(True)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.stats["listener_errors"] += 1
+                print(f"⚠️ [ResultWaiter] 구독 오류 → {backoff:.0f}초 후 재연결 (대기 요청은 {self.recheck_seconds:.0f}초마다 직접 확인): {e}")
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                try:
+                    await pubsub.aclose()
+                except Exception:
+                    pass
+
+    async def wait(self, job_id: str, timeout: float) -> Optional[dict]:
+        """결과 dict 또는 timeout 동안 없으면 None"""
+        self.stats["waits"] += 1
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        self._ensure_listener()
+        first = True
+        while True:
+            future = loop.create_future()
+            self._waiters[job_id].add(future)
+            try:
+                result = await load_result_async(self.redis, job_id)
+                if result is not None:
+                    self.stats["immediate" if first else "waited"] += 1
+                    return result
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    self.stats["timeouts"] += 1
+                    return None
+                try:
+                    await asyncio.wait_for(future, timeout=min(remaining, self.recheck_seconds))
+                except asyncio.TimeoutError:
+                    pass
+            finally:
+                waiters = self._waiters.get(job_id)
+                if waiters is not None:
+                    waiters.discard(future)
+                    if not waiters:
+                        self._waiters.pop(job_id, None)
+            first = False
+
+    def snapshot(self) -> dict:
+        return dict(self.stats, waiting_jobs=len(self._waiters),
+                    listening=self._listener is not None and not self._listener.done())
+
+
+def result_store_report(conn) -> dict:
+    """[API] /admin/stats: 저장된 결과 수와 메모리 추정 (표본 키의 STRLEN 평균 × 키 수)"""
+    report = {"ttl_seconds": JOB_RESULT_TTL_SECONDS, "error_ttl_seconds": JOB_RESULT_ERROR_TTL_SECONDS,
+              "compress_min_bytes": JOB_RESULT_COMPRESS_MIN_BYTES}
+    if conn is None:
+        return report
+    try:
+        keys = list(conn.scan_iter(match=JOB_RESULT_PREFIX + "*", count=1000))
+        sample = keys[:REPORT_SAMPLE_KEYS]
+        pipe = conn.pipeline()
+        for key in sample:
+            pipe.strlen(key)
+            pipe.getrange(key, 0, len(_COMPRESSED_MARK) - 1)
+        replies = pipe.execute() if sample else []
+        sizes, marks = replies[0::2], replies[1::2]
+        avg = sum(sizes) / len(sizes) if sizes else 0.0
+        report.update(results=len(keys), avg_bytes=round(avg, 1), estimated_bytes=int(avg * len(keys)),
+                      compressed_share=round(sum(m == _COMPRESSED_MARK for m in marks) / len(marks), 3) if marks else None,
+                      legacy_hash_results=conn.hlen(LEGACY_JOB_RESULTS_KEY))
+    except Exception as e:
+        report["error"] = str(e)
+    return report
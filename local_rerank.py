@@ -0,0 +1,114 @@
+"""
+[신규] 로컬 1차 재정렬 (LLM 랭킹 전 Confidence Gate)
+
+rerank_search_results는 매 검색마다 후보 15개(본문 500자씩)를 Gemini에 보내므로
+process_job에서 가장 느리고 비싼 단계입니다. 검색 결과에 이미 있는 신호로 먼저 점수를 매기고,
+화면에 나가는 상위 2개가 나머지와 충분히 벌어져 있으면(확신) LLM 없이 그 순서를 그대로 씁니다.
+
+신호: 벡터 유사도 / check_title_match / 제목·본문 키워드 겹침(글자 2-gram) / 카테고리 일치 / 나이 대상 여부
+
+평가: python -m bench.eval_rerank (LLM 생략 비율, 상위 2개 변화율)
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Any, Callable
+
+from bm25_index import tokenize
+from search_index import age_eligible
+
+# 1위와 2위, 또는 상위 2개(화면 노출)와 3위의 점수 차가 이 값 이상이면 LLM 랭킹 생략
+LOCAL_RERANK_MARGIN = float(os.getenv("LOCAL_RERANK_MARGIN", "0.15"))
+# 1위 점수가 이 값 미만이면(전부 애매한 후보) 차이와 관계없이 LLM에 맡김
+LOCAL_RERANK_MIN_TOP = float(os.getenv("LOCAL_RERANK_MIN_TOP", "0.6"))
+DISPLAY_COUNT = 2
+
+# 신호별 가중치
+WEIGHT_SIMILARITY = 1.0
+WEIGHT_TITLE_MATCH = 0.4      # check_title_match: 1.5(일치) → +0.2, 0.7(불일치) → -0.12
+WEIGHT_TITLE_OVERLAP = 0.35   # 질문 토큰 중 제목에 있는 비율
+WEIGHT_CONTENT_OVERLAP = 0.1  # 질문 토큰 중 본문에 있는 비율
+WEIGHT_CATEGORY = 0.08
+WEIGHT_AGE = 0.1              # 나이 조건을 벗어난 문서 감점
+
+# 어느 제목에나 있거나 질문 어미에서 나오는 토큰은 겹침 계산에서 제외
+_STOP_TOKENS = {"아이", "아기", "지원", "신청", "방법", "받을", "있나", "나요", "어요", "해요", "려면", "싶어", "어디", "얼마", "뭐"}
+
+
+@dataclass
+class LocalRanking:
+    ranked: List[Dict[str, Any]]
+    scores: List[float]
+    margin: float
+    confident: bool
+
+
+_stats = {"local": 0, "llm": 0}
+_stats_lock = threading.Lock()
+
+
+def get_local_rerank_stats() -> dict:
+    with _stats_lock:
+        stats = dict(_stats)
+    total = stats["local"] + stats["llm"]
+    stats["skip_ratio"] = round(stats["local"] / total, 3) if total else 0.0
+    return stats
+
+
+def record_decision(confident: bool):
+    with _stats_lock:
+        _stats["local" if confident else "llm"] += 1
+
+
+def _normalize_category(category: Optional[str]) -> str:
+    # KEYWORD_CATEGORY_MAP은 "의료재활", DB는 "의료/재활" 형태라 구분자를 빼고 비교
+    return (category or "").replace("/", "").replace(" ", "")
+
+
+def _overlap(query_tokens: set, text: str) -> float:
+    if not query_tokens:
+        return 0.0
+    return len(query_tokens & set(tokenize(text))) / len(query_tokens)
+
+
+def score_candidate(question: str, doc: Dict[str, Any], query_tokens: set, category: Optional[str],
+                    age: Optional[int], title_match: Optional[Callable[[str, str], float]] = None) -> float:
+    meta = doc.get("metadata") or {}
+    title = meta.get("title") or ""
+    score = WEIGHT_SIMILARITY * float(doc.get("similarity") or 0.0)
+    if title_match is not None:
+        score += WEIGHT_TITLE_MATCH * (title_match(question, title) - 1.0)
+    score += WEIGHT_TITLE_OVERLAP * _overlap(query_tokens, title)
+    score += WEIGHT_CONTENT_OVERLAP * _overlap(query_tokens, (doc.get("content") or "")[:1000])
+    if category and _normalize_category(meta.get("category")) == _normalize_category(category):
+        score += WEIGHT_CATEGORY
+    if age is not None and not age_eligible(meta, age):
+        score -= WEIGHT_AGE
+    return score
+
+
+def rank_locally(question: str, candidates: List[Dict[str, Any]], extracted_info: Optional[dict] = None,
+                 title_match: Optional[Callable[[str, str], float]] = None) -> LocalRanking:
+    """후보를 로컬 점수로 정렬하고, 상위 2개가 확실한지(confident) 판정합니다."""
+    info = extracted_info or {}
+    age = info.get("age") if isinstance(info.get("age"), int) and not isinstance(info.get("age"), bool) else None
+    query_tokens = set(tokenize(question))
+    for keyword in info.get("search_keywords") or []:
+        query_tokens.update(tokenize(keyword))
+    query_tokens -= _STOP_TOKENS
+
+    scored = [(score_candidate(question, doc, query_tokens, info.get("category"), age, title_match), i, doc)
+              for i, doc in enumerate(candidates)]
+    # 동점이면 검색 엔진 순서 유지
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    scores = [s for s, _, _ in scored]
+
+    if len(scores) <= DISPLAY_COUNT:
+        # 후보가 2개 이하면 LLM이 골라도 둘 다 노출되므로 순서만 로컬로 정함
+        margin, confident = float("inf"), True
+    else:
+        # 1위가 확실하거나(1위-2위), 노출되는 2개가 확실하면(2위-3위) LLM이 바꿀 여지가 작음
+        margin = max(scores[0] - scores[1], scores[DISPLAY_COUNT - 1] - scores[DISPLAY_COUNT])
+        confident = scores[0] >= LOCAL_RERANK_MIN_TOP and margin >= LOCAL_RERANK_MARGIN
+    return LocalRanking(ranked=[doc for _, _, doc in scored], scores=scores, margin=margin, confident=confident)
@@ -2,6 +2,7 @@
 import os
 import json
 import uuid
+import time
 import logging
 import asyncio
 import secrets  # [추가] 보안 토큰 생성
@@ -28,11 +29,28 @@ from utils import (
     extract_info_from_question_async, # [신규]
     notion,   
     supabase, 
+    NOTION_RETRY,
+    get_retry_stats,
+    get_breaker_states, get_hedge_stats, get_embedding_stats, get_fast_intent_stats,
+    get_search_phase_stats, get_local_rerank_stats, get_expand_stats,
+    RERANK_CACHE,
+    ANSWER_CACHE,
+    SEARCH_INDEX,
+    GENAI_POOL,
     # 임시: 비동기 함수들 import 오류 방지
     # supabase_async, search_supabase_async, check_semantic_cache_async
     # save_semantic_cache_async, get_gemini_embedding_async
     DATABASE_IDS                   
 )
+from supervisor import list_live_workers  # [신규] 워커 하트비트 조회
+from job_queue import JobQueue  # [신규] 작업 큐 백엔드 (list / stream)
+from job_results import (  # [신규] 작업별 결과 키 + 완료 알림 롱 폴링
+    load_result_async, result_store_report, ResultWaiter, JOB_RESULT_PREFIX, LEGACY_JOB_RESULTS_KEY
+)
+# [신규] 동일 질문 요청 병합 (Single-flight)
+from coalescing import (
+    SingleFlight, make_coalesce_key, claim_inflight_async, release_inflight_async, get_coalesce_stats
+)
 
 # ------------------------------------
 # [최적화] 설정 상수 정의
@@ -74,6 +92,10 @@ def wake_up_supabase():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """FastAPI 수명 주기 관리: 시작/종료 시 스케줄러 제어"""
+    # [신규] 로컬 검색 인덱스 미리 적재 (백그라운드, 적재 전 요청은 Supabase RPC 사용)
+    if SEARCH_INDEX is not None:
+        SEARCH_INDEX.load_in_background()
+
     # Vercel 환경에서는 스케줄러 비활성화
     if os.getenv("VERCEL_ENV") or os.getenv("FORCE_SYNC_MODE"):
         logger.info("🔄 [Vercel] 스케줄러 비활성화 (서버리스 환경)")
@@ -128,8 +150,14 @@ if os.path.exists("static"):
     app.mount("/static", StaticFiles(directory="static"), name="static")
 
 # --- Redis 키 이름 ---
-JOB_QUEUE_KEY = "chatbot:job_queue"
-JOB_RESULTS_KEY = "chatbot:job_results"
+JOB_QUEUE = JobQueue()  # [수정] JOB_QUEUE_BACKEND=stream이면 Redis Streams (워커와 같은 설정이어야 함)
+# [신규] /get_result 롱 폴링: 요청당 최대 대기 시간 (초)
+# 프록시 유휴 타임아웃 / 서버리스 함수 실행 시간 제한보다 짧아야 함 (짧으면 클라이언트가 다시 요청할 뿐)
+RESULT_LONG_POLL_MAX_SECONDS = float(os.getenv("RESULT_LONG_POLL_MAX_SECONDS", "25"))
+RESULT_WAITER = ResultWaiter(redis_async_client) if redis_async_client else None
+
+# [신규] 동기 모드에서 같은 질문의 process_job 실행을 하나로 합침
+CHAT_SINGLE_FLIGHT = SingleFlight()
 
 # --- 요청 모델 ---
 class ChatRequest(BaseModel):
@@ -242,6 +270,13 @@ def debug_check():
     except Exception as e:
         results["gemini_embed"] = f"❌ Error: {type(e).__name__}: {str(e)[:100]}"
     
+    # 2.5 [신규] 키별 GenAI Client 상태
+    try:
+        from utils import GENAI_POOL
+        results["gemini_keys"] = GENAI_POOL.snapshot()
+    except Exception as e:
+        results["gemini_keys"] = f"❌ Error: {type(e).__name__}: {str(e)[:100]}"
+    
     # 3. Redis 연결 테스트
     try:
         if redis_client:
@@ -254,18 +289,45 @@ def debug_check():
     
     return results
 
+@app.get("/admin/stats")
+def admin_stats(secret: str = Query(None)):
+    """[신규] 운영 지표: 호출 지점별 재시도 카운터(retry_ratio가 높으면 재시도 폭주), 키별 상태, 차단기 상태"""
+    if secret != ADMIN_SECRET_KEY: raise HTTPException(status_code=401, detail="Unauthorized")
+    return {
+        "retries": get_retry_stats(),
+        "gemini_keys": GENAI_POOL.snapshot(),
+        "circuits": get_breaker_states(),
+        "hedging": get_hedge_stats(),
+        "coalescing": get_coalesce_stats(),
+        "embedding": get_embedding_stats(),
+        "fast_intent": get_fast_intent_stats(),
+        "search_index": SEARCH_INDEX.snapshot() if SEARCH_INDEX else None,
+        "search_phases": get_search_phase_stats(),
+        "local_rerank": get_local_rerank_stats(),
+        "rerank_cache": RERANK_CACHE.snapshot(),
+        "expansion": get_expand_stats(),
+        "answer_cache": ANSWER_CACHE.snapshot() if ANSWER_CACHE else None,
+        "workers": list_live_workers(redis_client),  # [신규] 살아 있는 워커 프로세스 (Redis 하트비트)
+        "job_queue": JOB_QUEUE.depth(redis_client),   # [신규] 대기/처리 중/DLQ 작업 수
+        "job_results": result_store_report(redis_client),  # [신규] 저장된 결과 수 / 메모리 추정
+        "long_poll": RESULT_WAITER.snapshot() if RESULT_WAITER else None,  # [신규] /get_result?wait 대기 현황
+    }
+
 @app.post("/admin/clear_cache")
 def clear_all_caches(secret: str = Query(None)):
     if secret != ADMIN_SECRET_KEY: raise HTTPException(status_code=401, detail="Unauthorized")
     try:
         logger.warning("--- 🔒 관리자 요청: Redis 캐시 초기화 ---")
         keys_to_delete = []
-        for key_pattern in ["extract:*", "rank:*", "summary:*"]:
+        for key_pattern in ["extract:*", "extract_v*", "rank:*", "expand:*", "sem:*", "summary:*", JOB_RESULT_PREFIX + "*"]:
             keys_to_delete.extend(redis_client.keys(key_pattern))
         if keys_to_delete:
             redis_client.delete(*keys_to_delete)
         redis_client.delete(MAIN_ANSWER_CACHE_KEY) 
-        redis_client.delete(JOB_RESULTS_KEY)
+        redis_client.delete(LEGACY_JOB_RESULTS_KEY)
+        # [신규] 이 프로세스(동기 모드)의 답변 캐시 메모리도 비움 (워커는 재시작 또는 인덱스 버전 변경 시 정리)
+        if ANSWER_CACHE is not None:
+            ANSWER_CACHE.clear()
         return {"status": "Redis 캐시 삭제 완료"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"오류: {e}")
@@ -387,12 +449,20 @@ async def chat_with_bot(chat_request: ChatRequest, request: Request):
     
     job_id = str(uuid.uuid4())
     ai_category = extracted_info.get("category") if isinstance(extracted_info, dict) else None
+    # [신규] 의도 추출 결과(나이/대상/확장 검색어)를 함께 넘겨 worker가 LLM을 다시 호출하지 않도록 함
+    job_extracted_info = {k: extracted_info.get(k) for k in ("category", "sub_category", "age", "search_keywords")}
+    
+    # [수정] 정규화된 질문 + 답변 언어 + 카테고리 + 나이/대상/검색어가 같을 때만 진행 중인 작업에 합류
+    coalesce_key = make_coalesce_key(question, ai_category, job_extracted_info)
     
     job_data = {
         "job_id": job_id, 
         "question": question, 
         "chat_history": chat_history,
-        "ai_category": ai_category
+        "ai_category": ai_category,
+        "extracted_info": job_extracted_info,
+        "coalesce_key": coalesce_key,
+        "enqueued_at": time.time()  # [신규] 워커가 큐 대기 시간을 기록
     }
 
     # [핵심 수정] Redis가 죽었으면 -> 동기 모드(직접 실행)
@@ -403,7 +473,8 @@ async def chat_with_bot(chat_request: ChatRequest, request: Request):
             
             # 비동기 실행 (ThreadPoolExecutor에 위임하여 블로킹 방지)
             loop = asyncio.get_event_loop()
-            result = await loop.run_in_executor(None, process_job, job_data)
+            # [수정] 같은 질문이 이미 처리 중이면 그 결과를 함께 기다림
+            result = await CHAT_SINGLE_FLIGHT.do(coalesce_key, lambda: loop.run_in_executor(None, process_job, job_data))
             
             # result는 (final_answer, all_page_ids, total_found) 튜플
             if isinstance(result, tuple) and len(result) == 3:
@@ -412,7 +483,9 @@ async def chat_with_bot(chat_request: ChatRequest, request: Request):
                     "status": "complete", 
                     "answer": final_answer,
                     "last_result_ids": page_ids,
-                    "total_found": total_found
+                    "total_found": total_found,
+                    # [신규] 단계별 시작/종료 시각 (병합 요청으로 합류한 경우 None)
+                    "trace": job_data.get("trace")
                 }
             else:
                 # 예기치 않은 결과 형식
@@ -423,23 +496,40 @@ async def chat_with_bot(chat_request: ChatRequest, request: Request):
             logger.error(f"❌ Fallback 처리 실패: {e}")
             return {"error": "일시적인 서비스 장애입니다."}
 
+    # [신규] 다른 API 인스턴스/사용자가 같은 질문을 이미 큐에 넣었다면 그 job_id로 합류
+    try:
+        inflight_job_id = await claim_inflight_async(redis_async_client, coalesce_key, job_id)
+    except Exception as e:
+        logger.warning(f"⚠️ [Coalesce] 진행 중 작업 확인 실패 (새 작업으로 진행): {e}")
+        inflight_job_id = None
+    if inflight_job_id:
+        logger.info(f"🔗 [Coalesce] 진행 중인 동일 질문에 합류 (job_id: {inflight_job_id})")
+        session.clear(); session["last_question"] = question
+        return {"message": "요청 접수 완료.", "job_id": inflight_job_id}
+
     # Redis가 살아있으면 -> 큐에 넣기 (Async)
     try: 
-        await redis_async_client.rpush(JOB_QUEUE_KEY, json.dumps(job_data, ensure_ascii=False).encode('utf-8'))
+        await JOB_QUEUE.enqueue_async(redis_async_client, json.dumps(job_data, ensure_ascii=False).encode('utf-8'))
         session.clear(); session["last_question"] = question
         return {"message": "요청 접수 완료.", "job_id": job_id}
     except Exception as e: 
         logger.error(f"❌ Redis Push 실패: {e}")
+        await release_inflight_async(redis_async_client, coalesce_key, job_id)
         return {"error": "대기열 등록에 실패했습니다. 잠시 후 다시 시도해 주세요."}
 
 @app.get("/get_result/{job_id}")
-def get_job_result(job_id: str):
+async def get_job_result(job_id: str, wait: float = Query(0, ge=0)):
+    """
+    [수정] 비동기 엔드포인트 (스레드 풀 슬롯을 점유하지 않음)
+    wait > 0: 결과가 저장될 때까지 최대 wait초(상한 RESULT_LONG_POLL_MAX_SECONDS) 대기 후 응답 (롱 폴링)
+    """
     try:
-        result_bytes = redis_client.hget(JOB_RESULTS_KEY, job_id)
-        if result_bytes:
-            return json.loads(result_bytes.decode('utf-8'))
+        # [수정] 작업별 결과 키 (없으면 기존 해시) → 응답 형식은 동일
+        if wait > 0 and RESULT_WAITER is not None:
+            result = await RESULT_WAITER.wait(job_id, min(wait, RESULT_LONG_POLL_MAX_SECONDS))
         else:
-            return {"status": "pending"}
+            result = await load_result_async(redis_async_client, job_id)
+        return result if result is not None else {"status": "pending"}
     except Exception as e: raise HTTPException(status_code=500, detail=f"오류: {e}")
 
 # --- 피드백 DB ---
@@ -460,23 +550,29 @@ async def handle_feedback(feedback_data: FeedbackRequest):
     if not notion: raise HTTPException(status_code=503, detail="Notion API 오류")
     
     try:
-        notion.pages.create(
-            parent={"database_id": "2c18ade5021080448ab8d304b4777fe5"}, # 따옴표 확인!
-            properties={
-                "질문": {"title": [{"text": {"content": feedback_data.question[:2000]}}]},
-                "답변": {"rich_text": [{"text": {"content": feedback_data.answer[:2000]}}]},
-                "평가": {"select": {"name": feedback_data.feedback}},
-                
-                # [신규] 사유 (선택 속성으로 저장 -> 통계 가능)
-                "사유": {"select": {"name": feedback_data.reason}} if feedback_data.reason else None,
-                
-                # [신규] 대화내역 (문맥 파악용)
-                "대화내역": {"rich_text": [{"text": {"content": feedback_data.chat_history[:2000]}}]},
-                
-                "상세의견": {"rich_text": [{"text": {"content": feedback_data.comment[:2000] if feedback_data.comment else ""}}]},
-                "작업ID": {"rich_text": [{"text": {"content": feedback_data.job_id}}]}
-            }
-        )
+        properties = {
+            "질문": {"title": [{"text": {"content": feedback_data.question[:2000]}}]},
+            "답변": {"rich_text": [{"text": {"content": feedback_data.answer[:2000]}}]},
+            "평가": {"select": {"name": feedback_data.feedback}},
+            
+            # [신규] 사유 (선택 속성으로 저장 -> 통계 가능)
+            "사유": {"select": {"name": feedback_data.reason}} if feedback_data.reason else None,
+            
+            # [신규] 대화내역 (문맥 파악용)
+            "대화내역": {"rich_text": [{"text": {"content": feedback_data.chat_history[:2000]}}]},
+            
+            "상세의견": {"rich_text": [{"text": {"content": feedback_data.comment[:2000] if feedback_data.comment else ""}}]},
+            "작업ID": {"rich_text": [{"text": {"content": feedback_data.job_id}}]}
+        }
+        # [수정] 공통 재시도 정책 적용 + 이벤트 루프 블로킹 방지
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, lambda: NOTION_RETRY.call(
+            lambda: notion.pages.create(
+                parent={"database_id": "2c18ade5021080448ab8d304b4777fe5"}, # 따옴표 확인!
+                properties=properties
+            ),
+            site="notion.feedback"
+        ))
         return {"status": "success"}
     except Exception as e:
         logger.error(f"❌ 피드백 저장 실패: {e}")
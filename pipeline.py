@@ -0,0 +1,201 @@
+"""
+[신규] 작업 단계 의존성 그래프 (process_job 단계 병렬화)
+
+process_job은 키워드 확장이 끝나야 검색 안에서 질문 임베딩을 시작했지만,
+임베딩은 키워드와 무관합니다. 단계를 (이름, 함수, 선행 단계)로 선언하면
+선행 단계가 모두 끝난 단계부터 바로 스레드 풀에서 실행합니다.
+
+    embed ──┬─ cache ─┐            (cache 적중 시 Finish로 바로 종료)
+    lang ───┘         │
+    embed + expand ───┴─ retrieve ─ rerank ─┐
+    lang ───────────────────────────────────┴─ assemble
+
+- 각 단계 함수는 선행 단계 결과를 {이름: 결과} dict로 받음
+- 단계 예외는 그대로 전파 (단계별 폴백은 각 함수 안에서 처리, 기존 process_job과 동일)
+- 단계가 Finish(값)을 반환하면 남은 단계를 시작하지 않고 바로 종료 (예: 답변 캐시 적중)
+- JobTrace: 작업 시작 기준 단계별 시작/종료 시각(ms) 기록 → 로그 + 작업 결과에 포함
+- [신규] run_stages_async: 비동기 워커용. 코루틴 단계는 이벤트 루프에서, 동기 단계는 스레드(asyncio.to_thread)에서 실행
+"""
+
+import os
+import time
+import asyncio
+import inspect
+import threading
+import concurrent.futures
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Any, List, Optional, Sequence
+
+PIPELINE_WORKERS = int(os.getenv("PIPELINE_WORKERS", "8"))
+
+_PIPELINE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=PIPELINE_WORKERS, thread_name_prefix="stage")
+
+
+@dataclass
+class Stage:
+    name: str
+    fn: Callable[[Dict[str, Any]], Any]
+    deps: Sequence[str] = ()
+
+
+class Finish:
+    """단계 반환값: 이후 단계를 실행하지 않고 작업을 끝냄 (결과에는 value가 들어감)"""
+
+    def __init__(self, value: Any):
+        self.value = value
+
+
+@dataclass
+class JobTrace:
+    """작업 1건의 단계별 시작/종료 시각 (작업 시작 기준 ms)"""
+    started_at: float = field(default_factory=time.perf_counter)
+    stages: Dict[str, Dict[str, float]] = field(default_factory=dict)
+    finished_by: Optional[str] = None  # Finish를 반환해 작업을 끝낸 단계
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def _now_ms(self) -> float:
+        return round((time.perf_counter() - self.started_at) * 1000, 1)
+
+    def start(self, name: str):
+        with self._lock:
+            self.stages[name] = {"start_ms": self._now_ms()}
+
+    def end(self, name: str, error: Optional[Exception] = None):
+        with self._lock:
+            entry = self.stages.setdefault(name, {"start_ms": self._now_ms()})
+            entry["end_ms"] = self._now_ms()
+            if error is not None:
+                entry["error"] = type(error).__name__
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            stages = {name: dict(entry) for name, entry in self.stages.items()}
+        trace = {"total_ms": self._now_ms(), "stages": stages}
+        if self.finished_by:
+            trace["finished_by"] = self.finished_by
+        return trace
+
+    def summary(self) -> str:
+        trace = self.to_dict()
+        parts = [f"{name} {e['start_ms']:.0f}~{e['end_ms']:.0f}ms" if "end_ms" in e else f"{name} {e['start_ms']:.0f}~…"
+                 for name, e in trace["stages"].items()]
+        finished = f", {self.finished_by}에서 종료" if self.finished_by else ""
+        return " | ".join(parts) + f" (합계 {trace['total_ms']:.0f}ms{finished})"
+
+
+def _validate(stages: List[Stage]):
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError(f"중복된 단계 이름: {names}")
+    known = set()
+    for stage in stages:
+        missing = [d for d in stage.deps if d not in known]
+        if missing:
+            # 선언 순서 = 위상 순서로 강제 (순환 의존 방지)
+            raise ValueError(f"단계 '{stage.name}'의 선행 단계가 먼저 선언되지 않음: {missing}")
+        known.add(stage.name)
+
+
+def _ready(pending: List[Stage], results: Dict[str, Any]) -> List[Stage]:
+    return [s for s in pending if all(d in results for d in s.deps)]
+
+
+def run_stages(stages: List[Stage], trace: Optional[JobTrace] = None,
+               executor: Optional[concurrent.futures.Executor] = None) -> Dict[str, Any]:
+    """
+    선행 단계가 끝난 단계부터 실행하고 {단계 이름: 결과} 반환.
+    어느 단계든 예외가 나면 아직 시작하지 않은 단계는 실행하지 않고 그 예외를 다시 발생시킵니다.
+    Finish를 반환한 단계가 있으면 trace.finished_by에 기록하고 그때까지의 결과를 반환합니다.
+    """
+    _validate(stages)
+    if any(inspect.iscoroutinefunction(s.fn) for s in stages):
+        raise ValueError("코루틴 단계는 run_stages_async로 실행해야 합니다")
+    trace = trace or JobTrace()
+    executor = executor or _PIPELINE_EXECUTOR
+    results: Dict[str, Any] = {}
+    pending = list(stages)
+    running: Dict[concurrent.futures.Future, str] = {}
+
+    def _call(stage: Stage, inputs: Dict[str, Any]):
+        trace.start(stage.name)
+        try:
+            result = stage.fn(inputs)
+        except Exception as e:
+            trace.end(stage.name, e)
+            raise
+        trace.end(stage.name)
+        return result
+
+    while pending or running:
+        for stage in _ready(pending, results):
+            pending.remove(stage)
+            inputs = {d: results[d] for d in stage.deps}
+            running[executor.submit(_call, stage, inputs)] = stage.name
+
+        done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            error = future.exception()
+            if error is not None:
+                # 이미 실행 중인 단계는 끝나도록 두고(스레드는 취소 불가) 결과만 버림
+                for other in running:
+                    other.cancel()
+                raise error
+            result = future.result()
+            if isinstance(result, Finish):
+                trace.finished_by = name
+                results[name] = result.value
+                for other in running:
+                    other.cancel()
+                return results
+            results[name] = result
+    return results
+
+
+async def run_stages_async(stages: List[Stage], trace: Optional[JobTrace] = None) -> Dict[str, Any]:
+    """run_stages의 비동기 버전 (같은 의존성/예외/Finish 규칙)"""
+    _validate(stages)
+    trace = trace or JobTrace()
+    results: Dict[str, Any] = {}
+    pending = list(stages)
+    running: Dict[asyncio.Task, str] = {}
+
+    async def _call(stage: Stage, inputs: Dict[str, Any]):
+        trace.start(stage.name)
+        try:
+            if inspect.iscoroutinefunction(stage.fn):
+                result = await stage.fn(inputs)
+            else:
+                result = await asyncio.to_thread(stage.fn, inputs)
+        except Exception as e:
+            trace.end(stage.name, e)
+            raise
+        trace.end(stage.name)
+        return result
+
+    def _cancel_running():
+        # 스레드에서 실행 중인 동기 단계는 끝까지 실행되고 결과만 버려짐
+        for other in running:
+            other.cancel()
+
+    while pending or running:
+        for stage in _ready(pending, results):
+            pending.remove(stage)
+            inputs = {d: results[d] for d in stage.deps}
+            running[asyncio.ensure_future(_call(stage, inputs))] = stage.name
+
+        done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            name = running.pop(task)
+            error = task.exception()
+            if error is not None:
+                _cancel_running()
+                raise error
+            result = task.result()
+            if isinstance(result, Finish):
+                trace.finished_by = name
+                results[name] = result.value
+                _cancel_running()
+                return results
+            results[name] = result
+    return results
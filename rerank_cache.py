@@ -0,0 +1,149 @@
+"""
+[신규] LLM 랭킹 결과 캐시 (rank:* 네임스페이스)
+
+같은 질문은 대개 같은 후보 15개를 다시 가져오므로, LLM이 고른 순서를 저장해 두고 재사용합니다.
+- 키: rank:{인덱스 버전}:{정규화 질문 해시}:{후보 page_id 순서 해시}
+  → 후보 구성/순서가 바뀌거나 인덱스가 새로 게시되면 자연히 다른 키가 됨
+- 값: LLM이 정한 후보 id 순서 (JSON)
+- L1(프로세스 내 LRU) → L2(Redis). Redis 오류 후 일정 시간은 L1만 사용
+- rank:page:{page_id} 집합에 이 페이지를 포함한 키를 기록 → 인덱서가 바뀐 페이지의 항목을 바로 삭제
+"""
+
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Iterable
+
+from coalescing import make_coalesce_key
+
+RERANK_PREFIX = "rank:"
+RERANK_PAGE_PREFIX = "rank:page:"
+RERANK_CACHE_TTL_SECONDS = int(os.getenv("RERANK_CACHE_TTL_SECONDS", str(24 * 3600)))
+RERANK_CACHE_L1_SIZE = int(os.getenv("RERANK_CACHE_L1_SIZE", "500"))
+
+
+def candidate_key(doc: Dict[str, Any]) -> str:
+    meta = doc.get("metadata") or {}
+    return str(doc.get("page_id") or meta.get("page_id") or doc.get("id") or meta.get("title"))
+
+
+def fingerprint(candidates: List[Dict[str, Any]]) -> str:
+    """후보 page_id 순서 해시"""
+    joined = "\n".join(candidate_key(doc) for doc in candidates)
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()[:16]
+
+
+class RerankCache:
+    L2_RETRY_AFTER = 30.0
+
+    def __init__(self, redis_conn, maxsize: int = RERANK_CACHE_L1_SIZE, ttl: int = RERANK_CACHE_TTL_SECONDS):
+        self.redis = redis_conn
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._l1 = OrderedDict()
+        self._lock = threading.Lock()
+        self._l2_skip_until = 0.0
+        self.stats = dict.fromkeys(("l1_hits", "l2_hits", "misses", "stores", "l2_errors"), 0)
+
+    def key(self, question: str, candidates: List[Dict[str, Any]], index_version: Optional[str]) -> str:
+        return f"{RERANK_PREFIX}{index_version or '0'}:{make_coalesce_key(question)}:{fingerprint(candidates)}"
+
+    def _incr(self, field: str):
+        with self._lock:
+            self.stats[field] += 1
+
+    def _l2_available(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._l2_skip_until
+
+    def _l2_failed(self, e: Exception):
+        self._incr("l2_errors")
+        self._l2_skip_until = time.monotonic() + self.L2_RETRY_AFTER
+        print(f"⚠️ [RerankCache] Redis 오류 → {self.L2_RETRY_AFTER:.0f}초간 L1만 사용: {e}")
+
+    def _l1_get(self, key: str) -> Optional[List[str]]:
+        with self._lock:
+            entry = self._l1.get(key)
+            if entry is None:
+                return None
+            expires_at, order = entry
+            if expires_at < time.monotonic():
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+            return order
+
+    def _l1_put(self, key: str, order: List[str]):
+        with self._lock:
+            self._l1[key] = (time.monotonic() + self.ttl, order)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.maxsize:
+                self._l1.popitem(last=False)
+
+    def get(self, key: str, candidates: List[Dict[str, Any]]) -> Optional[List[Dict[str, Any]]]:
+        """저장된 순서로 후보를 재배열해 반환 (없으면 None)"""
+        order = self._l1_get(key)
+        if order is not None:
+            self._incr("l1_hits")
+        elif self._l2_available():
+            try:
+                raw = self.redis.get(key)
+                if raw:
+                    order = json.loads(raw)
+                    self._l1_put(key, order)
+                    self._incr("l2_hits")
+            except Exception as e:
+                self._l2_failed(e)
+        if order is None:
+            self._incr("misses")
+            return None
+
+        by_key = {candidate_key(doc): doc for doc in candidates}
+        ranked = [by_key[k] for k in order if k in by_key]
+        seen = set(order)
+        return ranked + [doc for doc in candidates if candidate_key(doc) not in seen]
+
+    def put(self, key: str, ranked: List[Dict[str, Any]]):
+        order = [candidate_key(doc) for doc in ranked]
+        self._l1_put(key, order)
+        self._incr("stores")
+        if not self._l2_available():
+            return
+        try:
+            pipe = self.redis.pipeline()
+            pipe.set(key, json.dumps(order, ensure_ascii=False), ex=self.ttl)
+            for page_key in order:
+                pipe.sadd(RERANK_PAGE_PREFIX + page_key, key)
+                pipe.expire(RERANK_PAGE_PREFIX + page_key, self.ttl)
+            pipe.execute()
+        except Exception as e:
+            self._l2_failed(e)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, l1_size=len(self._l1))
+        lookups = stats["l1_hits"] + stats["l2_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["l1_hits"] + stats["l2_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+
+def invalidate_pages(redis_conn, page_ids: Iterable[str]) -> int:
+    """[인덱서] 바뀌거나 삭제된 페이지가 포함된 랭킹 캐시 삭제 (삭제한 키 수)"""
+    page_ids = [p for p in page_ids if p]
+    if redis_conn is None or not page_ids:
+        return 0
+    try:
+        set_keys = [RERANK_PAGE_PREFIX + p for p in page_ids]
+        rank_keys = set()
+        for set_key in set_keys:
+            rank_keys.update(redis_conn.smembers(set_key))
+        if rank_keys:
+            redis_conn.delete(*rank_keys)
+        redis_conn.delete(*set_keys)
+        print(f"🧹 [RerankCache] 변경 페이지 {len(page_ids)}건 → 랭킹 캐시 {len(rank_keys)}건 삭제")
+        return len(rank_keys)
+    except Exception as e:
+        print(f"⚠️ [RerankCache] 무효화 실패 (인덱스 버전 변경으로 키가 바뀌므로 TTL 후 정리됨): {e}")
+        return 0
@@ -0,0 +1,735 @@
+"""
+[신규] 외부 API 호출 안정성 도구 모음
+
+utils.py의 LLM/임베딩 래퍼가 공통으로 사용하는, 특정 SDK에 의존하지 않는 구성 요소입니다.
+- KeyScheduler: API 키별 토큰 버킷 기반 호출 스케줄러 (sleep 기반 재시도 대체)
+- RetryPolicy / RetryBudget: 모든 외부 호출(LLM, 임베딩, Supabase, Notion)의 공통 재시도 정책
+- CircuitBreaker: 공급자/작업별 차단기 (Redis가 있으면 프로세스 간 상태 공유)
+- LatencyHistogram / Hedger: 지연 분포 기반 헤지 요청 (꼬리 지연 단축)
+"""
+import re
+import time
+import random
+import asyncio
+import threading
+import concurrent.futures
+from collections import deque
+from typing import Optional, List, Tuple, Callable, Any, Dict
+
+
+# ============================================
+# 1. 쿼터 인지형 키 스케줄러 (Token Bucket)
+# ============================================
+
+def is_quota_error(error: Exception) -> bool:
+    """429 / 할당량 초과 계열 오류인지 판별합니다."""
+    msg = str(error)
+    return "429" in msg or "Quota exceeded" in msg or "RESOURCE_EXHAUSTED" in msg
+
+
+def parse_retry_delay(error: Exception, default: float = 60.0, max_delay: float = 60.0) -> float:
+    """
+    서버 오류 메시지의 권장 대기 시간('retry in 12.3s', 'retryDelay': '12s')을 초 단위로 읽습니다.
+    힌트가 없으면 default를 반환합니다.
+    """
+    msg = str(error)
+    match = re.search(r'retry in ([\d.]+)\s*s', msg) or re.search(r"retryDelay['\"]?\s*[:=]\s*['\"]?([\d.]+)s", msg)
+    if match:
+        try:
+            return max(1.0, min(float(match.group(1)), max_delay))
+        except ValueError:
+            pass
+    return default
+
+
+class NoAvailableKeyError(RuntimeError):
+    """제한 시간 안에 대여할 수 있는 키가 없음"""
+
+
+class TokenBucket:
+    """
+    키 하나의 호출 허용량을 관리하는 토큰 버킷.
+    - rate: 초당 충전되는 토큰 수 (RPM / 60)
+    - capacity: 순간적으로 허용되는 최대 호출 수 (burst)
+    - blocked_until: 서버가 알려준 대기 시간이 끝나는 시각 (이 키에만 적용)
+    """
+
+    def __init__(self, rate_per_sec: float, capacity: float):
+        self.rate = rate_per_sec
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """지금 호출할 수 있으면 0, 아니면 다음 토큰까지 남은 시간(초)"""
+        self._refill(now)
+        blocked = max(0.0, self.blocked_until - now)
+        if self.tokens >= 1:
+            return blocked
+        refill = (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+        return max(blocked, refill)
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, now: float, seconds: float):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+        self.tokens = min(self.tokens, 0)
+
+
+class KeyScheduler:
+    """
+    KEY_POOL의 각 키에 토큰 버킷을 두고, 지금 여유가 있는 키에 호출을 배정합니다.
+
+    - 여유 있는 키가 있으면 즉시 배정 (토큰이 가장 많이 남은 키 우선)
+    - 모두 소진되었으면 가장 빨리 풀리는 시점까지 대기
+      (동기: Condition 대기 / 비동기: asyncio.sleep → 스레드를 점유하지 않음)
+    - 429 응답의 'retry in Xs' 힌트는 penalize()로 해당 키에만 적용
+    """
+
+    def __init__(self, n_keys: int, rpm_per_key: float = 10, burst: Optional[float] = None):
+        burst = burst if burst is not None else max(1.0, rpm_per_key / 6)
+        self._buckets = [TokenBucket(rpm_per_key / 60.0, burst) for _ in range(n_keys)]
+        self._cond = threading.Condition()
+        self._next = 0  # 동률일 때 라운드 로빈 시작점
+
+    def __len__(self):
+        return len(self._buckets)
+
+    def try_acquire(self) -> Tuple[Optional[int], float]:
+        """(키 인덱스, 0) 또는 여유 키가 없으면 (None, 최소 대기 시간)을 반환합니다."""
+        if not self._buckets:
+            return None, float("inf")
+        with self._cond:
+            now = time.monotonic()
+            n = len(self._buckets)
+            best, best_tokens, min_wait = None, -1.0, float("inf")
+            for offset in range(n):
+                i = (self._next + offset) % n
+                wait = self._buckets[i].wait_time(now)
+                if wait <= 0 and self._buckets[i].tokens > best_tokens:
+                    best, best_tokens = i, self._buckets[i].tokens
+                min_wait = min(min_wait, wait)
+            if best is None:
+                return None, min_wait
+            self._buckets[best].take(now)
+            self._next = (best + 1) % n
+            return best, 0.0
+
+    def acquire(self, timeout: Optional[float] = None) -> Optional[int]:
+        """[동기] 키를 배정받을 때까지 대기합니다. timeout 안에 못 받으면 None."""
+        if not self._buckets:
+            return None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            idx, wait = self.try_acquire()
+            if idx is not None:
+                return idx
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return None
+                wait = min(wait, remaining)
+            with self._cond:
+                self._cond.wait(timeout=wait)
+
+    async def acquire_async(self, timeout: Optional[float] = None) -> Optional[int]:
+        """[비동기] 이벤트 루프를 막지 않고 키 배정을 기다립니다. timeout 초과 시 None."""
+        if not self._buckets:
+            return None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            idx, wait = self.try_acquire()
+            if idx is not None:
+                return idx
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or wait > remaining:
+                    return None
+                wait = min(wait, remaining)
+            # 동시에 깨어난 대기자들이 한꺼번에 몰리지 않도록 약간의 지터
+            await asyncio.sleep(wait + random.uniform(0, 0.05))
+
+    def penalize(self, idx: int, seconds: float):
+        """서버가 알려준 대기 시간을 해당 키에만 적용합니다."""
+        if not 0 <= idx < len(self._buckets):
+            return
+        with self._cond:
+            self._buckets[idx].block(time.monotonic(), seconds)
+            self._cond.notify_all()
+
+    def snapshot(self) -> List[dict]:
+        """키별 잔여 토큰/차단 시간 (모니터링용)"""
+        with self._cond:
+            now = time.monotonic()
+            out = []
+            for i, b in enumerate(self._buckets):
+                b._refill(now)
+                out.append({
+                    "key": i,
+                    "tokens": round(b.tokens, 2),
+                    "blocked_for": round(max(0.0, b.blocked_until - now), 1),
+                })
+            return out
+
+
+# ============================================
+# 2. 공통 재시도 정책 (Retry Policy + Budget)
+# ============================================
+
+QUOTA = "quota"          # 429 / 할당량 초과 → 재시도 가능 (서버 권장 대기 시간 존재)
+TRANSIENT = "transient"  # 타임아웃, 연결 끊김, 5xx → 재시도 가능
+FATAL = "fatal"          # 잘못된 요청, 인증 실패, 파싱 오류 → 재시도해도 소용없음
+
+_FATAL_TYPES = (ValueError, TypeError, KeyError, AttributeError, NoAvailableKeyError)
+_FATAL_PATTERN = re.compile(r'\b(400|401|403|404|422)\b|INVALID_ARGUMENT|PERMISSION_DENIED|UNAUTHENTICATED|NOT_FOUND|API key not valid')
+
+
+def classify_error(error: Exception) -> str:
+    """오류를 QUOTA / TRANSIENT / FATAL 중 하나로 분류합니다."""
+    if is_quota_error(error) or "rate_limited" in str(error):
+        return QUOTA
+    if isinstance(error, (TimeoutError, ConnectionError, asyncio.TimeoutError)):
+        return TRANSIENT
+    if isinstance(error, _FATAL_TYPES) or _FATAL_PATTERN.search(str(error)):
+        return FATAL
+    # 알 수 없는 오류(httpx/grpc 네트워크 오류, 5xx 등)는 일시적 장애로 간주
+    return TRANSIENT
+
+
+class RetryBudget:
+    """
+    재시도 예산 (Finagle 방식).
+    최근 window초 동안의 재시도 수를 '최초 요청 수 x ratio + 최소 여유분' 이하로 제한하여,
+    장애 시 재시도가 부하를 몇 배로 키우는 재시도 폭주(retry storm)를 막습니다.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_sec: float = 0.5, window: float = 10.0):
+        self.ratio = ratio
+        self.reserve = min_per_sec * window
+        self.window = window
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float):
+        for q in (self._requests, self._retries):
+            while q and now - q[0] > self.window:
+                q.popleft()
+
+    def record_request(self):
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        """재시도 1회를 예산에서 차감합니다. 예산이 없으면 False."""
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            if len(self._retries) < self.ratio * len(self._requests) + self.reserve:
+                self._retries.append(now)
+                return True
+            return False
+
+
+class RetryStats:
+    """호출 지점(call site)별 재시도 카운터"""
+
+    FIELDS = ("calls", "successes", "attempts", "retries", "failures",
+              "fatal", "exhausted", "deadline_exceeded", "budget_exhausted")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sites: Dict[str, Dict[str, int]] = {}
+
+    def incr(self, site: str, field: str, n: int = 1):
+        with self._lock:
+            counters = self._sites.setdefault(site, dict.fromkeys(self.FIELDS, 0))
+            counters[field] += n
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            out = {}
+            for site, c in self._sites.items():
+                row = dict(c)
+                row["retry_ratio"] = round(c["retries"] / c["calls"], 3) if c["calls"] else 0.0
+                out[site] = row
+            return out
+
+
+RETRY_STATS = RetryStats()
+
+
+class RetryPolicy:
+    """
+    외부 호출 공통 재시도 정책.
+    - max_attempts: 최초 호출을 포함한 총 시도 횟수 상한
+    - deadline: 호출 1건에 허용되는 전체 시간(초). 다음 대기가 이를 넘기면 즉시 포기
+    - base_delay / max_delay: 지수 백오프 + Full Jitter
+    - respect_retry_hint: 429의 'retry in Xs' 힌트만큼 대기 (키 풀이 대기를 대신하면 False)
+    - budget: 정책 단위 재시도 예산 (RetryBudget)
+    """
+
+    def __init__(self, name: str, max_attempts: int = 3, deadline: Optional[float] = None,
+                 base_delay: float = 0.5, max_delay: float = 8.0, respect_retry_hint: bool = True,
+                 budget: Optional[RetryBudget] = None, classify: Callable[[Exception], str] = classify_error):
+        self.name = name
+        self.max_attempts = max(1, max_attempts)
+        self.deadline = deadline
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.respect_retry_hint = respect_retry_hint
+        self.budget = budget if budget is not None else RetryBudget()
+        self.classify = classify
+
+    def _delay(self, attempt: int, error: Exception, kind: str) -> float:
+        if kind == QUOTA:
+            if not self.respect_retry_hint:
+                return 0.0
+            return parse_retry_delay(error, default=self.max_delay)
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def _next_delay(self, site: str, attempt: int, error: Exception, end: Optional[float]) -> Optional[float]:
+        """재시도할 경우 대기 시간, 포기해야 하면 None (사유는 카운터에 기록)"""
+        kind = self.classify(error)
+        if kind == FATAL:
+            RETRY_STATS.incr(site, "fatal")
+            return None
+        if attempt >= self.max_attempts:
+            RETRY_STATS.incr(site, "exhausted")
+            return None
+        delay = self._delay(attempt, error, kind)
+        if end is not None and time.monotonic() + delay >= end:
+            RETRY_STATS.incr(site, "deadline_exceeded")
+            return None
+        if not self.budget.try_spend():
+            RETRY_STATS.incr(site, "budget_exhausted")
+            return None
+        RETRY_STATS.incr(site, "retries")
+        return delay
+
+    def _start(self, site: Optional[str], deadline: Optional[float]):
+        site = site or self.name
+        RETRY_STATS.incr(site, "calls")
+        self.budget.record_request()
+        deadline = deadline if deadline is not None else self.deadline
+        end = time.monotonic() + deadline if deadline is not None else None
+        return site, end
+
+    def call(self, fn: Callable[[], Any], site: Optional[str] = None, deadline: Optional[float] = None):
+        """[동기] fn()을 정책에 따라 실행합니다. 포기하면 마지막 예외를 그대로 전달합니다."""
+        site, end = self._start(site, deadline)
+        attempt = 0
+        while True:
+            attempt += 1
+            RETRY_STATS.incr(site, "attempts")
+            try:
+                result = fn()
+                RETRY_STATS.incr(site, "successes")
+                return result
+            except Exception as e:
+                delay = self._next_delay(site, attempt, e, end)
+                if delay is None:
+                    RETRY_STATS.incr(site, "failures")
+                    raise
+                print(f"🔁 [Retry] {site} {attempt}/{self.max_attempts} 실패 → {delay:.1f}초 후 재시도 ({type(e).__name__})")
+                if delay > 0:
+                    time.sleep(delay)
+
+    async def call_async(self, fn: Callable[[], Any], site: Optional[str] = None, deadline: Optional[float] = None):
+        """[비동기] fn()이 반환하는 코루틴을 정책에 따라 실행합니다."""
+        site, end = self._start(site, deadline)
+        attempt = 0
+        while True:
+            attempt += 1
+            RETRY_STATS.incr(site, "attempts")
+            try:
+                result = await fn()
+                RETRY_STATS.incr(site, "successes")
+                return result
+            except Exception as e:
+                delay = self._next_delay(site, attempt, e, end)
+                if delay is None:
+                    RETRY_STATS.incr(site, "failures")
+                    raise
+                print(f"🔁 [Retry] {site} {attempt}/{self.max_attempts} 실패 → {delay:.1f}초 후 재시도 ({type(e).__name__})")
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+
+def get_retry_stats() -> Dict[str, Dict[str, Any]]:
+    """호출 지점별 재시도 카운터 (retry_ratio가 높으면 재시도 폭주 징후)"""
+    return RETRY_STATS.snapshot()
+
+
+# ============================================
+# 3. 서킷 브레이커 (Gemini → Groq 페일오버)
+# ============================================
+
+class LocalBreakerStore:
+    """프로세스 내부 차단기 상태 저장소 (Redis가 없을 때 / Redis 장애 시 사용)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._failures: Dict[str, deque] = {}
+        self._open_until: Dict[str, float] = {}
+        self._probe_until: Dict[str, float] = {}
+        self._tripped = set()
+
+    def add_failure(self, name: str, window: float) -> int:
+        with self._lock:
+            now = time.monotonic()
+            q = self._failures.setdefault(name, deque())
+            q.append(now)
+            while q and now - q[0] > window:
+                q.popleft()
+            return len(q)
+
+    def trip(self, name: str, open_seconds: float):
+        with self._lock:
+            self._tripped.add(name)
+            self._open_until[name] = time.monotonic() + open_seconds
+            self._failures.pop(name, None)
+            self._probe_until.pop(name, None)
+
+    def status(self, name: str) -> Tuple[bool, bool]:
+        """(tripped, open) - tripped인데 open이 아니면 half-open"""
+        with self._lock:
+            tripped = name in self._tripped
+            return tripped, tripped and time.monotonic() < self._open_until.get(name, 0)
+
+    def try_probe(self, name: str, ttl: float) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            if self._probe_until.get(name, 0) > now:
+                return False
+            self._probe_until[name] = now + ttl
+            return True
+
+    def reset(self, name: str):
+        with self._lock:
+            self._tripped.discard(name)
+            for d in (self._failures, self._open_until, self._probe_until):
+                d.pop(name, None)
+
+
+class RedisBreakerStore:
+    """
+    Redis 기반 차단기 상태 저장소 - API 프로세스와 워커 프로세스가 함께 페일오버합니다.
+    - {prefix}{name}:failures  실패 횟수 (window 초 TTL)
+    - {prefix}{name}:tripped   차단 상태 플래그
+    - {prefix}{name}:open      차단 유지 시간 (open_seconds TTL, 만료되면 half-open)
+    - {prefix}{name}:probe     half-open 탐색 요청 잠금 (SET NX)
+    """
+
+    def __init__(self, client, prefix: str = "circuit:", tripped_ttl: int = 3600):
+        self.client = client
+        self.prefix = prefix
+        self.tripped_ttl = tripped_ttl
+
+    def _k(self, name: str, part: str) -> str:
+        return f"{self.prefix}{name}:{part}"
+
+    def add_failure(self, name: str, window: float) -> int:
+        # SET NX EX로 윈도우 시작 시에만 TTL 설정 → INCR (구버전 Redis 호환)
+        pipe = self.client.pipeline()
+        pipe.set(self._k(name, "failures"), 0, ex=max(1, int(window)), nx=True)
+        pipe.incr(self._k(name, "failures"))
+        _, count = pipe.execute()
+        return int(count)
+
+    def trip(self, name: str, open_seconds: float):
+        pipe = self.client.pipeline()
+        pipe.set(self._k(name, "tripped"), b"1", ex=self.tripped_ttl)
+        pipe.set(self._k(name, "open"), b"1", ex=max(1, int(open_seconds)))
+        pipe.delete(self._k(name, "failures"), self._k(name, "probe"))
+        pipe.execute()
+
+    def status(self, name: str) -> Tuple[bool, bool]:
+        tripped, open_ = self.client.mget(self._k(name, "tripped"), self._k(name, "open"))
+        return tripped is not None, tripped is not None and open_ is not None
+
+    def try_probe(self, name: str, ttl: float) -> bool:
+        return bool(self.client.set(self._k(name, "probe"), b"1", nx=True, ex=max(1, int(ttl))))
+
+    def reset(self, name: str):
+        self.client.delete(*(self._k(name, p) for p in ("tripped", "open", "failures", "probe")))
+
+
+class CircuitBreaker:
+    """
+    공급자/작업별 서킷 브레이커.
+    - CLOSED: 정상 호출. window초 안에 실패가 failure_threshold회 쌓이면 OPEN
+    - OPEN: open_seconds 동안 호출 차단 → 호출부는 즉시 백업(Groq)으로 전환
+    - HALF_OPEN: 차단 시간이 지나면 단 1건의 탐색(probe) 요청만 통과
+      성공하면 CLOSED, 실패하면 다시 OPEN
+    상태는 store(Redis)에 두고 status_ttl초 동안 로컬에 캐시합니다.
+    Redis 오류 시에는 프로세스 내부 저장소로 자동 전환합니다.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+    STORE_RETRY_AFTER = 30.0
+
+    def __init__(self, name: str, failure_threshold: int = 5, window: float = 60.0,
+                 open_seconds: float = 30.0, probe_timeout: float = 30.0,
+                 store=None, status_ttl: float = 1.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.window = window
+        self.open_seconds = open_seconds
+        self.probe_timeout = probe_timeout
+        self.status_ttl = status_ttl
+        self._local = LocalBreakerStore()
+        self.store = store or self._local
+        self._cached: Tuple[bool, bool] = (False, False)
+        self._cached_at = 0.0
+        self._store_error_at = float("-inf")
+        self.rejected = 0
+
+    def _call_store(self, method: str, *args):
+        # 공유 저장소 오류 후 STORE_RETRY_AFTER초 동안은 로컬 상태만 사용 (Redis 연결 대기로 요청이 막히지 않도록)
+        if self.store is not self._local and time.monotonic() - self._store_error_at > self.STORE_RETRY_AFTER:
+            try:
+                return getattr(self.store, method)(*args)
+            except Exception as e:
+                self._store_error_at = time.monotonic()
+                print(f"⚠️ [Circuit] {self.name} 공유 상태 저장소 오류 → {self.STORE_RETRY_AFTER:.0f}초간 로컬 상태 사용: {e}")
+        return getattr(self._local, method)(*args)
+
+    def _status(self, fresh: bool = False) -> Tuple[bool, bool]:
+        now = time.monotonic()
+        if fresh or now - self._cached_at > self.status_ttl:
+            self._cached = self._call_store("status", self.name)
+            self._cached_at = now
+        return self._cached
+
+    @property
+    def state(self) -> str:
+        tripped, open_ = self._status()
+        if not tripped:
+            return self.CLOSED
+        return self.OPEN if open_ else self.HALF_OPEN
+
+    def allow_request(self) -> bool:
+        """이번 호출을 기본 공급자로 보내도 되는지 판단합니다."""
+        tripped, open_ = self._status()
+        if not tripped:
+            return True
+        if not open_:
+            tripped, open_ = self._status(fresh=True)
+            if not tripped:
+                return True
+            if not open_ and self._call_store("try_probe", self.name, self.probe_timeout):
+                print(f"🩺 [Circuit] {self.name} half-open → 탐색 요청 1건 통과")
+                return True
+        self.rejected += 1
+        return False
+
+    def record_success(self):
+        tripped, _ = self._status()
+        if tripped:
+            self._call_store("reset", self.name)
+            self._cached, self._cached_at = (False, False), time.monotonic()
+            print(f"✅ [Circuit] {self.name} 복구 확인 → CLOSED")
+
+    def record_failure(self):
+        tripped, open_ = self._status(fresh=True)
+        if tripped and not open_:
+            # half-open 탐색 실패 → 다시 차단
+            self._trip("탐색 요청 실패")
+            return
+        if tripped:
+            return
+        if self._call_store("add_failure", self.name, self.window) >= self.failure_threshold:
+            self._trip(f"{self.window:.0f}초 내 {self.failure_threshold}회 실패")
+
+    def _trip(self, reason: str):
+        self._call_store("trip", self.name, self.open_seconds)
+        self._cached, self._cached_at = (True, True), time.monotonic()
+        print(f"🔌 [Circuit] {self.name} OPEN ({reason}) → {self.open_seconds:.0f}초간 백업 경로 사용")
+
+    def snapshot(self) -> dict:
+        return {"state": self.state, "rejected": self.rejected,
+                "shared": self.store is not self._local}
+
+
+# ============================================
+# 4. 헤지 요청 (Hedged Requests)
+# ============================================
+
+class LatencyHistogram:
+    """
+    작업별 지연 시간 히스토그램 (로그 간격 버킷, 스레드 안전).
+    quantile()은 표본이 min_samples개 미만이면 None을 반환합니다.
+    """
+
+    BOUNDS = [0.05 * (1.25 ** i) for i in range(32)]  # 50ms ~ 약 50초
+
+    def __init__(self, min_samples: int = 20):
+        self.min_samples = min_samples
+        self._counts = [0] * (len(self.BOUNDS) + 1)
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        i = 0
+        while i < len(self.BOUNDS) and seconds > self.BOUNDS[i]:
+            i += 1
+        with self._lock:
+            self._counts[i] += 1
+            self._total += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            if self._total < self.min_samples:
+                return None
+            target = q * self._total
+            seen = 0
+            for i, c in enumerate(self._counts):
+                seen += c
+                if seen >= target:
+                    return self.BOUNDS[min(i, len(self.BOUNDS) - 1)]
+            return self.BOUNDS[-1]
+
+    def snapshot(self) -> dict:
+        return {"samples": self._total, "p50": self.quantile(0.5), "p90": self.quantile(0.9), "p99": self.quantile(0.99)}
+
+
+def _is_valid_result(result) -> bool:
+    return result is not None and result != ""
+
+
+class Hedger:
+    """
+    헤지 요청 실행기.
+    기본(primary) 공급자가 p90 지연(런타임 히스토그램) 안에 응답하지 않으면 같은 요청을
+    보조(secondary) 공급자에게도 보내고, 먼저 온 유효한 응답을 채택한 뒤 나머지는 취소합니다.
+    - enabled=False이거나 hedge=False면 헤지 없이 '기본 → 실패 시 보조' 순차 폴백만 수행
+    - 기본 공급자의 지연은 항상 기록하므로, 헤지를 켜는 순간부터 실측 p90을 사용
+    """
+
+    def __init__(self, name: str, enabled: bool = False, quantile: float = 0.9, min_samples: int = 20,
+                 default_delay: float = 2.0, min_delay: float = 0.2, max_delay: float = 10.0):
+        self.name = name
+        self.enabled = enabled
+        self.q = quantile
+        self.default_delay = default_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.histogram = LatencyHistogram(min_samples=min_samples)
+        self.stats = dict.fromkeys(("calls", "hedged", "secondary_wins", "primary_failures"), 0)
+        self._lock = threading.Lock()
+
+    def delay(self) -> float:
+        """헤지 발사 시점 = 기본 공급자 지연의 p90 (표본 부족 시 default_delay)"""
+        p = self.histogram.quantile(self.q)
+        if p is None:
+            return self.default_delay
+        return max(self.min_delay, min(self.max_delay, p))
+
+    def _incr(self, field: str):
+        with self._lock:
+            self.stats[field] += 1
+
+    async def run_async(self, primary: Callable[[], Any], secondary: Optional[Callable[[], Any]] = None,
+                        hedge: bool = True, is_valid: Callable[[Any], bool] = _is_valid_result):
+        """[비동기] primary/secondary는 코루틴을 반환하는 함수. 유효한 응답이 없으면 None."""
+        self._incr("calls")
+        start = time.monotonic()
+        p_task = asyncio.ensure_future(primary())
+        s_task = None
+        pending = {p_task}
+        try:
+            if secondary is not None and self.enabled and hedge:
+                done, _ = await asyncio.wait(pending, timeout=self.delay())
+                if not done:
+                    self._incr("hedged")
+                    s_task = asyncio.ensure_future(secondary())
+                    pending.add(s_task)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    result = None if task.exception() else task.result()
+                    if task is p_task:
+                        if is_valid(result):
+                            self.histogram.record(time.monotonic() - start)
+                            return result
+                        self._incr("primary_failures")
+                        if s_task is None and secondary is not None:
+                            s_task = asyncio.ensure_future(secondary())
+                            pending.add(s_task)
+                    elif is_valid(result):
+                        self._incr("secondary_wins")
+                        return result
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+                if task is p_task:
+                    # 취소된 기본 요청은 '최소 이만큼 걸렸다'는 하한값으로 기록 (분포가 낙관적으로 치우치지 않도록)
+                    self.histogram.record(time.monotonic() - start)
+
+    def run(self, primary: Callable[[], Any], secondary: Optional[Callable[[], Any]] = None,
+            executor: Optional[concurrent.futures.Executor] = None, hedge: bool = True,
+            is_valid: Callable[[Any], bool] = _is_valid_result):
+        """
+        [동기] 스레드 풀에서 실행합니다. 이미 실행 중인 스레드는 중단할 수 없으므로,
+        진 쪽 요청은 future.cancel() 후 결과를 버립니다.
+        """
+        if executor is None:
+            # 실행기가 없으면 헤지 없이 순차 폴백
+            result = primary()
+            if is_valid(result) or secondary is None:
+                return result if is_valid(result) else None
+            result = secondary()
+            return result if is_valid(result) else None
+
+        self._incr("calls")
+        start = time.monotonic()
+        p_fut = executor.submit(primary)
+        s_fut = None
+        pending = {p_fut}
+        try:
+            if secondary is not None and self.enabled and hedge:
+                done, _ = concurrent.futures.wait(pending, timeout=self.delay())
+                if not done:
+                    self._incr("hedged")
+                    s_fut = executor.submit(secondary)
+                    pending.add(s_fut)
+            while pending:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for fut in done:
+                    result = None if fut.exception() else fut.result()
+                    if fut is p_fut:
+                        if is_valid(result):
+                            self.histogram.record(time.monotonic() - start)
+                            return result
+                        self._incr("primary_failures")
+                        if s_fut is None and secondary is not None:
+                            s_fut = executor.submit(secondary)
+                            pending.add(s_fut)
+                    elif is_valid(result):
+                        self._incr("secondary_wins")
+                        return result
+            return None
+        finally:
+            for fut in pending:
+                fut.cancel()
+                if fut is p_fut:
+                    self.histogram.record(time.monotonic() - start)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats)
+        stats.update(enabled=self.enabled, delay=round(self.delay(), 3), latency=self.histogram.snapshot())
+        return stats
@@ -15,10 +15,18 @@ from utils import (
     _get_rich_text,
     _get_url,
     _get_url,
-    get_gemini_embedding,
+    get_gemini_embeddings_batch, # [수정] 페이지별 단건 호출 대신 배치 임베딩
     _get_multi_select,
-    translate_content_multilingual_sync # [신규]
+    translate_content_multilingual_sync, # [신규]
+    NOTION_RETRY,
+    SUPABASE_RETRY,
+    redis_client
 )
+from search_index import publish_index_version, fetch_site_pages
+from bm25_index import BM25Index, publish_bm25_artifact
+from synonyms import mine_synonyms, publish_synonyms
+from rerank_cache import invalidate_pages
+from answer_cache import invalidate_answer_pages
 
 # 로깅 설정
 logging.basicConfig(
@@ -78,6 +86,9 @@ NOTION_PROPERTY_NAMES = {
 
 STATE_FILE_PATH = "./chroma-data/indexing_state.json"
 
+# [신규] 임베딩 배치 크기 (이만큼 페이지가 모이면 embed_content 1회 + upsert 1회로 처리)
+INDEX_EMBED_BATCH_SIZE = int(os.getenv("INDEX_EMBED_BATCH_SIZE", "20"))
+
 def load_state() -> Dict[str, str]:
     if os.path.exists(STATE_FILE_PATH):
         try:
@@ -94,6 +105,36 @@ def save_state(state: Dict[str, str]):
     except Exception as e:
         logger.error(f"❌ 상태 파일 저장 실패: {e}")
 
+def build_search_artifacts():
+    """
+    [신규] 저장된 site_pages로 검색 보조 데이터를 만들어 파일/Redis에 저장 (API가 적재 시 사용)
+    - BM25 키워드 인덱스
+    - [신규] 검색어 사전 (다국어 제목/대상/카테고리 → 한국어 키워드, expand_search_query의 LLM 대체)
+    """
+    try:
+        start = time.time()
+        rows = SUPABASE_RETRY.call(
+            lambda: fetch_site_pages(supabase, columns="id,page_id,content,metadata"),
+            site="supabase.fetch_site_pages"
+        )
+    except Exception as e:
+        logger.error(f"❌ 검색 보조 데이터 생성 실패 (API가 적재 시 직접 생성): {e}")
+        return
+    try:
+        index = BM25Index.build(rows)
+        size = index.save()
+        publish_bm25_artifact(redis_client, index)
+        logger.info(f"[Indexer] 🔤 BM25 인덱스 생성: 문서 {len(index)}건, 용어 {len(index.terms)}개, "
+                    f"{size / 1024:.1f}KB ({time.time() - start:.1f}초)")
+    except Exception as e:
+        logger.error(f"❌ BM25 인덱스 생성 실패 (API가 적재 시 직접 생성): {e}")
+    try:
+        entries = mine_synonyms(rows)
+        publish_synonyms(redis_client, entries)
+        logger.info(f"[Indexer] 📖 검색어 사전 생성: {len(entries)}개 표현")
+    except Exception as e:
+        logger.error(f"❌ 검색어 사전 생성 실패 (API가 적재 시 직접 생성): {e}")
+
 def run_indexing():
     # [수정] 실행 시점에 초기화 수행
     init_clients()
@@ -111,6 +152,36 @@ def run_indexing():
     total_processed = 0
     total_skipped = 0
     has_critical_error = False
+    pending_records = []  # [신규] 임베딩 대기 중인 (임베딩용 텍스트, 레코드)
+    changed_page_ids = set()  # [신규] 이번 실행에서 다시 색인한 페이지 (랭킹 캐시 무효화용)
+
+    def flush_pending():
+        """[신규] 모인 레코드를 한 번에 임베딩하고 한 번에 저장"""
+        nonlocal total_processed
+        if not pending_records: return
+        batch = pending_records[:]
+        pending_records.clear()
+
+        logger.info(f"   ... 배치 임베딩 생성 중 ({len(batch)}건)")
+        embeddings = get_gemini_embeddings_batch([text for text, _ in batch], task_type="RETRIEVAL_DOCUMENT")
+
+        records_to_insert = []
+        for (_, record), embedding in zip(batch, embeddings):
+            if not embedding:
+                logger.warning(f"❌ 임베딩 생성 실패! 건너뜀. ('{record['metadata'].get('title')}')")
+                continue
+            record["embedding"] = embedding
+            records_to_insert.append(record)
+
+        if records_to_insert:
+            try:
+                SUPABASE_RETRY.call(
+                    lambda: supabase.table("site_pages").upsert(records_to_insert).execute(),
+                    site="supabase.upsert"
+                )
+                total_processed += len(records_to_insert)
+            except Exception as e:
+                logger.error(f"❌ Supabase 저장 실패: {e}")
     
     for category_name, db_id in DATABASE_IDS.items():
         logger.info(f"\n[Indexer] '{category_name}' DB 확인 중...")
@@ -126,7 +197,10 @@ def run_indexing():
                 if next_cursor: query_params["start_cursor"] = next_cursor
                 
                 try:
-                    response = notion.databases.query(**query_params)
+                    response = NOTION_RETRY.call(
+                        lambda: notion.databases.query(**query_params),
+                        site="notion.databases_query"
+                    )
                     results.extend(response.get("results", []))
                     has_more = response.get("has_more")
                     next_cursor = response.get("next_cursor")
@@ -149,6 +223,7 @@ def run_indexing():
                     continue
 
                 logger.info(f"⚡️ 처리 시작 (ID: {page_id})")
+                changed_page_ids.add(page_id)
 
                 try:
                     supabase.table("site_pages").delete().eq("page_id", page_id).execute()
@@ -223,15 +298,14 @@ def run_indexing():
                 if total_processed == 0: 
                      logger.debug(f"🔍 [X-RAY] 가중치 적용된 검색 데이터 예시:\n{full_text_for_embedding[:300]}...")
                 
-                # 청크 처리 및 저장
+                # 청크 처리 (임베딩/저장은 flush_pending에서 배치로)
                 chunks = [full_text_for_summary] 
-                records_to_insert = []
                 
                 for i, chunk_text in enumerate(chunks):
                     if len(chunk_text.strip()) < 10: continue
                     chunk_id = f"{page_id}_{i}"
 
-                    logger.info(f"   ... 요약 및 임베딩 생성 중 ('{title}')")
+                    logger.info(f"   ... 요약 및 번역 생성 중 ('{title}')")
                     
                     try:
 
@@ -250,16 +324,6 @@ def run_indexing():
                         zh_data = transl_dict.get("zh", {})
                         vi_data = transl_dict.get("vi", {})
 
-                        # 2. 임베딩
-                        embedding = get_gemini_embedding(
-                            full_text_for_embedding, 
-                            task_type="RETRIEVAL_DOCUMENT"
-                        )
-
-                        if not embedding:
-                            logger.warning(f"❌ 임베딩 생성 실패! 건너뜀.")
-                            continue
-
                         metadata = {
                             "page_id": page_id,
                             "category": category_name,
@@ -278,29 +342,31 @@ def run_indexing():
                             "pre_summary_vi": vi_data.get("content", "")
                         }
 
-                        records_to_insert.append({
+                        # 2. 임베딩 대기열에 추가 (배치 크기가 차면 한 번에 임베딩/저장)
+                        pending_records.append((full_text_for_embedding, {
                             "id": chunk_id,
                             "page_id": page_id,
                             "content": full_text_for_summary,
-                            "metadata": metadata,
-                            "embedding": embedding
-                        })
+                            "metadata": metadata
+                        }))
                     except Exception as e:
-                        logger.error(f"❌ LLM/임베딩 처리 중 오류: {e}")
+                        logger.error(f"❌ LLM 처리 중 오류: {e}")
                         continue
 
-                if records_to_insert:
-                    try:
-                        supabase.table("site_pages").upsert(records_to_insert).execute()
-                        total_processed += 1
-                    except Exception as e:
-                        logger.error(f"❌ Supabase 저장 실패: {e}")
+                if len(pending_records) >= INDEX_EMBED_BATCH_SIZE:
+                    flush_pending()
+
+            # 카테고리 단위로 남은 레코드 처리
+            flush_pending()
 
         except Exception as e:
             logger.error(f"❌ 카테고리 '{category_name}' 처리 중 치명적 오류: {e}")
             traceback.print_exc()
             has_critical_error = True
 
+    # 오류로 중단된 카테고리에서 남은 레코드까지 저장
+    flush_pending()
+
     # 삭제 처리 로직
     if has_critical_error:
         logger.warning("\n[Indexer] ⚠️ 오류 발생으로 삭제 단계 건너뜀.")
@@ -315,6 +381,15 @@ def run_indexing():
                     logger.warning(f"⚠️ 삭제 실패: {e}")
         
         save_state(current_state)
+        # [신규] API/워커의 로컬 검색 인덱스가 새 데이터로 다시 적재되도록 버전 게시
+        if total_processed or deleted_ids:
+            build_search_artifacts()
+            # [신규] 바뀌거나 삭제된 페이지를 참조한 답변 캐시(sem:*) 삭제 → 워커는 버전 변경을 보고 메모리에서도 제거
+            #        (버전 게시 전에 지워야 워커가 확인할 때 이미 반영되어 있음)
+            invalidate_answer_pages(redis_client, changed_page_ids | set(deleted_ids))
+            publish_index_version(redis_client)
+            # [신규] 바뀌거나 삭제된 페이지가 포함된 LLM 랭킹 캐시(rank:*) 삭제
+            invalidate_pages(redis_client, changed_page_ids | set(deleted_ids))
         logger.info(f"\n[Indexer] ✨ 완료. (업데이트: {total_processed}, 건너뜀: {total_skipped})")
 
 if __name__ == "__main__":
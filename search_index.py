@@ -0,0 +1,375 @@
+"""
+[신규] 프로세스 내 검색 인덱스 (site_pages 전체를 메모리에 올려 hybrid_search_v3 RPC 대체)
+
+복지 사업은 수백 건 수준이라, 질문마다 Supabase RPC를 1~2번 호출하는 대신
+정규화된 임베딩 행렬(float32, 연속 메모리) + 병렬 배열(page_id/카테고리/나이 범위)로 로컬 검색합니다.
+
+- VectorIndex.search(): 코사인 순위 + BM25 키워드 순위(bm25_index)를 RRF로 합친 top-k
+  (RPC와 같은 행 모양 반환). 카테고리/나이(월령) 조건은 점수 계산 전에 후보 행을 좁힘
+- AgeIntervalIndex: (start_age, end_age) 구간 인덱스. 동기/비동기 검색과 RPC 폴백이 같은 나이 규칙을 사용
+- 인덱서(run_indexer)가 저장을 마치면 publish_index_version()으로 새 버전을 알리고,
+  API/워커는 검색 시 주기적으로 버전을 확인해 백그라운드에서 다시 적재합니다.
+- 적재 전이거나 실패하면 호출부가 기존 Supabase RPC로 폴백합니다.
+
+벤치마크: python -m bench.bench_vector_index
+"""
+
+import os
+import json
+import time
+import threading
+from typing import Optional, List, Dict, Any, Callable
+
+import numpy as np
+
+from bm25_index import BM25Index
+
+INDEX_VERSION_KEY = "chatbot:search_index:version"
+# 버전 확인 주기 (초) / Redis가 없을 때 강제 재적재 주기 (초)
+INDEX_CHECK_SECONDS = float(os.getenv("SEARCH_INDEX_CHECK_SECONDS", "30"))
+INDEX_MAX_AGE_SECONDS = float(os.getenv("SEARCH_INDEX_MAX_AGE_SECONDS", "600"))
+
+# RRF 상수 (score = Σ 1 / (RRF_K + 순위))
+RRF_K = 60
+
+
+def publish_index_version(redis_conn) -> Optional[str]:
+    """[인덱서] 새 인덱스 버전 게시 (API/워커가 다음 확인 때 다시 적재)"""
+    if redis_conn is None:
+        return None
+    version = str(time.time())
+    try:
+        redis_conn.set(INDEX_VERSION_KEY, version)
+        print(f"📣 [SearchIndex] 새 인덱스 버전 게시: {version}")
+        return version
+    except Exception as e:
+        print(f"⚠️ [SearchIndex] 버전 게시 실패: {e}")
+        return None
+
+
+def fetch_site_pages(supabase_client, page_size: int = 1000,
+                     columns: str = "id,page_id,content,metadata,embedding") -> List[Dict[str, Any]]:
+    """site_pages 전체 조회 (기본은 임베딩 포함, 페이지네이션)"""
+    rows = []
+    start = 0
+    while True:
+        response = supabase_client.table("site_pages") \
+            .select(columns) \
+            .range(start, start + page_size - 1).execute()
+        batch = response.data or []
+        rows.extend(batch)
+        if len(batch) < page_size:
+            return rows
+        start += page_size
+
+
+def _parse_embedding(value) -> Optional[np.ndarray]:
+    """pgvector 값은 PostgREST를 거치면 '[0.1,...]' 문자열로 올 수 있음"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+def _age_bound(value, default: float) -> float:
+    try:
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+def age_eligible(metadata: Optional[Dict[str, Any]], age: float) -> bool:
+    """나이 규칙: 시작 월령 없음 = 0, 종료 월령 없음 = 제한 없음, 값이 잘못된 경우도 제한 없음으로 취급"""
+    meta = metadata or {}
+    return _age_bound(meta.get("start_age"), 0.0) <= age <= _age_bound(meta.get("end_age"), np.inf)
+
+
+def filter_rows_by_age(rows: List[Dict[str, Any]], age: Optional[float]) -> List[Dict[str, Any]]:
+    """[RPC 폴백용] 조회된 행을 같은 규칙으로 거름 (대상 문서가 하나도 없으면 원본 유지)"""
+    if age is None or not rows:
+        return rows
+    eligible = [row for row in rows if age_eligible(row.get("metadata"), age)]
+    return eligible or rows
+
+
+# [신규] 슬림 검색 결과: 중복 제거 / 랭킹 / 나이 필터에 쓰는 필드만 (표시용 전체 메타데이터는 화면에 나갈 결과만 따로 조회)
+SLIM_PREVIEW_CHARS = 500   # LLM 랭킹 프롬프트가 쓰는 본문 길이
+SLIM_META_FIELDS = ("page_id", "title", "category", "start_age", "end_age")
+
+
+def slim_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    """hybrid_search_v3 / 로컬 인덱스 행 → 슬림 행 (metadata는 SLIM_META_FIELDS만)"""
+    meta = row.get("metadata") or {}
+    slim_meta = {k: meta.get(k) for k in SLIM_META_FIELDS}
+    slim_meta["page_id"] = slim_meta["page_id"] or row.get("page_id")
+    slim = {"id": row.get("id"), "page_id": slim_meta["page_id"], "content": (row.get("content") or "")[:SLIM_PREVIEW_CHARS],
+            "metadata": slim_meta, "similarity": row.get("similarity")}
+    if "score" in row:
+        slim["score"] = row["score"]
+    return slim
+
+
+def slim_row_from_rpc(row: Dict[str, Any]) -> Dict[str, Any]:
+    """hybrid_search_slim RPC의 평평한 행(title, category, ... 컬럼) → 슬림 행"""
+    meta = {k: row.get(k) for k in SLIM_META_FIELDS}
+    return {"id": row.get("id"), "page_id": row.get("page_id"), "content": row.get("content_preview") or "",
+            "metadata": meta, "similarity": row.get("similarity")}
+
+
+class AgeIntervalIndex:
+    """
+    (start_age, end_age) 구간 인덱스.
+    모든 구간 경계로 나이 축을 나누고, 나뉜 구간마다 대상 문서 마스크를 미리 계산해 둡니다.
+    질의는 경계 배열 이진 탐색 1회 + 마스크 조회 (문서 수와 무관하게 O(log n))
+    """
+
+    def __init__(self, starts: np.ndarray, ends: np.ndarray):
+        starts = np.asarray(starts, dtype=np.float64)
+        ends = np.asarray(ends, dtype=np.float64)
+        # 나이 a의 대상 여부는 a == start에서 참이 되고 a > end에서 거짓이 됨
+        self.bounds = np.unique(np.concatenate([starts, np.nextafter(ends, np.inf)]))
+        reps = np.concatenate([[np.nextafter(self.bounds[0], -np.inf)], self.bounds]) if self.bounds.size else np.zeros(1)
+        self.masks = (starts[None, :] <= reps[:, None]) & (ends[None, :] >= reps[:, None])
+        self.masks.setflags(write=False)
+
+    def eligible(self, age: float) -> np.ndarray:
+        """행 순서의 bool 마스크 (읽기 전용)"""
+        return self.masks[int(np.searchsorted(self.bounds, age, side="right"))]
+
+
+class _Snapshot:
+    """한 버전의 인덱스 데이터 (교체만 하고 수정하지 않으므로 잠금 없이 읽기 가능)"""
+
+    def __init__(self, rows: List[Dict[str, Any]], version: Optional[str], bm25: Optional[BM25Index] = None):
+        vectors, kept = [], []
+        dim = None
+        for row in rows:
+            vec = _parse_embedding(row.get("embedding"))
+            if vec is None or vec.ndim != 1 or (dim is not None and vec.shape[0] != dim):
+                continue
+            dim = vec.shape[0]
+            vectors.append(vec)
+            kept.append(row)
+
+        self.version = version
+        self.loaded_at = time.time()
+        self.size = len(kept)
+        if kept:
+            matrix = np.vstack(vectors)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            norms[norms == 0] = 1.0
+            self.matrix = np.ascontiguousarray(matrix / norms, dtype=np.float32)
+        else:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+
+        metas = [row.get("metadata") or {} for row in kept]
+        self.ids = [row.get("id") for row in kept]
+        self.page_ids = [row.get("page_id") or meta.get("page_id") for row, meta in zip(kept, metas)]
+        self.contents = [row.get("content") or "" for row in kept]
+        self.metadatas = metas
+        # 표시 결과 메타데이터 조회용 (같은 페이지의 청크는 메타데이터가 같으므로 첫 행)
+        self.page_rows = {}
+        for i, page_id in enumerate(self.page_ids):
+            self.page_rows.setdefault(page_id, i)
+        self.categories = np.array([meta.get("category") or "" for meta in metas], dtype=object)
+        self.start_ages = np.array([_age_bound(meta.get("start_age"), 0.0) for meta in metas], dtype=np.float32)
+        self.end_ages = np.array([_age_bound(meta.get("end_age"), np.inf) for meta in metas], dtype=np.float32)
+        # 점수 계산 전 후보 축소용 (카테고리별 행 번호 / 나이 구간 인덱스)
+        self.category_rows = {cat: np.flatnonzero(self.categories == cat) for cat in set(self.categories)}
+        self.ages = AgeIntervalIndex(self.start_ages, self.end_ages)
+        self.bm25, self.bm25_rows, self.bm25_source = self._align_bm25(kept, bm25)
+
+    def _align_bm25(self, kept: List[Dict[str, Any]], bm25: Optional[BM25Index]):
+        """아티팩트의 문서 구성이 적재한 행과 같으면 행 순서로 매핑, 다르면(오래된 아티팩트) 직접 생성"""
+        if bm25 is not None and len(bm25) == self.size and set(bm25.doc_ids) == set(self.ids):
+            position = {doc_id: i for i, doc_id in enumerate(self.ids)}
+            return bm25, np.array([position[doc_id] for doc_id in bm25.doc_ids], dtype=np.int64), "artifact"
+        return BM25Index.build(kept), np.arange(self.size, dtype=np.int64), "built"
+
+    def bm25_scores(self, query_text: str) -> np.ndarray:
+        """행 순서의 BM25 점수"""
+        scores = np.zeros(self.size, dtype=np.float32)
+        scores[self.bm25_rows] = self.bm25.scores(query_text)
+        return scores
+
+    def row(self, i: int, similarity: float, score: float) -> Dict[str, Any]:
+        return {
+            "id": self.ids[i],
+            "page_id": self.page_ids[i],
+            "content": self.contents[i],
+            "metadata": self.metadatas[i],
+            "similarity": similarity,
+            "score": score,
+        }
+
+    def slim_row(self, i: int, similarity: float, score: float) -> Dict[str, Any]:
+        meta = self.metadatas[i]
+        return {
+            "id": self.ids[i],
+            "page_id": self.page_ids[i],
+            "content": self.contents[i][:SLIM_PREVIEW_CHARS],
+            "metadata": dict({k: meta.get(k) for k in SLIM_META_FIELDS}, page_id=self.page_ids[i]),
+            "similarity": similarity,
+            "score": score,
+        }
+
+
+class VectorIndex:
+    """
+    site_pages 임베딩의 메모리 인덱스.
+    loader: () -> rows (fetch_site_pages), version_fn: () -> 현재 게시된 버전 문자열(없으면 None)
+    """
+
+    def __init__(self, loader: Callable[[], List[Dict[str, Any]]], version_fn: Optional[Callable[[], Optional[str]]] = None,
+                 name: str = "site_pages", bm25_loader: Optional[Callable[[], Optional[BM25Index]]] = None):
+        self.loader = loader
+        self.version_fn = version_fn
+        self.bm25_loader = bm25_loader
+        self.name = name
+        self._snap: Optional[_Snapshot] = None
+        self._loading = threading.Lock()
+        self._last_check = 0.0
+        self.stats = dict.fromkeys(("searches", "loads", "load_failures", "age_pushdowns", "age_fallbacks"), 0)
+
+    @property
+    def ready(self) -> bool:
+        snap = self._snap
+        return snap is not None and snap.size > 0
+
+    @property
+    def version(self) -> Optional[str]:
+        snap = self._snap
+        return snap.version if snap else None
+
+    def load(self) -> bool:
+        """동기 적재 (이미 적재 중이면 건너뜀)"""
+        if not self._loading.acquire(blocking=False):
+            return False
+        try:
+            version = self._current_version()
+            start = time.perf_counter()
+            rows = self.loader()
+            bm25 = self.bm25_loader() if self.bm25_loader else None
+            snap = _Snapshot(rows, version, bm25)
+            self._snap = snap
+            self.stats["loads"] += 1
+            print(f"📚 [SearchIndex] {self.name} {snap.size}건 적재 ({(time.perf_counter() - start) * 1000:.0f}ms, "
+                  f"버전 {version}, BM25 {snap.bm25_source})")
+            return True
+        except Exception as e:
+            self.stats["load_failures"] += 1
+            print(f"⚠️ [SearchIndex] 적재 실패 (Supabase RPC로 폴백): {e}")
+            return False
+        finally:
+            self._last_check = time.monotonic()
+            self._loading.release()
+
+    def load_in_background(self):
+        threading.Thread(target=self.load, name=f"index-load-{self.name}", daemon=True).start()
+
+    def _current_version(self) -> Optional[str]:
+        if self.version_fn is None:
+            return None
+        try:
+            return self.version_fn()
+        except Exception:
+            return None
+
+    def maybe_refresh(self):
+        """검색 시 호출: 주기적으로 백그라운드에서 게시 버전을 확인 (검색 경로에서 Redis를 기다리지 않음)"""
+        now = time.monotonic()
+        if now - self._last_check < INDEX_CHECK_SECONDS:
+            return
+        self._last_check = now
+        threading.Thread(target=self._refresh_if_stale, name=f"index-check-{self.name}", daemon=True).start()
+
+    def _refresh_if_stale(self):
+        snap = self._snap
+        version = self._current_version()
+        stale = snap is None or (version is not None and version != snap.version) \
+            or (version is None and time.time() - snap.loaded_at > INDEX_MAX_AGE_SECONDS)
+        if stale:
+            self.load()
+
+    def search(self, query_embedding, match_threshold: float = 0.4, match_count: int = 20,
+               filter_category: Optional[str] = None, keywords: Optional[List[str]] = None,
+               query_text: Optional[str] = None, user_age: Optional[float] = None,
+               slim: bool = False) -> List[Dict[str, Any]]:
+        """
+        코사인 유사도 순위와 BM25 순위를 RRF로 합친 top-k. hybrid_search_v3와 같은 행 모양 (slim이면 slim_row 모양)
+        - 카테고리/나이 조건에 맞는 행만 점수 계산 (나이 조건으로 결과가 없으면 나이 조건 없이 한 번 더)
+        - 벡터 후보: 유사도 match_threshold 이상
+        - 키워드 후보: BM25 상위 match_count건 (유사도가 기준 미만이어도 사업명 등이 정확히 일치하면 포함)
+        """
+        self.maybe_refresh()
+        snap = self._snap
+        if snap is None or snap.size == 0:
+            raise RuntimeError("검색 인덱스가 아직 적재되지 않았습니다")
+        self.stats["searches"] += 1
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return []
+        query = query / norm
+        text = " ".join(t for t in [query_text, *(keywords or [])] if t)
+        bm25 = snap.bm25_scores(text) if text else None
+
+        category_rows = snap.category_rows.get(filter_category, np.zeros(0, dtype=np.int64)) if filter_category else None
+        if user_age is not None:
+            eligible = snap.ages.eligible(user_age)
+            age_rows = np.flatnonzero(eligible) if category_rows is None else category_rows[eligible[category_rows]]
+            results = self._rank(snap, query, age_rows, bm25, match_threshold, match_count, slim)
+            if results:
+                self.stats["age_pushdowns"] += 1
+                return results
+            # 나이 조건에 맞는 결과가 없으면 나이 조건 없이 검색 (기존 Age Filter의 "원본 유지"와 같은 동작)
+            self.stats["age_fallbacks"] += 1
+        return self._rank(snap, query, category_rows, bm25, match_threshold, match_count, slim)
+
+    @staticmethod
+    def _rank(snap: _Snapshot, query: np.ndarray, rows: Optional[np.ndarray], bm25: Optional[np.ndarray],
+              match_threshold: float, match_count: int, slim: bool = False) -> List[Dict[str, Any]]:
+        """rows(None이면 전체) 안에서만 점수 계산 후 RRF 순위"""
+        if rows is not None and rows.size == 0:
+            return []
+        sims = (snap.matrix if rows is None else snap.matrix[rows]) @ query
+        fused = np.zeros(sims.size, dtype=np.float32)
+
+        vector_hits = np.flatnonzero(sims >= match_threshold)
+        vector_hits = vector_hits[np.argsort(-sims[vector_hits], kind="stable")]
+        fused[vector_hits] += 1.0 / (RRF_K + 1 + np.arange(vector_hits.size))
+
+        if bm25 is not None:
+            keyword_scores = bm25 if rows is None else bm25[rows]
+            keyword_hits = np.flatnonzero(keyword_scores > 0)
+            keyword_hits = keyword_hits[np.argsort(-keyword_scores[keyword_hits], kind="stable")][:match_count]
+            fused[keyword_hits] += 1.0 / (RRF_K + 1 + np.arange(keyword_hits.size))
+
+        candidates = np.flatnonzero(fused > 0)
+        if candidates.size == 0:
+            return []
+        # 동점이면 코사인 유사도 순
+        order = candidates[np.lexsort((-sims[candidates], -fused[candidates]))[:match_count]]
+        row_ids = order if rows is None else rows[order]
+        make_row = snap.slim_row if slim else snap.row
+        return [make_row(int(r), float(sims[i]), float(fused[i])) for r, i in zip(row_ids, order)]
+
+    def metadatas(self) -> List[Dict[str, Any]]:
+        """[신규] 현재 적재된 버전의 행별 메타데이터 (한 스냅샷에서 읽음, 공유 객체이므로 수정하지 않음)"""
+        snap = self._snap
+        return list(snap.metadatas) if snap is not None else []
+
+    def page_metadata(self, page_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """적재된 인덱스에서 page_id별 전체 메타데이터 (공유 객체이므로 호출부가 복사해서 사용)"""
+        snap = self._snap
+        if snap is None:
+            return {}
+        return {pid: snap.metadatas[snap.page_rows[pid]] for pid in page_ids if pid in snap.page_rows}
+
+    def snapshot(self) -> dict:
+        snap = self._snap
+        return dict(self.stats, ready=self.ready, size=snap.size if snap else 0,
+                    version=snap.version if snap else None, bm25=snap.bm25_source if snap else None,
+                    age_seconds=round(time.time() - snap.loaded_at, 1) if snap else None)
@@ -0,0 +1,72 @@
+-- [신규] 슬림 검색 RPC (utils.hybrid_search, SEARCH_SLIM=true일 때 사용)
+--
+-- hybrid_search_v3와 같은 인자/순위로 검색하되, 워커의 중복 제거 / 랭킹 / 나이 필터에 필요한 컬럼만 반환합니다.
+-- 후보마다 metadata 전체(다국어 제목/요약 8개 필드)와 본문 전체를 보내지 않고
+-- 제목 / 카테고리 / 나이 범위 / 본문 앞 500자(LLM 랭킹 프롬프트 길이) / 유사도만 보냅니다.
+-- 화면에 나가는 2건의 표시용 필드는 워커가 page_id로 따로 조회합니다 (utils.hydrate_display_results).
+--
+-- [수정] user_age(월령): 나이 조건을 DB에서 LIMIT 전에 적용합니다 (워커가 match_count건을 받아 버리지 않도록).
+--   - 규칙은 search_index.age_eligible과 동일: 시작 월령 없음/잘못된 값 = 0, 종료 월령 없음/잘못된 값 = 제한 없음
+--   - 대상 문서가 하나도 없으면 나이 조건 없이 반환 (로컬 인덱스 / filter_rows_by_age의 "원본 유지"와 동일)
+--   - hybrid_search_v3 자체에는 나이 인자가 없으므로, 나이가 있으면 v3에서 match_count × age_candidate_factor건을
+--     v3 순위 그대로 받아 거른 뒤 상위 match_count건만 반환합니다 (완전한 push-down은 v3 수정이 필요)
+--
+-- 이 함수가 없으면(또는 user_age 인자가 없는 이전 버전이면) 워커는 한 번 경고하고 hybrid_search_v3 + 로컬 투영으로 폴백합니다.
+
+-- 인자 목록이 바뀌었으므로 이전 버전을 지움 (create or replace는 인자가 다르면 오버로드를 새로 만듦)
+drop function if exists hybrid_search_slim(text, vector, float, int, text, text[]);
+
+create or replace function hybrid_search_slim(
+  query_text text,
+  query_embedding vector,
+  match_threshold float,
+  match_count int,
+  filter_category text default null,
+  keywords_arr text[] default null,
+  user_age float default null,
+  age_candidate_factor int default 4
+)
+returns table (
+  id text,
+  page_id text,
+  title text,
+  category text,
+  start_age text,   -- 숫자가 아닌 값도 있을 수 있어 문자열 그대로 (워커가 해석)
+  end_age text,
+  content_preview text,
+  similarity float
+)
+language sql stable
+as $$
+  with candidates as (
+    select
+      h.id::text as id,
+      h.metadata->>'page_id' as page_id,
+      h.metadata->>'title' as title,
+      h.metadata->>'category' as category,
+      h.metadata->>'start_age' as start_age,
+      h.metadata->>'end_age' as end_age,
+      left(h.content, 500) as content_preview,
+      h.similarity::float as similarity,
+      h.ordinality as rank,
+      user_age is null or (
+        coalesce(case when h.metadata->>'start_age' ~ '^\s*-?\d+(\.\d+)?\s*$'
+                      then (h.metadata->>'start_age')::float end, 0) <= user_age
+        and user_age <= coalesce(case when h.metadata->>'end_age' ~ '^\s*-?\d+(\.\d+)?\s*$'
+                                      then (h.metadata->>'end_age')::float end, 'infinity'::float)
+      ) as eligible
+    from hybrid_search_v3(
+      query_text, query_embedding, match_threshold,
+      case when user_age is null then match_count else match_count * greatest(age_candidate_factor, 1) end,
+      filter_category, keywords_arr
+    ) with ordinality as h
+  ),
+  scope as (
+    select exists (select 1 from candidates where eligible) as any_eligible
+  )
+  select c.id, c.page_id, c.title, c.category, c.start_age, c.end_age, c.content_preview, c.similarity
+  from candidates c, scope s
+  where c.eligible or not s.any_eligible
+  order by c.rank
+  limit match_count;
+$$;
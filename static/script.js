@@ -573,53 +573,63 @@ async function fetchChatResponse(requestBody) {
     chatBox.scrollTop = chatBox.scrollHeight;
 }
 
-async function pollForResult(jobId, question, loadingElement, messageIntervalId, actionTextEl, tipTextEl, pollInterval = 1000) {
-    let attempts = 0;
-    const intervalId = setInterval(async () => {
-        attempts++;
-        if (attempts > 120) {
-            clearInterval(intervalId); clearInterval(messageIntervalId);
-            loadingElement.innerHTML = '<p>시간 초과</p>';
-            setLoadingState(false);
-            return;
-        }
+// [수정] 롱 폴링: 서버가 결과 저장 시점까지(최대 LONG_POLL_WAIT_SECONDS초) 응답을 미루므로 질문당 요청 1~2회
+const LONG_POLL_WAIT_SECONDS = 25;
+const RESULT_TIMEOUT_MS = 120000;
+const MIN_POLL_INTERVAL_MS = 1000; // 서버가 바로 pending을 주면(롱 폴링 미지원) 기존처럼 1초 간격
+
+async function pollForResult(jobId, question, loadingElement, messageIntervalId, actionTextEl, tipTextEl) {
+    const deadline = Date.now() + RESULT_TIMEOUT_MS;
+    while (Date.now() < deadline) {
+        const requestStartedAt = Date.now();
         try {
-            const resultResponse = await fetch(`${API_URL_RESULT}${jobId}`);
-            if (!resultResponse.ok) return;
-            const resultData = await resultResponse.json();
-
-            if (resultData.status === 'complete') {
-                clearInterval(intervalId); clearInterval(messageIntervalId);
-
-                let finalHTML = "";
-                if (resultData.answer.includes('result-card')) {
-                    finalHTML = resultData.answer;
-                } else {
-                    finalHTML = marked.parse(resultData.answer);
+            const resultResponse = await fetch(`${API_URL_RESULT}${jobId}?wait=${LONG_POLL_WAIT_SECONDS}`);
+            if (resultResponse.ok) {
+                const resultData = await resultResponse.json();
+
+                if (resultData.status === 'complete') {
+                    clearInterval(messageIntervalId);
+
+                    let finalHTML = "";
+                    if (resultData.answer.includes('result-card')) {
+                        finalHTML = resultData.answer;
+                    } else {
+                        finalHTML = marked.parse(resultData.answer);
+                    }
+
+                    // [적용] 타이핑 효과
+                    await typeWriterEffect(loadingElement, finalHTML);
+
+                    translateCardButtons(loadingElement);
+
+                    updateChatHistory("assistant", resultData.answer);
+                    currentResultIds = resultData.last_result_ids || [];
+                    currentTotalFound = resultData.total_found || 0;
+                    currentShownCount = Math.min(2, currentResultIds.length);
+
+                    addFeedbackButtons(loadingElement, jobId, question, resultData.answer);
+                    setLoadingState(false);
+                    chatBox.scrollTop = chatBox.scrollHeight;
+                    return;
+                } else if (resultData.status === 'error') {
+                    clearInterval(messageIntervalId);
+                    loadingElement.innerHTML = `<p>오류: ${resultData.message}</p>`;
+                    setLoadingState(false);
+                    chatBox.scrollTop = chatBox.scrollHeight;
+                    return;
                 }
-
-                // [적용] 타이핑 효과
-                await typeWriterEffect(loadingElement, finalHTML);
-
-                translateCardButtons(loadingElement);
-
-                updateChatHistory("assistant", resultData.answer);
-                currentResultIds = resultData.last_result_ids || [];
-                currentTotalFound = resultData.total_found || 0;
-                currentShownCount = Math.min(2, currentResultIds.length);
-
-                addFeedbackButtons(loadingElement, jobId, question, resultData.answer);
-                setLoadingState(false);
-            } else if (resultData.status === 'error') {
-                clearInterval(intervalId); clearInterval(messageIntervalId);
-                loadingElement.innerHTML = `<p>오류: ${resultData.message}</p>`;
-                setLoadingState(false);
             }
-            chatBox.scrollTop = chatBox.scrollHeight;
         } catch (error) {
             console.error('Polling loop error:', error);
         }
-    }, pollInterval);
+        const elapsed = Date.now() - requestStartedAt;
+        if (elapsed < MIN_POLL_INTERVAL_MS) {
+            await new Promise(r => setTimeout(r, MIN_POLL_INTERVAL_MS - elapsed));
+        }
+    }
+    clearInterval(messageIntervalId);
+    loadingElement.innerHTML = '<p>시간 초과</p>';
+    setLoadingState(false);
 }
 
 // --- 6. 헬퍼 함수 ---
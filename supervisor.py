@@ -0,0 +1,263 @@
+"""
+[신규] 워커 프로세스 관리자 (prefork + 상태 확인 + 자동 재시작)
+
+python worker.py --processes N 으로 실행하면 부모 프로세스가 utils 등을 한 번만 import한 뒤
+자식 워커 N개를 fork합니다. import된 모듈/SDK 메모리는 자식들이 copy-on-write로 공유합니다.
+(gc.freeze()로 import 시점 객체를 GC 대상에서 빼서, 자식의 gc.collect()가 공유 페이지를 건드리지 않도록 함)
+
+- 하트비트: 자식은 루프를 돌 때마다 공유 메모리(RawArray)에 시각 기록
+  → WORKER_STUCK_SECONDS 이상 갱신이 없으면 멈춘 것으로 보고 SIGKILL 후 재시작
+- 비정상 종료한 자식은 재시작 (시작 직후 계속 죽으면 1초 → 최대 60초까지 간격을 늘림)
+- SIGTERM/SIGINT: 자식에게 SIGTERM 전달 → 처리 중인 작업을 마칠 때까지 기다린 뒤, 시간 초과 시 SIGKILL
+- Redis 하트비트: 각 워커가 chatbot:workers:{호스트}:{pid} 해시에 처리량/동시 처리 수를 주기적으로 기록 (TTL)
+  → /admin/stats "workers"에서 살아 있는 워커 확인 (HeartbeatPublisher / list_live_workers)
+
+fork 전에는 스레드/네트워크 연결을 만들지 않아야 합니다 (스레드 풀/임베딩 배처는 처음 쓸 때 생성되므로 안전).
+로컬 검색 인덱스는 Supabase HTTP 연결을 자식끼리 공유하지 않도록 각 자식이 적재합니다.
+"""
+
+import os
+import gc
+import sys
+import time
+import signal
+import socket
+import threading
+import traceback
+import multiprocessing
+from typing import Callable, Dict, List, Optional
+
+WORKER_PROCESSES = int(os.getenv("WORKER_PROCESSES", "1"))
+# 하트비트가 이 시간(초) 이상 없으면 멈춘 워커로 판단 (동기 모드는 작업 1건 처리 시간보다 길어야 함)
+WORKER_STUCK_SECONDS = float(os.getenv("WORKER_STUCK_SECONDS", "300"))
+WORKER_HEARTBEAT_SECONDS = float(os.getenv("WORKER_HEARTBEAT_SECONDS", "5"))
+
+WORKERS_KEY_PREFIX = "chatbot:workers:"
+
+# 시작 후 이 시간 안에 죽으면 재시작 간격을 늘림 (설정 오류 등으로 인한 fork 폭주 방지)
+MIN_UPTIME_SECONDS = 10.0
+MAX_RESTART_BACKOFF = 60.0
+
+
+def _describe_exit(status: int) -> str:
+    if os.WIFSIGNALED(status):
+        return f"시그널 {signal.Signals(os.WTERMSIG(status)).name}"
+    return f"종료 코드 {os.WEXITSTATUS(status)}"
+
+
+class PreforkSupervisor:
+    """
+    target(slot, generation, heartbeat): 자식 프로세스에서 실행할 워커 함수
+    - slot: 0..processes-1 자리 번호, generation: 그 자리의 재시작 횟수
+    - heartbeat(): 워커 루프가 살아 있을 때마다 호출
+    """
+
+    def __init__(self, target: Callable[[int, int, Callable[[], None]], None], processes: int = WORKER_PROCESSES,
+                 stuck_seconds: float = WORKER_STUCK_SECONDS, shutdown_grace: float = 60.0):
+        self.target = target
+        self.processes = max(1, processes)
+        self.stuck_seconds = stuck_seconds
+        self.shutdown_grace = shutdown_grace
+        self._beats = multiprocessing.RawArray("d", self.processes)  # fork로 공유되는 하트비트 시각 (monotonic)
+        self._pids: Dict[int, int] = {}          # pid -> slot
+        self._slots: List[dict] = [{"pid": None, "generation": 0, "started": 0.0, "backoff": 1.0,
+                                    "restart_at": 0.0, "killed": False} for _ in range(self.processes)]
+        self._stopping = False
+        self.stats = {"spawned": 0, "restarts": 0, "crashes": 0, "stuck_kills": 0}
+
+    # --- 자식 ---
+    def _beat(self, slot: int):
+        self._beats[slot] = time.monotonic()
+
+    def _spawn(self, slot: int):
+        state = self._slots[slot]
+        self._beats[slot] = time.monotonic()
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                # 부모의 종료 핸들러를 물려받지 않음 (워커가 자체 핸들러 설치)
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                self.target(slot, state["generation"], lambda: self._beat(slot))
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os._exit(code)
+        state.update(pid=pid, started=time.monotonic(), killed=False)
+        self._pids[pid] = slot
+        self.stats["spawned"] += 1
+        print(f"🐣 [Supervisor] 워커 #{slot} 시작 (PID {pid}, 재시작 {state['generation']}회)")
+
+    # --- 부모 ---
+    def _on_signal(self, signum, frame):
+        if not self._stopping:
+            print(f"🛑 [Supervisor] {signal.Signals(signum).name} 수신 → 워커 종료 중")
+        self._stopping = True
+
+    def _reap(self):
+        while self._pids:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            slot = self._pids.pop(pid, None)
+            if slot is None:
+                continue
+            state = self._slots[slot]
+            state["pid"] = None
+            if self._stopping:
+                continue
+            uptime = time.monotonic() - state["started"]
+            clean = os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
+            if not clean and not state["killed"]:
+                self.stats["crashes"] += 1
+            state["backoff"] = 1.0 if uptime >= MIN_UPTIME_SECONDS else min(state["backoff"] * 2, MAX_RESTART_BACKOFF)
+            state["restart_at"] = time.monotonic() + state["backoff"]
+            print(f"💀 [Supervisor] 워커 #{slot} (PID {pid}) 종료: {_describe_exit(status)}, "
+                  f"{uptime:.0f}초 실행 → {state['backoff']:.0f}초 후 재시작")
+
+    def _check_stuck(self):
+        now = time.monotonic()
+        for slot, state in enumerate(self._slots):
+            if state["pid"] is None or state["killed"]:
+                continue
+            silent = now - self._beats[slot]
+            if silent > self.stuck_seconds:
+                print(f"🧊 [Supervisor] 워커 #{slot} (PID {state['pid']}) {silent:.0f}초간 응답 없음 → 강제 종료")
+                state["killed"] = True
+                self.stats["stuck_kills"] += 1
+                try:
+                    os.kill(state["pid"], signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+
+    def _respawn_due(self):
+        now = time.monotonic()
+        for slot, state in enumerate(self._slots):
+            if state["pid"] is None and now >= state["restart_at"]:
+                state["generation"] += 1
+                self.stats["restarts"] += 1
+                self._spawn(slot)
+
+    def _shutdown(self):
+        for pid in list(self._pids):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        deadline = time.monotonic() + self.shutdown_grace + 5
+        while self._pids and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.2)
+        for pid in list(self._pids):
+            print(f"⚠️ [Supervisor] PID {pid} 종료 시간 초과 → SIGKILL")
+            try:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+            self._pids.pop(pid, None)
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        print(f"🚀 [Supervisor] 워커 {self.processes}개 시작 (PID {os.getpid()}, 멈춤 기준 {self.stuck_seconds:.0f}초)")
+        # import 시점 객체를 영구 세대로 옮겨 자식의 GC가 공유 페이지에 쓰지 않도록 (copy-on-write 유지)
+        gc.collect()
+        gc.freeze()
+        for slot in range(self.processes):
+            self._spawn(slot)
+        while not self._stopping:
+            self._reap()
+            self._check_stuck()
+            self._respawn_due()
+            time.sleep(1.0)
+        self._shutdown()
+        print(f"👋 [Supervisor] 종료 ({self.stats})")
+
+
+class HeartbeatPublisher:
+    """[워커] 처리량/상태를 chatbot:workers:{호스트}:{pid} 해시에 주기적으로 기록 (백그라운드 스레드)"""
+
+    def __init__(self, redis_conn, stats_fn: Callable[[], dict], info: Optional[dict] = None,
+                 interval: float = WORKER_HEARTBEAT_SECONDS):
+        self.redis = redis_conn
+        self.stats_fn = stats_fn
+        self.interval = interval
+        self.key = f"{WORKERS_KEY_PREFIX}{socket.gethostname()}:{os.getpid()}"
+        self.info = dict(info or {}, host=socket.gethostname(), pid=os.getpid(), started_at=round(time.time(), 1))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last = (time.monotonic(), 0)
+        self._failing = False
+
+    def publish(self):
+        stats = self.stats_fn()
+        now = time.monotonic()
+        last_at, last_jobs = self._last
+        self._last = (now, stats.get("jobs", 0))
+        jobs_per_min = (stats.get("jobs", 0) - last_jobs) / (now - last_at) * 60 if now > last_at else 0.0
+        fields = dict(self.info, **stats, jobs_per_min=round(jobs_per_min, 2), updated_at=round(time.time(), 1))
+        pipe = self.redis.pipeline()
+        pipe.hset(self.key, mapping={k: str(v) for k, v in fields.items() if v is not None})
+        pipe.expire(self.key, max(1, round(self.interval * 3)))
+        pipe.execute()
+
+    def _publish_safe(self):
+        try:
+            self.publish()
+            self._failing = False
+        except Exception as e:
+            if not self._failing:  # Redis 장애 동안 주기마다 같은 로그를 남기지 않음
+                print(f"⚠️ [Heartbeat] 기록 실패: {e}")
+            self._failing = True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._publish_safe()
+
+    def start(self):
+        if self.redis is None:
+            return
+        self._publish_safe()
+        self._thread = threading.Thread(target=self._run, name="heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self.redis is None:
+            return
+        try:
+            self.redis.delete(self.key)
+        except Exception:
+            pass
+
+
+def list_live_workers(redis_conn) -> dict:
+    """[API] TTL이 남은 워커 하트비트 목록 (/admin/stats)"""
+    if redis_conn is None:
+        return {"live": 0, "processes": []}
+    try:
+        keys = sorted(redis_conn.scan_iter(match=WORKERS_KEY_PREFIX + "*", count=200))
+        pipe = redis_conn.pipeline()
+        for key in keys:
+            pipe.hgetall(key)
+        processes = []
+        for raw in pipe.execute():
+            if raw:
+                processes.append({k.decode() if isinstance(k, bytes) else k: v.decode() if isinstance(v, bytes) else v
+                                  for k, v in raw.items()})
+    except Exception as e:
+        return {"live": 0, "processes": [], "error": str(e)}
+    return {
+        "live": len(processes),
+        "jobs_per_min": round(sum(float(p.get("jobs_per_min", 0)) for p in processes), 2),
+        "in_flight": sum(int(p.get("in_flight", 0)) for p in processes),
+        "processes": processes,
+    }
@@ -0,0 +1,216 @@
+"""
+[신규] 코퍼스 기반 검색어 사전 (expand_search_query의 LLM 호출 대체)
+
+인덱서가 색인한 사업의 제목 / 다국어 제목(title_en/zh/vi) / 대상 특성 / 카테고리로
+"표현 → 한국어 검색 키워드" 사전을 만들어 둡니다.
+- 외국어 제목: "儿童津贴", "child allowance" → 아동수당
+- 한국어 제목 단어: "발달재활서비스" → 발달재활서비스
+- 구어체 표현(COLLOQUIAL_SEEDS): "병원비" → 의료비 (코퍼스에 있는 키워드만 남김)
+
+질문이 사전으로 모두 설명되면 LLM 없이 확장하고, 모르는 단어가 남을 때만 LLM에 맡깁니다.
+인덱서가 Redis/파일에 저장하고, 없으면 API가 적재한 site_pages 메타데이터로 직접 생성합니다.
+"""
+
+import os
+import re
+import json
+import time
+from collections import defaultdict
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+
+SYNONYMS_KEY = "chatbot:search_index:synonyms"
+SYNONYMS_PATH = os.getenv("SYNONYMS_PATH", "./chroma-data/synonyms.json")
+
+# 여러 사업 제목에 흔히 나오는 외국어 단어는 특정 사업을 가리키지 않으므로 제외 (문서 빈도 상한)
+MAX_WORD_DF = 3
+
+# 구어체/생활 표현 → 검색 키워드 (값 중 코퍼스 어휘에 있는 것만 사전에 들어감)
+COLLOQUIAL_SEEDS = {
+    "돈": ["수당", "지원금", "급여"],
+    "용돈": ["수당", "지원금"],
+    "병원비": ["의료비", "치료"],
+    "치료비": ["치료", "바우처", "의료비"],
+    "검사비": ["검사", "정밀검사"],
+    "말이늦": ["언어", "발달", "언어치료"],
+    "말늦": ["언어", "발달", "언어치료"],
+    "늦되": ["발달", "발달지연"],
+    "맡길": ["돌봄", "보육", "시간제"],
+    "맡기": ["돌봄", "보육", "시간제"],
+    "봐줄": ["돌봄", "아이돌봄"],
+    "베이비시터": ["돌봄", "아이돌봄"],
+    "어린이집비": ["보육료", "어린이집"],
+    "유치원비": ["유아학비", "유치원"],
+    "기저귀값": ["기저귀"],
+    "분유값": ["분유", "조제분유"],
+    "택시": ["교통비", "차량"],
+    "버스": ["교통비"],
+    "출산": ["첫만남", "출생"],
+    "태어난": ["첫만남", "출생", "부모급여"],
+    "신생아": ["첫만남", "부모급여"],
+    "싱글맘": ["한부모"],
+    "싱글대디": ["한부모"],
+    "외국인": ["다문화"],
+}
+
+_SPLIT_RE = re.compile(r"[\s·,/()\[\]]+")
+_LATIN_WORD_RE = re.compile(r"[a-zà-ỹđ]+(?:'[a-z]+)?")
+_CJK_RE = re.compile(r"[一-鿿]")
+_HANGUL_RE = re.compile(r"[가-힣]")
+
+# 외국어 제목에서 키로 쓰지 않을 단어
+_FOREIGN_STOP = {
+    "support", "service", "services", "program", "programme", "for", "and", "the", "of", "with", "to", "in",
+    "hỗ", "trợ", "dịch", "vụ", "chương", "trình", "cho", "và", "của", "trẻ", "em",
+}
+
+# 질문 어휘(신청/받기 등)는 사업을 특정하지 않으므로 "모르는 단어"로 보지 않음 (LLM 호출 사유 아님)
+_NEUTRAL_FOREIGN = {
+    "apply", "application", "get", "receive", "need", "want", "my", "our", "child", "kid", "kids", "baby",
+    "do", "does", "i", "we", "have", "has", "there", "any", "which", "who", "much", "eligible", "eligibility",
+    "đăng", "ký", "nhận", "cần", "con", "bé", "tiền", "bao", "nhiêu",
+    "申请", "领取", "孩子", "宝宝", "多少", "哪些", "办理", "怎么", "什么", "如何", "哪里", "可以", "需要",
+    "我", "的", "吗", "请", "有", "能", "要", "给",
+}
+# 긴 표현부터 지워야 "怎么"가 "么"만 남기지 않음
+_NEUTRAL_CJK = sorted((w for w in _NEUTRAL_FOREIGN if _CJK_RE.search(w)), key=len, reverse=True)
+
+
+def _korean_terms(title: str) -> List[str]:
+    return [w for w in _SPLIT_RE.split(title or "") if len(w) >= 2]
+
+
+def mine_synonyms(rows: Iterable[Dict[str, Any]]) -> Dict[str, List[str]]:
+    """site_pages 행(metadata)으로 사전 생성: {표현(소문자): [한국어 키워드, ...]}"""
+    entries: Dict[str, set] = defaultdict(set)
+    word_docs: Dict[str, set] = defaultdict(set)
+    vocabulary = set()
+
+    for row in rows:
+        meta = row.get("metadata") or {}
+        title = (meta.get("title") or "").strip()
+        if not title:
+            continue
+        terms = _korean_terms(title)
+        vocabulary.update(terms)
+        for term in terms:
+            entries[term.lower()].add(term)
+
+        # 대상 특성 / 카테고리 단어
+        for target in meta.get("sub_category_list") or []:
+            if target and len(target) >= 2:
+                entries[target.lower()].add(target)
+                vocabulary.add(target)
+        for part in _SPLIT_RE.split(meta.get("category") or ""):
+            if len(part) >= 2:
+                vocabulary.add(part)
+
+        # 다국어 제목: 전체 구문 → 한국어 제목 단어, 영어/베트남어 단어는 문서 빈도가 낮을 때만
+        for field in ("title_en", "title_zh", "title_vi"):
+            foreign = (meta.get(field) or "").strip().lower()
+            if not foreign:
+                continue
+            entries[foreign].update(terms)
+            if field != "title_zh":
+                for word in _LATIN_WORD_RE.findall(foreign):
+                    if len(word) >= 4 and word not in _FOREIGN_STOP and word not in _NEUTRAL_FOREIGN:
+                        word_docs[word].add(title)
+                        entries[word].update(terms)
+
+    for word, titles in word_docs.items():
+        if len(titles) > MAX_WORD_DF:
+            entries.pop(word, None)
+
+    # 구어체 표현은 코퍼스 어휘(제목 단어에 포함된 키워드)와 겹치는 것만
+    for phrase, keywords in COLLOQUIAL_SEEDS.items():
+        known = [k for k in keywords if any(k in term for term in vocabulary)]
+        if known:
+            entries[phrase].update(known)
+
+    return {key: sorted(values) for key, values in entries.items() if key and values}
+
+
+class SynonymDictionary:
+    """expand(): 질문에서 사전 표현을 찾아 (키워드, 사전에 없는 단어) 반환"""
+
+    def __init__(self, entries: Dict[str, List[str]], version: Optional[str] = None):
+        self.entries = entries
+        self.version = version
+        self.loaded_at = time.time()
+        # 한글/한자 키는 부분 문자열로, 영어/베트남어 키는 단어 n-gram으로 찾음
+        substring_keys = [k for k in entries if _HANGUL_RE.search(k) or _CJK_RE.search(k)]
+        self._substring_keys = [(k, k.replace(" ", "")) for k in sorted(substring_keys, key=len, reverse=True)]
+        self._max_words = max((len(k.split()) for k in set(entries) - set(substring_keys)), default=1)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def expand(self, text: str, tokens: List[str]) -> Tuple[List[str], List[str]]:
+        """
+        text: 정리된 질문, tokens: 불용어를 뺀 질문 단어
+        반환: (사전 키워드, 사전으로 설명되지 않은 외국어 단어)
+        """
+        lowered = text.lower()
+        compact = lowered.replace(" ", "")
+        keywords, matched_spans = [], []
+        for key, compact_key in self._substring_keys:
+            if compact_key in compact:
+                keywords.extend(self.entries[key])
+                matched_spans.append(compact_key)
+
+        words = _LATIN_WORD_RE.findall(lowered)
+        matched_words = set()
+        for n in range(min(self._max_words, len(words)), 0, -1):
+            for i in range(len(words) - n + 1):
+                phrase = " ".join(words[i:i + n])
+                if phrase in self.entries:
+                    keywords.extend(self.entries[phrase])
+                    matched_words.update(words[i:i + n])
+
+        # 한국어 단어는 BM25/벡터 검색이 그대로 처리하므로 외국어 단어만 "모르는 단어"로 봄
+        unknown = []
+        for token in tokens:
+            t = token.lower()
+            if _HANGUL_RE.search(t) or t.isdigit() or t in matched_words or t in _NEUTRAL_FOREIGN:
+                continue
+            # 한자 토큰은 띄어쓰기가 없으므로 사전 표현/질문 어휘를 지운 나머지가 없을 때만 설명된 것으로 봄
+            rest = t
+            for span in matched_spans + _NEUTRAL_CJK:
+                rest = rest.replace(span, "")
+            if not rest.strip():
+                continue
+            unknown.append(token)
+        return list(dict.fromkeys(keywords)), unknown
+
+
+def publish_synonyms(redis_conn, entries: Dict[str, List[str]], path: str = SYNONYMS_PATH) -> bool:
+    """[인덱서] 사전을 파일과 Redis에 저장"""
+    data = json.dumps(entries, ensure_ascii=False, separators=(",", ":"))
+    try:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+    except Exception as e:
+        print(f"⚠️ [Synonyms] 파일 저장 실패: {e}")
+    if redis_conn is None:
+        return False
+    try:
+        redis_conn.set(SYNONYMS_KEY, data)
+        print(f"📖 [Synonyms] 사전 저장: {len(entries)}개 표현, {len(data.encode('utf-8')) / 1024:.1f}KB")
+        return True
+    except Exception as e:
+        print(f"⚠️ [Synonyms] Redis 저장 실패: {e}")
+        return False
+
+
+def load_synonyms(redis_conn, path: str = SYNONYMS_PATH) -> Optional[Dict[str, List[str]]]:
+    """[API/워커] Redis → 로컬 파일 순으로 사전 읽기 (없으면 None)"""
+    try:
+        data = redis_conn.get(SYNONYMS_KEY) if redis_conn is not None else None
+        if data:
+            return json.loads(data)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+    except Exception as e:
+        print(f"⚠️ [Synonyms] 사전 읽기 실패: {e}")
+    return None
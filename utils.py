@@ -28,6 +28,9 @@ import secrets  # [추가] 보안 토큰 생성용
 import logging  # [추가] 구조화된 로깅
 # redis는 위에서 이미 import됨 (중복 제거)
 import warnings
+import threading
+import concurrent.futures
+import struct
 
 # [신규] 구조화된 로깅 설정
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -58,11 +61,24 @@ except ImportError:
     print("❌ google.genai package not found. Please install it.")
     genai = None
     print("❌ google.genai is required for this application")
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from notion_client import Client as NotionClient
 from supabase import create_client, create_async_client
-from functools import lru_cache
-from typing import Optional, List
+from collections import OrderedDict
+from contextlib import contextmanager, asynccontextmanager
+from typing import Optional, List, Tuple
+from resilience import (
+    KeyScheduler, NoAvailableKeyError, RetryPolicy, RetryBudget,
+    CircuitBreaker, RedisBreakerStore, FATAL, Hedger,
+    is_quota_error, parse_retry_delay, classify_error, get_retry_stats
+)
+from intent_classifier import classify_intent_fast, get_fast_intent_stats
+from search_index import (VectorIndex, fetch_site_pages, filter_rows_by_age, slim_row, slim_row_from_rpc,
+                          INDEX_VERSION_KEY, INDEX_CHECK_SECONDS)
+from bm25_index import load_bm25_artifact
+from local_rerank import rank_locally, record_decision, get_local_rerank_stats
+from rerank_cache import RerankCache
+from answer_cache import SemanticAnswerCache, SEMANTIC_CACHE_ENABLED
+from synonyms import SynonymDictionary, mine_synonyms, load_synonyms
 
 # Groq import (사용 가능한 경우에만)
 try:
@@ -218,27 +234,184 @@ LLM_CLIENT = None
 GROQ_CLIENT = None
 GROQ_SYNC_CLIENT = None
 
-# [신규] google.genai Client 초기화 (Lazy Loading)
-# 전역에서 바로 실행하지 않고, 필요할 때 호출하거나 명시적으로 초기화합니다.
+# --- [신규] 키별 GenAI Client 풀 ---
+# 키마다 장수명 Client 1개(= HTTP 커넥션 풀 1개)를 한 번만 만들고 재사용합니다.
+# 호출부는 전역 변수를 바꿔 끼우는 대신 lease()로 키를 명시적으로 대여하므로,
+# 한 호출의 실패가 진행 중인 다른 요청의 키를 바꾸지 않습니다.
+GEMINI_RPM_PER_KEY = float(os.getenv("GEMINI_RPM_PER_KEY", "10"))
+GEMINI_BURST_PER_KEY = float(os.getenv("GEMINI_BURST_PER_KEY", "2"))
+KEY_FAILURE_THRESHOLD = 3   # 연속 실패가 이 횟수에 도달하면 잠시 제외
+KEY_FAILURE_COOLDOWN = 30   # 제외 시간(초)
+
+
+class KeyHealth:
+    """키 하나의 상태 기록 (성공/실패 횟수, 연속 실패, 사용 중 호출 수)"""
+
+    def __init__(self):
+        self.successes = 0
+        self.failures = 0
+        self.quota_errors = 0
+        self.consecutive_failures = 0
+        self.in_flight = 0
+        self.cooldown_until = 0.0
+        self.last_error = None
+
+
+class ClientLease:
+    """GenAIClientPool.lease()가 돌려주는 대여 정보"""
+
+    def __init__(self, index: int, client):
+        self.index = index
+        self.client = client
+
+
+class GenAIClientPool:
+    """
+    키별 GenAI Client 풀.
+    - scheduled=True (생성 호출): KeyScheduler의 토큰 버킷으로 여유 있는 키를 배정
+    - scheduled=False (임베딩 등 별도 한도): 쿨다운이 아닌 키를 순서대로 배정
+    - with 블록에서 예외가 나면 해당 키에만 실패를 기록하고 예외를 그대로 전달
+    """
+
+    def __init__(self, keys: List[str], scheduler: KeyScheduler):
+        self._keys = list(keys)
+        self._clients = [None] * len(self._keys)
+        self._health = [KeyHealth() for _ in self._keys]
+        self._lock = threading.Lock()
+        self._rr = 0
+        self.scheduler = scheduler
+
+    def __len__(self):
+        return len(self._keys) if genai else 0
+
+    def client(self, index: int):
+        """index번 키의 Client (최초 1회만 생성)"""
+        with self._lock:
+            if self._clients[index] is None:
+                self._clients[index] = genai.Client(api_key=self._keys[index])
+                print(f"✅ Utils: GenAI Client #{index} 생성")
+            return self._clients[index]
+
+    def _pick_unscheduled(self) -> Optional[int]:
+        with self._lock:
+            now = time.monotonic()
+            n = len(self._keys)
+            for offset in range(n):
+                i = (self._rr + offset) % n
+                if self._health[i].cooldown_until <= now:
+                    self._rr = (i + 1) % n
+                    return i
+            # 모두 쿨다운이면 가장 먼저 풀리는 키 사용
+            return min(range(n), key=lambda i: self._health[i].cooldown_until) if n else None
+
+    def _begin(self, index: int) -> ClientLease:
+        client = self.client(index)
+        with self._lock:
+            self._health[index].in_flight += 1
+        return ClientLease(index, client)
+
+    def _end(self, lease: ClientLease, error: Optional[Exception]):
+        h = self._health[lease.index]
+        with self._lock:
+            h.in_flight -= 1
+            if error is None:
+                h.successes += 1
+                h.consecutive_failures = 0
+                return
+            h.failures += 1
+            h.consecutive_failures += 1
+            h.last_error = f"{type(error).__name__}: {str(error)[:120]}"
+            now = time.monotonic()
+            if is_quota_error(error):
+                h.quota_errors += 1
+                cooldown = parse_retry_delay(error)
+            elif h.consecutive_failures >= KEY_FAILURE_THRESHOLD:
+                cooldown = KEY_FAILURE_COOLDOWN
+            else:
+                cooldown = 0
+            if cooldown:
+                h.cooldown_until = max(h.cooldown_until, now + cooldown)
+        if cooldown:
+            self.scheduler.penalize(lease.index, cooldown)
+
+    def _acquire_index(self, timeout: float, scheduled: bool) -> Optional[int]:
+        if not len(self):
+            return None
+        return self.scheduler.acquire(timeout=timeout) if scheduled else self._pick_unscheduled()
+
+    @contextmanager
+    def lease(self, timeout: float = 10, scheduled: bool = True):
+        """[동기] 키 하나를 대여합니다. 사용 가능한 키가 없으면 NoAvailableKeyError."""
+        index = self._acquire_index(timeout, scheduled)
+        if index is None:
+            raise NoAvailableKeyError("사용 가능한 Gemini 키가 없습니다.")
+        lease = self._begin(index)
+        try:
+            yield lease
+        except Exception as e:
+            self._end(lease, e)
+            raise
+        else:
+            self._end(lease, None)
+
+    @asynccontextmanager
+    async def lease_async(self, timeout: float = 10, scheduled: bool = True):
+        """[비동기] 이벤트 루프를 막지 않고 키 하나를 대여합니다."""
+        if not len(self):
+            index = None
+        elif scheduled:
+            index = await self.scheduler.acquire_async(timeout=timeout)
+        else:
+            index = self._pick_unscheduled()
+        if index is None:
+            raise NoAvailableKeyError("사용 가능한 Gemini 키가 없습니다.")
+        lease = self._begin(index)
+        try:
+            yield lease
+        except Exception as e:
+            self._end(lease, e)
+            raise
+        else:
+            self._end(lease, None)
+
+    def snapshot(self) -> List[dict]:
+        """키별 상태 (모니터링용, 키 값은 노출하지 않음)"""
+        buckets = {b["key"]: b for b in self.scheduler.snapshot()}
+        now = time.monotonic()
+        with self._lock:
+            return [{
+                "key": i,
+                "built": self._clients[i] is not None,
+                "in_flight": h.in_flight,
+                "successes": h.successes,
+                "failures": h.failures,
+                "quota_errors": h.quota_errors,
+                "cooldown_for": round(max(0.0, h.cooldown_until - now), 1),
+                "tokens": buckets.get(i, {}).get("tokens"),
+                "last_error": h.last_error,
+            } for i, h in enumerate(self._health)]
+
+
+GEMINI_SCHEDULER = KeyScheduler(len(KEY_POOL), rpm_per_key=GEMINI_RPM_PER_KEY, burst=GEMINI_BURST_PER_KEY)
+GENAI_POOL = GenAIClientPool(KEY_POOL, GEMINI_SCHEDULER)
+
+# [수정] google.genai Client (Lazy Loading) - 풀의 첫 번째 Client를 반환합니다.
+# 실제 호출은 GENAI_POOL.lease()를 거치므로, 반환값은 "사용 가능 여부" 확인 용도입니다.
 def get_llm_client():
-    global LLM_CLIENT
+    global LLM_CLIENT, LLM_MODEL
     if LLM_CLIENT:
         return LLM_CLIENT
         
-    if KEY_POOL and genai:
+    if len(GENAI_POOL):
         try:
-            # 첫 번째 키로 클라이언트 생성
-            LLM_CLIENT = genai.Client(api_key=KEY_POOL[0])
-            print("✅ Utils: Google GenAI Client (gemini-2.5-flash) 초기화 완료")
+            LLM_CLIENT = GENAI_POOL.client(0)
+            LLM_MODEL = LLM_CLIENT
             return LLM_CLIENT
         except Exception as e:
             print(f"⚠️ Utils: Google GenAI Client 초기화 실패: {e}")
             return None
     return None
 
-# 하위 호환성을 위해 전역 변수는 None으로 시작
-# LLM_MODEL = LLM_CLIENT (여기서는 아직 None)
-
 # 기존 코드와의 호환성을 위해 LLM_MODEL 별칭 유지 (그러나 이제는 Client 객체임)
 LLM_MODEL = LLM_CLIENT
 
@@ -255,18 +428,27 @@ else:
 
 notion = NotionClient(auth=NOTION_KEY) if NOTION_KEY else None
 
+# [수정] create_async_client는 코루틴 함수라 여기서 호출하면 클라이언트가 아닌 코루틴 객체가 저장됨
+# → 이벤트 루프 안에서 처음 사용할 때 get_supabase_async()로 생성
+supabase_async = None
+
 if SUPABASE_URL and SUPABASE_KEY:
     supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
-    try:
-        supabase_async = create_async_client(SUPABASE_URL, SUPABASE_KEY)
-        print("✅ Utils: Supabase Async 클라이언트 초기화 완료")
-    except Exception as e:
-        print(f"⚠️ Utils: Supabase Async 클라이언트 초기화 실패: {e}")
-        supabase_async = None
 else:
     print("⚠️ Utils: Supabase 설정이 없습니다.")
     supabase = None
-    supabase_async = None
+
+
+async def get_supabase_async():
+    """[신규] Supabase Async 클라이언트 (첫 호출 시 생성, 설정이 없으면 None)"""
+    global supabase_async
+    if supabase_async is None and SUPABASE_URL and SUPABASE_KEY:
+        try:
+            supabase_async = await create_async_client(SUPABASE_URL, SUPABASE_KEY)
+            print("✅ Utils: Supabase Async 클라이언트 초기화 완료")
+        except Exception as e:
+            print(f"⚠️ Utils: Supabase Async 클라이언트 초기화 실패: {e}")
+    return supabase_async
 
 # --- 4. Redis 클라이언트 초기화 ---
 redis_client = None
@@ -347,28 +529,19 @@ elif redis:
 else:
     print("⚠️ Utils: redis 라이브러리가 설치되지 않았습니다. (캐시 미사용)")
 
-# --- [수정] 키 교체 함수 (Client 재생성) ---
+# --- [수정] 키 교체 함수 (하위 호환용) ---
+# 호출부는 GENAI_POOL.lease()가 키별 상태를 기록하므로 더 이상 이 함수를 쓰지 않습니다.
+# 외부 스크립트 호환을 위해 남겨두며, Client를 새로 만들지 않고 풀의 다음 Client를 가리킵니다.
 def rotate_api_key():
-    if not KEY_CYCLE: 
+    if not KEY_CYCLE or not len(GENAI_POOL):
         print("⚠️ [Key Rotation] 교체할 키가 없습니다.")
         return
     
-    try:
-        next_key = next(KEY_CYCLE)
-        
-        masked_key = next_key[:4] + "****" + next_key[-4:] if len(next_key) > 8 else "****"
-        print(f"🔄 [Key Rotation] API 키 교체 시도: {masked_key}")
-        
-        # [핵심] Client 객체 재생성
-        global LLM_CLIENT, LLM_MODEL
-        if genai:
-            LLM_CLIENT = genai.Client(api_key=next_key)
-            LLM_MODEL = LLM_CLIENT
-        
-        print("✅ [Key Rotation] GenAI Client 재설정 완료.")
-        
-    except Exception as e:
-        print(f"❌ [Key Rotation] 키 교체 중 오류: {e}")
+    global LLM_CLIENT, LLM_MODEL
+    next_index = KEY_POOL.index(next(KEY_CYCLE))
+    LLM_CLIENT = GENAI_POOL.client(next_index)
+    LLM_MODEL = LLM_CLIENT
+    print(f"🔄 [Key Rotation] 기본 Client → 키 #{next_index}")
 
 # --- 5. 시스템 명령어 ---
 SYSTEM_INSTRUCTION_WORKER = (
@@ -382,45 +555,375 @@ SYSTEM_INSTRUCTION_WORKER = (
 
 # [Vercel 환경 감지] 재시도 횟수 조정 (파일 디스크립터 고갈 방지)
 _IS_VERCEL = os.getenv("VERCEL_ENV") or os.getenv("FORCE_SYNC_MODE")
-_RETRY_ATTEMPTS = 2 if _IS_VERCEL else 5  # Vercel에서는 2번만, 로컬에서는 5번
+_RETRY_ATTEMPTS = 2 if _IS_VERCEL else 3  # 최초 호출 포함 총 시도 횟수 (Vercel에서는 2번)
+
+# --- [신규] 외부 호출 공통 재시도 정책 ---
+# tenacity + 함수 내부 재시도 루프를 중첩하지 않고, 호출 1건당 아래 정책 하나만 적용합니다.
+# (총 시도 횟수 상한 + 호출 deadline + Jitter 백오프 + 재시도 예산 10%)
+# Gemini는 키 풀이 할당량 대기를 대신하므로 429 힌트만큼 잠들지 않고 다른 키로 재시도합니다.
+GEMINI_RETRY = RetryPolicy("gemini.generate", max_attempts=_RETRY_ATTEMPTS, respect_retry_hint=False,
+                           budget=RetryBudget(ratio=0.1))
+EMBED_RETRY = RetryPolicy("gemini.embed", max_attempts=_RETRY_ATTEMPTS, deadline=15, respect_retry_hint=False,
+                          budget=RetryBudget(ratio=0.1))
+GROQ_RETRY = RetryPolicy("groq", max_attempts=2, deadline=30, base_delay=1.0, budget=RetryBudget(ratio=0.1))
+SUPABASE_RETRY = RetryPolicy("supabase", max_attempts=_RETRY_ATTEMPTS, deadline=10, base_delay=0.3, max_delay=2.0,
+                             budget=RetryBudget(ratio=0.1))
+NOTION_RETRY = RetryPolicy("notion", max_attempts=3, deadline=30, base_delay=1.0, max_delay=5.0,
+                           budget=RetryBudget(ratio=0.1))
+
+# --- [신규] 서킷 브레이커 (공급자/작업별) ---
+# Gemini 장애 시 매 요청이 타임아웃/할당량 대기를 겪지 않도록, 실패가 쌓이면 일정 시간 동안
+# 곧바로 Groq(GROQ_CLIENT / GROQ_SYNC_CLIENT)로 보냅니다. 이후 탐색 요청 1건으로 복구를 확인합니다.
+# Redis가 있으면 상태를 공유하여 API 프로세스와 워커가 함께 페일오버합니다.
+CB_FAILURE_THRESHOLD = int(os.getenv("CB_FAILURE_THRESHOLD", "5"))
+CB_WINDOW_SECONDS = float(os.getenv("CB_WINDOW_SECONDS", "60"))
+CB_OPEN_SECONDS = float(os.getenv("CB_OPEN_SECONDS", "30"))
+
+_BREAKER_STORE = RedisBreakerStore(redis_client) if redis_client else None
+
+def _make_breaker(name: str) -> CircuitBreaker:
+    return CircuitBreaker(name, failure_threshold=CB_FAILURE_THRESHOLD, window=CB_WINDOW_SECONDS,
+                          open_seconds=CB_OPEN_SECONDS, store=_BREAKER_STORE)
+
+GEMINI_GENERATE_BREAKER = _make_breaker("gemini.generate")
+GEMINI_EMBED_BREAKER = _make_breaker("gemini.embed")
+
+def _record_breaker_failure(breaker: CircuitBreaker, error: Exception):
+    """요청 자체의 문제(FATAL: 잘못된 입력 등)는 공급자 장애로 세지 않습니다."""
+    if classify_error(error) != FATAL or isinstance(error, NoAvailableKeyError):
+        breaker.record_failure()
+
+def get_breaker_states() -> dict:
+    return {b.name: b.snapshot() for b in (GEMINI_GENERATE_BREAKER, GEMINI_EMBED_BREAKER)}
+
+# [신규] 헤지 요청 (Groq 1순위 → p90 안에 응답 없으면 Gemini에도 동시 요청, 먼저 온 답 채택)
+# - LLM_HEDGING=false(기본)면 기존처럼 'Groq 실패 시 Gemini' 순차 폴백만 수행 (지연 분포는 항상 수집)
+LLM_HEDGING = os.getenv("LLM_HEDGING", "false").lower() == "true"
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", "0.9"))
+HEDGE_DEFAULT_DELAY = float(os.getenv("HEDGE_DEFAULT_DELAY", "2.0"))
+
+EXTRACT_HEDGER = Hedger("llm.extract", enabled=LLM_HEDGING, quantile=HEDGE_QUANTILE, default_delay=HEDGE_DEFAULT_DELAY)
+EXPAND_HEDGER = Hedger("llm.expand", enabled=LLM_HEDGING, quantile=HEDGE_QUANTILE, default_delay=HEDGE_DEFAULT_DELAY)
+_HEDGE_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+def _gemini_hedge_allowed() -> bool:
+    """Gemini 차단기가 열려 있으면 보조 요청이 결국 Groq로 우회되므로 헤지하지 않습니다."""
+    return GEMINI_GENERATE_BREAKER.state == CircuitBreaker.CLOSED
+
+def get_hedge_stats() -> dict:
+    return {h.name: h.snapshot() for h in (EXTRACT_HEDGER, EXPAND_HEDGER)}
+
+# --- [신규] 2단계 임베딩 캐시 (프로세스 내 LRU → Redis) ---
+class EmbeddingCache:
+    """
+    임베딩 캐시: L1(프로세스 내 LRU) → L2(Redis, API/워커/재시작 간 공유)
+    - 키: emb:{dtype}:{model}:{task_type}:{sha1(text)}
+    - 값: JSON 리스트 대신 float32/float16로 패킹한 바이트 (768차원 기준 3KB / 1.5KB)
+    - 같은 텍스트에 대한 동시 미스는 API 호출 1번으로 합침
+    - Redis 오류 후 일정 시간은 L2를 건너뜀 (연결 대기로 검색이 지연되지 않도록)
+    """
 
-# --- [수정] 임베딩 함수 (Client API 사용) ---
-@lru_cache(maxsize=1000)
-@retry(
-    stop=stop_after_attempt(_RETRY_ATTEMPTS), 
-    wait=wait_exponential(multiplier=1, min=1, max=5),  # 대기 시간도 단축
-    retry=retry_if_exception_type(Exception)
+    L2_RETRY_AFTER = 30.0
+    _TYPECODES = {"float32": "f", "float16": "e"}
+
+    def __init__(self, redis_conn, model: str, maxsize: int = 1000, ttl: int = 30 * 24 * 3600, dtype: str = "float32"):
+        self.redis = redis_conn
+        self.model = model
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.dtype = dtype if dtype in self._TYPECODES else "float32"
+        self._l1 = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._l2_skip_until = 0.0
+        self.stats = dict.fromkeys(("l1_hits", "l2_hits", "misses", "collapsed", "l2_errors"), 0)
+
+    def _key(self, text: str, task_type: str) -> str:
+        digest = hashlib.sha1(text.encode('utf-8')).hexdigest()
+        return f"emb:{self.dtype}:{self.model}:{task_type}:{digest}"
+
+    def _pack(self, vector: List[float]) -> bytes:
+        code = self._TYPECODES[self.dtype]
+        return struct.pack(f"<{len(vector)}{code}", *vector)
+
+    def _unpack(self, data: bytes) -> List[float]:
+        code = self._TYPECODES[self.dtype]
+        return list(struct.unpack(f"<{len(data) // struct.calcsize(code)}{code}", data))
+
+    def _incr(self, field: str):
+        with self._lock:
+            self.stats[field] += 1
+
+    def _l2_available(self) -> bool:
+        return self.redis is not None and time.monotonic() >= self._l2_skip_until
+
+    def _l2_failed(self, e: Exception):
+        self._incr("l2_errors")
+        self._l2_skip_until = time.monotonic() + self.L2_RETRY_AFTER
+        print(f"⚠️ [EmbedCache] Redis 오류 → {self.L2_RETRY_AFTER:.0f}초간 L1만 사용: {e}")
+
+    def _l1_put(self, key: str, vector: List[float]):
+        with self._lock:
+            self._l1[key] = vector
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.maxsize:
+                self._l1.popitem(last=False)
+
+    def get(self, text: str, task_type: str) -> Optional[List[float]]:
+        key = self._key(text, task_type)
+        with self._lock:
+            vector = self._l1.get(key)
+            if vector is not None:
+                self._l1.move_to_end(key)
+                self.stats["l1_hits"] += 1
+                return vector
+        if self._l2_available():
+            try:
+                data = self.redis.get(key)
+            except Exception as e:
+                self._l2_failed(e)
+                data = None
+            if data:
+                vector = self._unpack(data)
+                self._l1_put(key, vector)
+                self._incr("l2_hits")
+                return vector
+        return None
+
+    def put(self, text: str, task_type: str, vector: List[float]):
+        key = self._key(text, task_type)
+        self._l1_put(key, vector)
+        if self._l2_available():
+            try:
+                self.redis.set(key, self._pack(vector), ex=self.ttl)
+            except Exception as e:
+                self._l2_failed(e)
+
+    def get_or_load(self, text: str, task_type: str, loader) -> Optional[List[float]]:
+        """캐시 조회 후 미스면 loader()로 계산. 같은 키의 동시 미스는 먼저 온 요청의 결과를 기다림"""
+        vector = self.get(text, task_type)
+        if vector is not None:
+            return vector
+        key = self._key(text, task_type)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = concurrent.futures.Future()
+                self._inflight[key] = future
+                self.stats["misses"] += 1
+            else:
+                self.stats["collapsed"] += 1
+        if not leader:
+            return future.result(timeout=60)
+        try:
+            vector = loader()
+            if vector:
+                self.put(text, task_type, vector)
+            future.set_result(vector)
+            return vector
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            stats = dict(self.stats, l1_size=len(self._l1))
+        lookups = stats["l1_hits"] + stats["l2_hits"] + stats["misses"] + stats["collapsed"]
+        stats["hit_ratio"] = round((stats["l1_hits"] + stats["l2_hits"]) / lookups, 3) if lookups else 0.0
+        return stats
+
+EMBED_MODEL = 'models/text-embedding-004'
+EMBED_CACHE = EmbeddingCache(
+    redis_client, EMBED_MODEL,
+    maxsize=int(os.getenv("EMBED_CACHE_L1_SIZE", "1000")),
+    ttl=int(os.getenv("EMBED_CACHE_TTL_SECONDS", str(30 * 24 * 3600))),
+    dtype=os.getenv("EMBED_CACHE_DTYPE", "float32"),
 )
+
+# --- [수정] 임베딩 함수 (Client API 사용) ---
 def get_gemini_embedding(text: str, task_type: str = "SEMANTIC_SIMILARITY") -> Optional[List[float]]:
-    client = get_llm_client() # Lazy Load (싱글톤)
-    if not KEY_POOL or not client: 
+    if not len(GENAI_POOL): 
         print("⚠️ Embed: No API keys or client not initialized")
         return None
+    # [수정] 공유 캐시(L1 → Redis) 우선, 미스일 때만 API 호출
+    return EMBED_CACHE.get_or_load(text, task_type, lambda: _load_gemini_embedding(text, task_type))
+
+def _load_gemini_embedding(text: str, task_type: str) -> Optional[List[float]]:
+    # [신규] 차단기가 열려 있으면 타임아웃을 기다리지 않고 즉시 실패 (None은 캐시에 저장되지 않음)
+    if not GEMINI_EMBED_BREAKER.allow_request():
+        print("🔌 [Circuit] 임베딩 차단 중 → 즉시 실패")
+        return None
     try:
-        # Client 인스턴스 사용
-        result = client.models.embed_content( # client 변수 사용
-            model='models/text-embedding-004', 
-            contents=text,
-            config=types.EmbedContentConfig(task_type=task_type)
-        )
-        
-        # 결과 처리 (Embedding 객체에서 values 추출)
-        if hasattr(result, 'embeddings') and result.embeddings:
-            return list(result.embeddings[0].values)
-        if hasattr(result, 'embedding') and result.embedding:
-            return list(result.embedding.values)
-            
-        # fallback for different response structure
-        return list(result.embedding) if hasattr(result, 'embedding') else []
-        
+        # [수정] 동시에 들어온 질문 임베딩은 마이크로 배처가 한 번의 배치 호출로 묶음
+        if EMBED_BATCHER is not None:
+            result = EMBED_BATCHER.embed(text, task_type)
+        else:
+            result = _embed_batch_api([text], task_type)[0]
     except Exception as e:
+        _record_breaker_failure(GEMINI_EMBED_BREAKER, e)
         print(f"⚠️ Embed API 실패: {type(e).__name__}: {e}")
-        rotate_api_key() 
         raise e
+    GEMINI_EMBED_BREAKER.record_success()
+    return result
+
+# --- [신규] 배치 임베딩 ---
+EMBED_BATCH_MAX = 100  # embed_content 1회 요청당 최대 텍스트 수
+EMBED_MICROBATCH_MS = float(os.getenv("EMBED_MICROBATCH_MS", "5"))  # 0이면 마이크로 배칭 비활성
+# 동시에 보낼 수 있는 배치 수 (느린 배치/재시도 하나가 다른 질문 임베딩을 막지 않도록)
+EMBED_BATCH_MAX_IN_FLIGHT = int(os.getenv("EMBED_BATCH_MAX_IN_FLIGHT", "4"))
+
+def _extract_embedding_vectors(result) -> List[List[float]]:
+    """embed_content 응답에서 벡터 목록 추출 (SDK 응답 구조 차이 대응)"""
+    if hasattr(result, 'embeddings') and result.embeddings:
+        return [list(e.values) for e in result.embeddings]
+    if hasattr(result, 'embedding') and result.embedding:
+        emb = result.embedding
+        return [list(emb.values) if hasattr(emb, 'values') else list(emb)]
+    return []
+
+def _embed_batch_api(texts: List[str], task_type: str) -> List[List[float]]:
+    """한 번의 embed_content 호출로 여러 텍스트를 임베딩 (EMBED_RETRY 적용, 실패 시 예외)"""
+    # 풀에서 키를 대여 (임베딩은 생성 호출과 한도가 달라 토큰 버킷 미사용)
+    def _attempt():
+        with GENAI_POOL.lease(scheduled=False) as lease:
+            return lease.client.models.embed_content(
+                model=EMBED_MODEL,
+                contents=texts if len(texts) > 1 else texts[0],
+                config=types.EmbedContentConfig(task_type=task_type)
+            )
+    vectors = _extract_embedding_vectors(EMBED_RETRY.call(_attempt, site="gemini.embed"))
+    if len(vectors) != len(texts):
+        raise RuntimeError(f"임베딩 개수 불일치 (요청 {len(texts)}개, 응답 {len(vectors)}개)")
+    return vectors
+
+def get_gemini_embeddings_batch(texts: List[str], task_type: str = "RETRIEVAL_DOCUMENT") -> List[Optional[List[float]]]:
+    """
+    [신규] 여러 텍스트를 EMBED_BATCH_MAX개씩 묶어 임베딩합니다. (인덱서용)
+    입력 순서대로 결과를 반환하며, 실패한 묶음의 항목은 None입니다.
+    """
+    results: List[Optional[List[float]]] = [None] * len(texts)
+    if not texts or not len(GENAI_POOL):
+        return results
+    for start in range(0, len(texts), EMBED_BATCH_MAX):
+        chunk = texts[start:start + EMBED_BATCH_MAX]
+        if not GEMINI_EMBED_BREAKER.allow_request():
+            print("🔌 [Circuit] 임베딩 차단 중 → 남은 배치 건너뜀")
+            break
+        try:
+            vectors = _embed_batch_api(chunk, task_type)
+        except Exception as e:
+            _record_breaker_failure(GEMINI_EMBED_BREAKER, e)
+            print(f"⚠️ 배치 임베딩 실패 ({len(chunk)}개): {type(e).__name__}: {e}")
+            continue
+        GEMINI_EMBED_BREAKER.record_success()
+        results[start:start + len(chunk)] = vectors
+    return results
+
+class EmbeddingBatcher:
+    """
+    [신규] 요청 간 임베딩 마이크로 배처
+    여러 요청(스레드/코루틴)이 동시에 임베딩을 요청하면 max_wait 동안 모아 한 번의 배치 호출로 보냅니다.
+    호출자는 각자 Future로 자기 결과만 받습니다. (API 왕복 횟수 및 키별 한도 사용량 감소)
+    [수정] 모은 배치는 스레드 풀에서 보내 최대 max_in_flight개가 동시에 진행됩니다.
+    모두 진행 중이면 수집 스레드가 자리가 날 때까지 기다리며, 그동안 들어온 요청은 다음 배치로 모입니다.
+    """
+
+    def __init__(self, embed_fn, max_batch: int = 32, max_wait: float = 0.005, max_in_flight: int = 4):
+        self.embed_fn = embed_fn  # (texts, task_type) -> List[List[float]]
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.max_in_flight = max(1, max_in_flight)
+        self._pending = []  # [(text, task_type, future)]
+        self._cond = threading.Condition()
+        self._thread = None
+        self._executor = None
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self._in_flight = 0
+        self.stats = {"requests": 0, "batches": 0, "max_in_flight_seen": 0}
+
+    def submit(self, text: str, task_type: str) -> concurrent.futures.Future:
+        future = concurrent.futures.Future()
+        with self._cond:
+            self._pending.append((text, task_type, future))
+            self.stats["requests"] += 1
+            if self._thread is None:
+                # fork 이후 처음 쓸 때 생성 (prefork 워커 안전)
+                self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.max_in_flight,
+                                                                       thread_name_prefix="embed-batch")
+                self._thread = threading.Thread(target=self._run, name="embed-batcher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def embed(self, text: str, task_type: str, timeout: float = 30) -> List[float]:
+        return self.submit(text, task_type).result(timeout=timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # 첫 요청 이후 max_wait 동안(또는 max_batch개가 찰 때까지) 더 모음
+                deadline = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0: break
+                    self._cond.wait(remaining)
+            # 진행 중인 배치가 max_in_flight개면 하나가 끝날 때까지 대기 (그동안 새 요청은 계속 쌓임)
+            self._slots.acquire()
+            with self._cond:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                self._in_flight += 1
+                self.stats["max_in_flight_seen"] = max(self.stats["max_in_flight_seen"], self._in_flight)
+            self._executor.submit(self._flush_and_release, batch)
+
+    def _flush_and_release(self, batch):
+        try:
+            self._flush(batch)
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def _flush(self, batch):
+        by_task = {}
+        for text, task_type, future in batch:
+            by_task.setdefault(task_type, []).append((text, future))
+        for task_type, items in by_task.items():
+            # 같은 텍스트가 여러 번 들어오면 한 번만 요청
+            unique_texts = list(dict.fromkeys(text for text, _ in items))
+            with self._cond:
+                self.stats["batches"] += 1
+            try:
+                vectors = dict(zip(unique_texts, self.embed_fn(unique_texts, task_type)))
+            except Exception as e:
+                for _, future in items:
+                    if not future.done(): future.set_exception(e)
+                continue
+            for text, future in items:
+                if not future.done(): future.set_result(vectors[text])
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return dict(self.stats, pending=len(self._pending), in_flight=self._in_flight)
+
+EMBED_BATCHER = EmbeddingBatcher(_embed_batch_api, max_wait=EMBED_MICROBATCH_MS / 1000,
+                                 max_in_flight=EMBED_BATCH_MAX_IN_FLIGHT) if EMBED_MICROBATCH_MS > 0 else None
+
+def get_embedding_stats() -> dict:
+    return {"cache": EMBED_CACHE.snapshot(), "batcher": EMBED_BATCHER.snapshot() if EMBED_BATCHER else None}
 
 # --- [신규] 비동기 임베딩 함수 ---
 async def get_gemini_embedding_async(text: str, task_type: str = "SEMANTIC_SIMILARITY") -> Optional[List[float]]:
-    """비동기 버전의 임베딩 함수 (동기 함수를 비동기로 래핑)"""
+    """
+    비동기 버전의 임베딩 함수 (동기 함수를 비동기로 래핑)
+    공유 캐시(L1 → Redis, 동시 미스 합치기)와 마이크로 배처가 동기 경로에 있으므로 스레드에서 그대로 호출합니다.
+    """
     import asyncio
     if not KEY_POOL: return None
     
@@ -437,66 +940,67 @@ async def get_gemini_embedding_async(text: str, task_type: str = "SEMANTIC_SIMIL
         print(f"⚠️ Embed API 실패 (async): {e}")
         raise e
 
-# --- [수정] 콘텐츠 생성 함수 (Client API 사용) ---
-@retry(
-    stop=stop_after_attempt(_RETRY_ATTEMPTS),  # Vercel 환경에서 재시도 횟수 제한
-    wait=wait_exponential(multiplier=1, min=1, max=5),
-    retry=retry_if_exception_type(Exception)
-)
-def generate_content_safe(client, prompt, timeout=8, **kwargs): 
-    # client 인자는 이제 LLM_CLIENT (Client 객체)입니다.
-    
-    # kwargs에서 설정값 추출하여 Config 객체 생성
+def _build_generate_config(kwargs: dict):
+    """kwargs에서 설정값을 꺼내 GenerateContentConfig 생성 (동기/비동기 공통)"""
     config_params = {}
-    if 'safety_settings' in kwargs:
-        config_params['safety_settings'] = kwargs.pop('safety_settings')
-    if 'temperature' in kwargs:
-        config_params['temperature'] = kwargs.pop('temperature')
-    if 'top_p' in kwargs:
-        config_params['top_p'] = kwargs.pop('top_p')
-    if 'max_output_tokens' in kwargs:
-        config_params['max_output_tokens'] = kwargs.pop('max_output_tokens')
-    if 'response_mime_type' in kwargs:
-        config_params['response_mime_type'] = kwargs.pop('response_mime_type')
-        
-    config = types.GenerateContentConfig(**config_params)
-    
-    for attempt in range(5):
-        try:
-            # 매 시도마다 최신 Client 객체 사용 (키 로테이션 반영)
-            # 함수 인자로 받은 client보다 전역 LLM_CLIENT가 더 최신일 수 있음 (get_llm_client() 사용)
-            global LLM_CLIENT
-            current_client = LLM_CLIENT if LLM_CLIENT else client
-            
-            if not current_client:
-                current_client = get_llm_client() # 없으면 생성 시도
-            
-            time.sleep(2) 
-            
-            # v1.0 동기 호출
-            return current_client.models.generate_content(
+    for name in ('safety_settings', 'temperature', 'top_p', 'max_output_tokens', 'response_mime_type'):
+        if name in kwargs:
+            config_params[name] = kwargs.pop(name)
+    return types.GenerateContentConfig(**config_params)
+
+# --- [수정] 콘텐츠 생성 함수 (Client API 사용) ---
+def generate_content_safe(client, prompt, timeout=8, site="gemini.generate", groq_fallback=True, **kwargs): 
+    """
+    [수정] GENAI_POOL에서 여유 있는 키를 대여해 호출합니다.
+    client 인자는 하위 호환용이며, 키 풀이 비어 있을 때만 사용됩니다.
+    timeout: 호출 1건의 deadline(초) - 키 대기와 재시도를 모두 포함
+    site: 재시도 카운터에 기록될 호출 지점 이름
+    groq_fallback: False면 Gemini만 시도 (Groq가 1순위인 헤지/폴백의 2순위에서 Groq를 다시 부르지 않도록)
+    """
+    config = _build_generate_config(kwargs)
+
+    # 키 풀이 없으면 전달받은 client로 호출
+    if not len(GENAI_POOL):
+        if not client:
+            raise Exception("Gemini 클라이언트가 없습니다.")
+        return GEMINI_RETRY.call(
+            lambda: client.models.generate_content(model='gemini-2.5-flash', contents=prompt, config=config, **kwargs),
+            site=site, deadline=timeout
+        )
+
+    # [신규] 차단기가 열려 있으면 Gemini를 건너뛰고 바로 Groq로 보냄
+    if not GEMINI_GENERATE_BREAKER.allow_request():
+        if not groq_fallback:
+            raise Exception(f"Gemini 차단 중 ({site})")
+        if GROQ_SYNC_CLIENT:
+            print(f"🔌 [Circuit] Gemini 차단 중 → Groq 직행 ({site})")
+            return call_groq_backup_sync(prompt)
+
+    deadline = time.monotonic() + timeout
+
+    def _attempt():
+        with GENAI_POOL.lease(timeout=max(0.0, deadline - time.monotonic())) as lease:
+            return lease.client.models.generate_content(
                 model='gemini-2.5-flash',
                 contents=prompt,
                 config=config,
-                # timeout은 별도 옵션일 수 있으나 여기서는 생략하거나 kwargs에 남은 것 사용
                 **kwargs 
             )
-            
-        except Exception as e:
-            error_msg = str(e)
-            if "429" in error_msg or "Quota exceeded" in error_msg:
-                print(f"🛑 [Quota Limit] 할당량 초과! ({attempt+1}/5)")
-                rotate_api_key() 
-                time.sleep(60) 
-                continue 
-            
-            print(f"⚠️ API 호출 실패: {e}")
-            rotate_api_key()
-            time.sleep(5) 
-            
-    raise Exception("API 호출 5회 실패")
+
+    try:
+        result = GEMINI_RETRY.call(_attempt, site=site, deadline=timeout)
+    except Exception as e:
+        _record_breaker_failure(GEMINI_GENERATE_BREAKER, e)
+        raise
+    GEMINI_GENERATE_BREAKER.record_success()
+    return result
 
 # --- [신규] Groq 백업 호출 함수 (모델 업데이트됨) ---
+class MockResponse:
+    """Groq 응답을 Gemini 응답처럼 .text로 읽을 수 있게 감싸는 객체"""
+    def __init__(self, text):
+        self.text = text
+
 async def call_groq_backup(prompt):
     """
     Gemini가 죽었을 때 호출되는 Groq(Llama3) 백업 함수 (Async)
@@ -521,18 +1025,29 @@ async def call_groq_backup(prompt):
         )
         
         # 응답 포맷 맞추기 (Gemini와 호환되게 .text 속성 흉내)
-        response_text = completion.choices[0].message.content
-        
-        class MockResponse:
-            def __init__(self, text):
-                self.text = text
-                
-        return MockResponse(response_text)
+        return MockResponse(completion.choices[0].message.content)
         
     except Exception as e:
         print(f"❌ [Groq] 백업 호출 실패: {e}")
         raise e
 
+def call_groq_backup_sync(prompt):
+    """
+    [신규] call_groq_backup의 동기 버전 (GROQ_SYNC_CLIENT 사용, 차단기 OPEN 시 동기 경로용)
+    """
+    if not GROQ_SYNC_CLIENT:
+        raise Exception("Gemini 차단 중 & No Groq Backup")
+    completion = GROQ_SYNC_CLIENT.chat.completions.create(
+        model="llama-3.3-70b-versatile",
+        messages=[
+            {"role": "system", "content": "You are a helpful assistant. Answer strictly in JSON if requested."},
+            {"role": "user", "content": prompt}
+        ],
+        temperature=0.1,
+        max_tokens=1024,
+    )
+    return MockResponse(completion.choices[0].message.content)
+
 def call_groq_sync_simple(prompt, system_message="You are a helpful assistant."):
     """
     [신규] 간단한 작업을 위한 Groq 동기 호출 함수 (검색어 확장 등)
@@ -555,85 +1070,45 @@ def call_groq_sync_simple(prompt, system_message="You are a helpful assistant.")
         return None
 
 # --- [최적화] 비동기 콘텐츠 생성 함수 (Client API Async) ---
-async def generate_content_safe_async(client, prompt, timeout=120, **kwargs): 
+async def generate_content_safe_async(client, prompt, timeout=120, site="gemini.generate", groq_fallback=True, **kwargs): 
     """
     [성능 최적화] google.genai.Client.aio 사용
+    [수정] GENAI_POOL에서 키를 대여해 호출하며, 대기는 이벤트 루프를 막지 않습니다.
+    공통 재시도 정책(GEMINI_RETRY)으로도 실패하면 Groq 백업으로 전환합니다.
+    groq_fallback=False면 Groq로 넘기지 않고 예외를 그대로 올립니다 (Groq 1순위 헤지의 2순위용).
     """
-    max_retries = 7
-    consecutive_quota_errors = 0
+    config = _build_generate_config(kwargs)
+    deadline = time.monotonic() + timeout
     
-    # Config 구성 (동기 함수와 동일)
-    config_params = {}
-    if 'safety_settings' in kwargs:
-        config_params['safety_settings'] = kwargs.pop('safety_settings')
-    if 'temperature' in kwargs:
-        config_params['temperature'] = kwargs.pop('temperature')
-    if 'top_p' in kwargs:
-        config_params['top_p'] = kwargs.pop('top_p')
-    if 'response_mime_type' in kwargs:
-        config_params['response_mime_type'] = kwargs.pop('response_mime_type')
-        
-    config = types.GenerateContentConfig(**config_params)
-    
-    for attempt in range(max_retries):
-        try:
-            global LLM_CLIENT
-            current_client = LLM_CLIENT if LLM_CLIENT else client
-            
-            if not current_client:
-                 current_client = get_llm_client() # 없으면 생성 시도
-            
-            if not current_client:
-                print("⚠️ [Async API] 클라이언트 객체가 없습니다. 로테이션 시도...")
-                rotate_api_key()
-                continue
-
-            if attempt > 0:
-                await asyncio.sleep(2)
-            
-            print(f"🚀 [Async API] 호출 시도 ({attempt+1}/{max_retries})")
-            
+    async def _attempt():
+        async with GENAI_POOL.lease_async(timeout=max(0.0, deadline - time.monotonic())) as lease:
+            print(f"🚀 [Async API] 호출 시도 (키 #{lease.index})")
             # [수정] v1.0 Async 호출: client.aio.models.generate_content
-            # 주의: client.aio (AsyncClient) 속성을 사용해야 함
-            result = await current_client.aio.models.generate_content(
+            return await lease.client.aio.models.generate_content(
                 model='gemini-2.5-flash',
                 contents=prompt,
                 config=config,
                 **kwargs
             )
-            
-            consecutive_quota_errors = 0
-            return result
-            
-        except Exception as e:
-            error_msg = str(e)
-            print(f"⚠️ [Async API] 호출 실패 ({attempt+1}/{max_retries}): {e}")
-            
-            if "429" in error_msg or "Quota exceeded" in error_msg:
-                consecutive_quota_errors += 1
-                
-                retry_delay = 60
-                try:
-                    match = re.search(r'retry in ([\d.]+)s', error_msg)
-                    if match:
-                        retry_delay = max(1, min(int(float(match.group(1))), 60))
-                        print(f"📊 [API] 권장 대기 시간: {retry_delay}초")
-                except: pass
-                
-                if consecutive_quota_errors >= 2:
-                    print(f"🛑 [Critical] Gemini 할당량 {consecutive_quota_errors}회 연속 초과 → Groq 전환")
-                    return await call_groq_backup(prompt)
-
-                print(f"🛑 [Async Quota Limit] 할당량 초과! {retry_delay}초 대기...")
-                rotate_api_key()
-                await asyncio.sleep(retry_delay)
-                continue 
-            
-            rotate_api_key()
-            await asyncio.sleep(5) 
-            
-    print("💀 [System] Gemini 모든 재시도 실패 → Groq 최종 호출")
-    return await call_groq_backup(prompt)
+
+    # [신규] 차단기가 열려 있으면 Gemini를 건너뛰고 바로 Groq로 보냄
+    if not GEMINI_GENERATE_BREAKER.allow_request():
+        if not groq_fallback:
+            raise Exception(f"Gemini 차단 중 ({site})")
+        if GROQ_CLIENT:
+            print(f"🔌 [Circuit] Gemini 차단 중 → Groq 직행 ({site})")
+            return await call_groq_backup(prompt)
+
+    try:
+        result = await GEMINI_RETRY.call_async(_attempt, site=site, deadline=timeout)
+    except Exception as e:
+        _record_breaker_failure(GEMINI_GENERATE_BREAKER, e)
+        if not groq_fallback:
+            raise
+        print(f"💀 [System] Gemini 호출 실패 ({type(e).__name__}: {e}) → Groq 최종 호출")
+        return await call_groq_backup(prompt)
+    GEMINI_GENERATE_BREAKER.record_success()
+    return result
 
 def extract_info_from_question(question: str, chat_history: list[dict] = []) -> dict:
     history_formatted = "(이전 대화 없음)"
@@ -720,7 +1195,7 @@ def extract_info_from_question(question: str, chat_history: list[dict] = []) ->
         ]
         
         # 앞서 추가한 generate_content_safe 함수 사용
-        response = generate_content_safe(client, prompt, timeout=60, safety_settings=safety_settings) # client 전달
+        response = generate_content_safe(client, prompt, timeout=60, site="gemini.extract", safety_settings=safety_settings) # client 전달
         # response.resolve() 제거 (v1.0에서는 불필요)
 
         
@@ -757,13 +1232,15 @@ def extract_info_from_question(question: str, chat_history: list[dict] = []) ->
         return {"error": f"질문 분석 중 오류: {e}"}
 
 # --- [신규] Groq Async 호출 함수 (utils 내부용) ---
-async def call_groq_async_simple(prompt: str, system_message: str = "You are a helpful assistant.", max_retries: int = 2) -> Optional[str]:
-    """Helper for async Groq calls with retry"""
+async def call_groq_async_simple(prompt: str, system_message: str = "You are a helpful assistant.", site: str = "groq.async",
+                                 json_mode: bool = False) -> Optional[str]:
+    """Helper for async Groq calls (재시도는 GROQ_RETRY 정책, json_mode=True면 JSON 객체만 응답)"""
     if not GROQ_CLIENT: return None
+    extra = {"response_format": {"type": "json_object"}} if json_mode else {}
     
-    for attempt in range(max_retries):
-        try:
-            chat_completion = await GROQ_CLIENT.chat.completions.create(
+    try:
+        chat_completion = await GROQ_RETRY.call_async(
+            lambda: GROQ_CLIENT.chat.completions.create(
                 messages=[
                     {"role": "system", "content": system_message},
                     {"role": "user", "content": prompt},
@@ -771,28 +1248,31 @@ async def call_groq_async_simple(prompt: str, system_message: str = "You are a h
                 model="llama-3.3-70b-versatile",
                 temperature=0.1,
                 max_tokens=1024,
-            )
-            return chat_completion.choices[0].message.content
-        except Exception as e:
-            if attempt == max_retries - 1:
-                print(f"⚠️ Groq Async Error (Final): {e}")
-            else:
-                await asyncio.sleep(1)
+                **extra
+            ),
+            site=site
+        )
+        return chat_completion.choices[0].message.content
+    except Exception as e:
+        print(f"⚠️ Groq Async Error (Final): {e}")
     return None
 
 # --- [신규] Groq Sync 호출 함수 (run_indexer.py 등 동기 환경용) ---
-def call_groq_sync_simple(prompt: str, system_message: str = "You are a helpful assistant.") -> Optional[str]:
-    """Helper for sync Groq calls"""
+def call_groq_sync_simple(prompt: str, system_message: str = "You are a helpful assistant.", site: str = "groq.sync") -> Optional[str]:
+    """Helper for sync Groq calls (재시도는 GROQ_RETRY 정책)"""
     if not GROQ_SYNC_CLIENT: return None
     try:
-        completion = GROQ_SYNC_CLIENT.chat.completions.create(
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": prompt}
-            ],
-            model="llama-3.3-70b-versatile",
-            temperature=0.1,
-            max_tokens=2048, # 번역은 길 수 있으므로 넉넉하게
+        completion = GROQ_RETRY.call(
+            lambda: GROQ_SYNC_CLIENT.chat.completions.create(
+                messages=[
+                    {"role": "system", "content": system_message},
+                    {"role": "user", "content": prompt}
+                ],
+                model="llama-3.3-70b-versatile",
+                temperature=0.1,
+                max_tokens=2048, # 번역은 길 수 있으므로 넉넉하게
+            ),
+            site=site
         )
         return completion.choices[0].message.content
     except Exception as e:
@@ -824,7 +1304,7 @@ def translate_content_multilingual_sync(title: str, content: str) -> dict:
     # 1. Groq 시도
     if GROQ_SYNC_CLIENT:
         try:
-            resp = call_groq_sync_simple(prompt, "You are a JSON translator.")
+            resp = call_groq_sync_simple(prompt, "You are a JSON translator.", site="groq.translate")
             if resp:
                  # JSON 추출
                 json_start = resp.find('{')
@@ -838,7 +1318,7 @@ def translate_content_multilingual_sync(title: str, content: str) -> dict:
     client = get_llm_client()
     if client:
         try:
-            resp = generate_content_safe(client, prompt, timeout=40)
+            resp = generate_content_safe(client, prompt, timeout=40, site="gemini.translate")
             text = resp.text if hasattr(resp, 'text') else str(resp)
             json_start = text.find('{')
             json_end = text.rfind('}') + 1
@@ -852,6 +1332,12 @@ def translate_content_multilingual_sync(title: str, content: str) -> dict:
 
 # --- [신규] 비동기 의도 분석 함수 ---
 async def extract_info_from_question_async(question: str, chat_history: list[dict] = []) -> dict:
+    # [신규] 로컬 1차 분류기: 확실한 입력(인사/종료/더보기/카테고리 탭 등)은 LLM 호출 없이 처리
+    fast = classify_intent_fast(question, chat_history)
+    if fast.handled:
+        logger.info(f"⚡️ [FastIntent] {fast.reason} (confidence={fast.confidence:.2f}) → LLM 생략")
+        return fast.info
+
     history_formatted = "(이전 대화 없음)"
     if chat_history:
         recent_history = chat_history[-3:]
@@ -860,7 +1346,7 @@ async def extract_info_from_question_async(question: str, chat_history: list[dic
     cache_key = None
     if not chat_history:
         question_hash = hashlib.md5(question.encode('utf-8')).hexdigest()
-        cache_key = f"extract_v2:{question_hash}"
+        cache_key = f"extract_v3:{question_hash}"  # [수정] search_keywords 추가로 스키마 변경
         try:
             # [수정] 비동기 Redis 사용
             if redis_async_client:
@@ -868,12 +1354,12 @@ async def extract_info_from_question_async(question: str, chat_history: list[dic
                 if cached: return json.loads(cached.decode('utf-8'))
         except Exception: pass
 
-    if not LLM_MODEL and not get_llm_client(): return {"error": "Gemini 모델 로드 실패"} # check lazy
+    if not len(GENAI_POOL) and not GROQ_CLIENT: return {"error": "Gemini 모델 로드 실패"}
 
     recent_history = chat_history[-3:] 
     history_str = "\n".join([f"{t['role']}: {t['content'][:300]}" for t in recent_history]) if recent_history else "None"
 
-    # 프롬프트는 기존과 동일하게 사용 (재사용성)
+    # [수정] 의도 추출 + 검색어 확장을 한 번의 구조화(JSON) 호출로 처리 (worker의 expand_search_query LLM 호출 생략)
     prompt = f"""
     You are an intent classifier for a welfare chatbot.
     Analyze the user's input based on history and extract JSON.
@@ -885,7 +1371,7 @@ async def extract_info_from_question_async(question: str, chat_history: list[dic
     "{question}"
 
     [Task]
-    Return ONLY a JSON object with keys: "intent", "category", "sub_category", "age" (int), "keywords" (list).
+    Return ONLY a JSON object with keys: "intent", "category", "sub_category", "age" (int), "keywords" (list), "search_keywords" (list).
 
     [Rules]
     1. **intent**: "show_more", "safety_block", "exit", "reset", "out_of_scope", "small_talk", "clarify_category", null.
@@ -893,9 +1379,12 @@ async def extract_info_from_question_async(question: str, chat_history: list[dic
     3. **category**: generic queries only (see utils.py rules). specific names -> null.
     4. **sub_category**: specific traits or null.
     5. **keywords**: extract core nouns.
+    6. **search_keywords**: Korean search terms for the welfare DB (only when intent is null, else []).
+       - ALWAYS Korean, even if the input is English/Chinese/Vietnamese ("儿童津贴" -> ["아동수당", "지급", "대상"]).
+       - Add synonyms: "Allowance/津贴" -> "수당, 급여, 지원금", "Center/中心" -> "센터, 복지관, 보육", "Test/检查" -> "검사, 진단, 비용".
 
     [Output Example]
-    {{ "intent": null, "category": "null", "sub_category": "null", "age": 24, "keywords": ["바우처"] }}
+    {{ "intent": null, "category": "null", "sub_category": "null", "age": 24, "keywords": ["바우처"], "search_keywords": ["바우처", "이용권", "지원금"] }}
     """
     
     try:
@@ -904,40 +1393,39 @@ async def extract_info_from_question_async(question: str, chat_history: list[dic
             for c in ["HARM_CATEGORY_HARASSMENT", "HARM_CATEGORY_HATE_SPEECH", "HARM_CATEGORY_SEXUALLY_EXPLICIT", "HARM_CATEGORY_DANGEROUS_CONTENT"]
         ]
         
-        # [최적화] Groq 우선 시도 (Async)
-        response_text = None
+        async def _extract_with_groq():
+            # Groq는 빠르고 무료 티어 제한이 덜함
+            return await call_groq_async_simple(prompt, "You are a precise JSON extractor.", site="groq.extract", json_mode=True)
+
+        async def _extract_with_gemini():
+            # Groq가 1순위면 이 경로는 헤지/폴백용 → Groq로 다시 넘기지 않고 Gemini만 시도
+            response = await generate_content_safe_async(None, prompt, timeout=60, site="gemini.extract",
+                                                          groq_fallback=not GROQ_CLIENT,
+                                                         safety_settings=safety_settings, response_mime_type="application/json")
+            return response.text if hasattr(response, 'text') else str(response)
+
+        # [수정] Groq 우선 + Gemini 폴백/헤지 (EXTRACT_HEDGER)
         if GROQ_CLIENT:
-            try:
-                # Groq는 빠르고 무료 티어 제한이 덜함
-                groq_resp = await call_groq_async_simple(prompt, "You are a precise JSON extractor.")
-                if groq_resp:
-                    response_text = groq_resp
-                    # print("⚡️ [Intent] Groq Fast Path Used") 
-            except Exception as e:
-                print(f"⚠️ Groq Intent Failed: {e}")
+            response_text = await EXTRACT_HEDGER.run_async(
+                _extract_with_groq,
+                _extract_with_gemini if len(GENAI_POOL) else None,
+                hedge=_gemini_hedge_allowed(),
+            )
+        else:
+            response_text = await _extract_with_gemini()
 
-        # Groq 실패 시 Gemini Fallback
         if not response_text:
-            # lazy load된 client 사용
-            client = get_llm_client()
-            response = await generate_content_safe_async(client, prompt, timeout=60, safety_settings=safety_settings)
-            
-            # 텍스트 추출
-            if hasattr(response, 'text'):
-                response_text = response.text
-            else:
-                response_text = str(response)
-        
-
+            return {"error": "LLM 응답 없음"}
 
         json_block_start = response_text.find('{')
         json_block_end = response_text.rfind('}') + 1
         
         if json_block_start != -1 and json_block_end != -1:
             json_string = response_text[json_block_start:json_block_end]
-            default_info = {"age": None, "category": None, "sub_category": None, "intent": None, "keywords": None}
+            default_info = {"age": None, "category": None, "sub_category": None, "intent": None, "keywords": None, "search_keywords": None}
             extracted_info = json.loads(json_string)
             default_info.update(extracted_info)
+            default_info["search_keywords"] = _clean_ai_keywords(default_info.get("search_keywords"))
                 
             has_other_criteria = default_info.get("age") is not None or default_info.get("sub_category") is not None
             
@@ -1047,6 +1535,7 @@ def summarize_content_with_llm(context: str, original_question: str, chat_histor
             client, # client 전달 
             prompt, 
             timeout=30, 
+            site="gemini.summarize",
             safety_settings=safety_settings # <--- 여기 추가!
         )
         
@@ -1076,54 +1565,152 @@ def summarize_content_with_llm(context: str, original_question: str, chat_histor
         print(f"⚠️ 요약 실패: {e}")
         return context[:300] + "..."
 
-def expand_search_query(question: str) -> list:
+def _clean_ai_keywords(keywords) -> Optional[list]:
+    """LLM이 준 키워드 목록 정리 (마크다운 제거, 1글자 제외). 목록이 아니면 None"""
+    if not isinstance(keywords, list): return None
+    cleaned = [re.sub(r'\*+|[:\[\]]', '', str(k)).strip() for k in keywords]
+    return [k for k in cleaned if len(k) > 1]
+
+# [수정] 불용어/일반 용어는 호출마다 리스트를 새로 만들지 않도록 모듈 상수(frozenset)로
+# [업그레이드] 다국어 불용어 (Stop Words)
+_EXPAND_STOP_WORDS = frozenset([
+    # 한국어
+    "있어", "있니", "있나요", "어디", "어디야", "알려줘", "해줘", "궁금해", 
+    "무엇", "뭐야", "대한", "관한", "관련", "알고", "싶어", "해요", "되나요",
+    "나와", "저기", "그거", "이거", "요", "좀", "수", "것", "등", "및", "자세히",
+    "하는", "있는", "좋을", "같다고", "하셨는데", "하셨습니다", "가야하는지",
+    "받아보는", "의심된다고", "같습니다", "합니다", "입니다",
+    "선생님께서", "섲ㄴ생님꼐서", "어린이집에서", "아이를", "아이가", "키우고", "우리", "제가",
+    
+    # 영어
+    "please", "answer", "strictly", "english", "in", "system", "what", "where", "how", "when", "why", 
+    "can", "you", "tell", "me", "about", "is", "are", "the", "a", "an", "for", "to", "help",
+    
+    # 베트남어
+    "là", "gì", "ở", "đâu", "như", "thế", "nào", "tại", "sao", "khi", 
+    "có", "không", "của", "cho", "tôi", "hỏi", "xin", "vui", "lòng", 
+    "làm", "ơn", "nhé", "ạ", "về", "cách", "được", "muốn", "biết",   
+    "bạn", "chúng", "mình", "giúp", "với", "những", "các",           
+
+    # 중국어
+    "的", "了", "是", "我", "你", "他", "们", "在", "好", "吗",        
+    "什么", "怎么", "如何", "请", "问", "哪里", "个", "这", "那",      
+    "关于", "一下", "谢谢", "并没有", "可以", "想", "知道", "告诉",    
+    "有没有", "哪里有", "什么时候", "为什么", "需要"
+])
+
+# "지원", "서비스", "센터" 같은 너무나 일반적인 단어
+_EXPAND_GENERIC_TERMS = frozenset(["지원", "서비스", "센터", "복지", "신청", "방법", "문의", "대상"])
+
+_SYSTEM_SUFFIX_RE = re.compile(r'\s*\(System[\s\S]*?\)', flags=re.IGNORECASE)
+_NON_WORD_RE = re.compile(r'[^\w\s]')
+
+# [신규] LLM 확장 결과 캐시 (정리된 질문 기준, expand:* 네임스페이스) + 코퍼스 검색어 사전
+EXPAND_CACHE_PREFIX = "expand:v1:"
+EXPAND_CACHE_TTL_SECONDS = int(os.getenv("EXPAND_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+EXPAND_CACHE_L1_SIZE = 500
+_expand_l1 = OrderedDict()
+_expand_lock = threading.Lock()
+_expand_stats = dict.fromkeys(("dictionary", "reused", "cache_hits", "llm_calls"), 0)
+_synonym_state = {"dictionary": None, "checked_at": 0.0}
+
+
+def _expand_incr(field: str):
+    with _expand_lock:
+        _expand_stats[field] += 1
+
+
+def _expand_cache_key(clean_question: str) -> str:
+    normalized = re.sub(r'\s+', ' ', clean_question).strip().lower()
+    return EXPAND_CACHE_PREFIX + hashlib.md5(normalized.encode('utf-8')).hexdigest()
+
+
+def _expand_cache_get(clean_question: str) -> Optional[list]:
+    key = _expand_cache_key(clean_question)
+    with _expand_lock:
+        if key in _expand_l1:
+            _expand_l1.move_to_end(key)
+            return _expand_l1[key]
+    if not redis_client:
+        return None
+    try:
+        raw = redis_client.get(key)
+    except Exception:
+        return None
+    if not raw:
+        return None
+    keywords = json.loads(raw)
+    _expand_cache_put(clean_question, keywords, l2=False)
+    return keywords
+
+
+def _expand_cache_put(clean_question: str, keywords: list, l2: bool = True):
+    key = _expand_cache_key(clean_question)
+    with _expand_lock:
+        _expand_l1[key] = keywords
+        _expand_l1.move_to_end(key)
+        while len(_expand_l1) > EXPAND_CACHE_L1_SIZE:
+            _expand_l1.popitem(last=False)
+    if l2 and redis_client:
+        try:
+            redis_client.set(key, json.dumps(keywords, ensure_ascii=False), ex=EXPAND_CACHE_TTL_SECONDS)
+        except Exception as e:
+            print(f"⚠️ [Expand] 캐시 저장 실패: {e}")
+
+
+def _get_synonym_dictionary() -> Optional[SynonymDictionary]:
+    """
+    코퍼스 검색어 사전 (인덱서가 저장한 사전 → 없으면 적재된 검색 인덱스 메타데이터로 생성)
+    인덱스 버전이 바뀌면 다시 적재 (확인은 INDEX_CHECK_SECONDS마다)
+    """
+    now = time.monotonic()
+    current = _synonym_state["dictionary"]
+    if current is not None and now - _synonym_state["checked_at"] < INDEX_CHECK_SECONDS:
+        return current
+    _synonym_state["checked_at"] = now
+    version = _current_index_version()
+    if current is not None and current.version == version:
+        return current
+
+    entries = load_synonyms(redis_client)
+    if entries is None and SEARCH_INDEX is not None and SEARCH_INDEX.ready:
+        entries = mine_synonyms({"metadata": meta} for meta in SEARCH_INDEX.metadatas())
+    if entries:
+        _synonym_state["dictionary"] = SynonymDictionary(entries, version)
+        print(f"📖 [Synonyms] 검색어 사전 적재: {len(entries)}개 표현 (버전 {version})")
+    return _synonym_state["dictionary"]
+
+
+def get_expand_stats() -> dict:
+    with _expand_lock:
+        stats = dict(_expand_stats, cache_l1_size=len(_expand_l1))
+    dictionary = _synonym_state["dictionary"]
+    stats["dictionary_size"] = len(dictionary) if dictionary else 0
+    return stats
+
+def expand_search_query(question: str, ai_keywords: Optional[list] = None) -> list:
     """
     [Upgrade Final] 다국어 질문 -> 한국어 검색어 변환 강제화
     1. (System: ...) 시스템 프롬프트 제거 (노이즈 방지 강화)
     2. 무조건 한국어 키워드로 변환하도록 프롬프트 강화 (중국어/베트남어 필수)
+    3. [신규] ai_keywords(의도 추출 단계의 search_keywords)가 있으면 LLM 호출 없이 규칙 후처리만 수행
+    4. [신규] 코퍼스 검색어 사전으로 설명되는 질문은 LLM 없이 확장, LLM 결과는 정리된 질문 기준으로 캐시
     """
     
     # ---------------------------------------------------------
     # 1. 노이즈 제거 (강력한 전처리)
     # ---------------------------------------------------------
     # [수정] 정규식 강화: 대소문자 무시, 공백 유연하게 처리
-    clean_question = re.sub(r'\s*\(System[\s\S]*?\)', '', question, flags=re.IGNORECASE).strip()
+    clean_question = _SYSTEM_SUFFIX_RE.sub('', question).strip()
     
     # 특수문자 제거
-    clean_question = re.sub(r'[^\w\s]', '', clean_question) 
-    
-    # [업그레이드] 다국어 불용어 (Stop Words)
-    STOP_WORDS = [
-        # 한국어
-        "있어", "있니", "있나요", "어디", "어디야", "알려줘", "해줘", "궁금해", 
-        "무엇", "뭐야", "대한", "관한", "관련", "알고", "싶어", "해요", "되나요",
-        "나와", "저기", "그거", "이거", "요", "좀", "수", "것", "등", "및", "자세히",
-        "하는", "있는", "좋을", "같다고", "하셨는데", "하셨습니다", "가야하는지",
-        "받아보는", "의심된다고", "같습니다", "합니다", "입니다",
-        "선생님께서", "섲ㄴ생님꼐서", "어린이집에서", "아이를", "아이가", "키우고", "우리", "제가",
-        
-        # 영어
-        "please", "answer", "strictly", "english", "in", "system", "what", "where", "how", "when", "why", 
-        "can", "you", "tell", "me", "about", "is", "are", "the", "a", "an", "for", "to", "help",
-        
-        # 베트남어
-        "là", "gì", "ở", "đâu", "như", "thế", "nào", "tại", "sao", "khi", 
-        "có", "không", "của", "cho", "tôi", "hỏi", "xin", "vui", "lòng", 
-        "làm", "ơn", "nhé", "ạ", "về", "cách", "được", "muốn", "biết",   
-        "bạn", "chúng", "mình", "giúp", "với", "những", "các",           
-
-        # 중국어
-        "的", "了", "是", "我", "你", "他", "们", "在", "好", "吗",        
-        "什么", "怎么", "如何", "请", "问", "哪里", "个", "这", "那",      
-        "关于", "一下", "谢谢", "并没有", "可以", "想", "知道", "告诉",    
-        "有没有", "哪里有", "什么时候", "为什么", "需要"                   
-    ]
+    clean_question = _NON_WORD_RE.sub('', clean_question) 
     
     # 사용자 입력 단어 1차 필터링
     raw_tokens = clean_question.split()
     refined_user_keywords = [
         k for k in raw_tokens 
-        if len(k) >= 1 and k.lower() not in STOP_WORDS
+        if len(k) >= 1 and k.lower() not in _EXPAND_STOP_WORDS
     ]
 
     # ---------------------------------------------------------
@@ -1162,7 +1749,29 @@ def expand_search_query(question: str) -> list:
     # ---------------------------------------------------------
     # 3. AI 확장 (Smart Expansion - Hybrid: Groq 1순위 -> Gemini 백업)
     # ---------------------------------------------------------
-    ai_keywords = []
+    # [신규] 의도 추출 호출에서 이미 받은 확장 키워드 재사용
+    ai_keywords = _clean_ai_keywords(ai_keywords) or []
+    if ai_keywords:
+        _expand_incr("reused")
+        print(f"♻️ [AI 확장 재사용] {ai_keywords}")
+
+    # [신규] 코퍼스 검색어 사전 → 모르는 외국어 단어가 없으면 LLM 생략
+    dictionary_keywords, unknown_words = [], []
+    dictionary = _get_synonym_dictionary()
+    if dictionary is not None:
+        dictionary_keywords, unknown_words = dictionary.expand(clean_question, refined_user_keywords)
+    use_llm = not ai_keywords and not (dictionary_keywords and not unknown_words)
+    if dictionary_keywords and not ai_keywords and not use_llm:
+        _expand_incr("dictionary")
+        print(f"📖 [사전 확장] {dictionary_keywords}")
+
+    if use_llm:
+        cached = _expand_cache_get(clean_question)
+        if cached is not None:
+            _expand_incr("cache_hits")
+            ai_keywords = cached
+            use_llm = False
+            print(f"♻️ [AI 확장 캐시] {ai_keywords}")
     
     # [프롬프트 공통 정의]
     expansion_prompt = f"""
@@ -1185,59 +1794,86 @@ def expand_search_query(question: str) -> list:
     3. **출력 형식:** - 설명 없이 오직 한국어 단어만 쉼표(,)로 구분하여 나열하세요.
     """
 
-    # [1순위] Groq (Llama-3.3) 시도 - 속도 빠름
-    if GROQ_SYNC_CLIENT:
+    def _expand_with_groq():
+        return call_groq_sync_simple(expansion_prompt, "You are a professional translator for welfare services.", site="groq.expand")
+
+    def _expand_with_gemini():
+        return generate_content_safe(None, expansion_prompt, timeout=30, site="gemini.expand",
+                                     groq_fallback=not GROQ_SYNC_CLIENT).text
+
+    # [수정] 1순위 Groq (Llama-3.3, 빠름) → 2순위 Gemini (실패 시 폴백, LLM_HEDGING이면 p90 초과 시 동시 요청)
+    primary = _expand_with_groq if GROQ_SYNC_CLIENT else None
+    secondary = _expand_with_gemini if len(GENAI_POOL) else None
+    if primary is None:
+        primary, secondary = secondary, None
+
+    if primary is not None and use_llm:
         try:
-            groq_response = call_groq_sync_simple(expansion_prompt, "You are a professional translator for welfare services.")
-            if groq_response:
+            _expand_incr("llm_calls")
+            expanded = EXPAND_HEDGER.run(primary, secondary, executor=_HEDGE_EXECUTOR, hedge=_gemini_hedge_allowed())
+            if expanded:
                 # 마크다운 문자 제거 (**, *, : 등)
-                clean_response = re.sub(r'\*+|[:\[\]]', '', groq_response)
+                clean_response = re.sub(r'\*+|[:\[\]]', '', expanded)
                 ai_keywords = [k.strip() for k in re.split(r'[,|\n]', clean_response) if k.strip() and len(k.strip()) > 1]
-                print(f"⚡️ [Groq 확장] {ai_keywords}")
-        except Exception as e:
-            print(f"⚠️ Groq 확장 실패 (Gemini로 전환): {e}")
-
-    # [2순위] Gemini 시도 (Groq 없거나 실패 시)
-    if not ai_keywords and LLM_MODEL:
-        try:
-            response = generate_content_safe(LLM_MODEL, expansion_prompt, timeout=30)
-            # 마크다운 문자 제거 (**, *, : 등)
-            clean_response = re.sub(r'\*+|[:\[\]]', '', response.text)
-            ai_keywords = [k.strip() for k in re.split(r'[,|\n]', clean_response) if k.strip() and len(k.strip()) > 1]
-            print(f"🐢 [Gemini 확장] {ai_keywords}")
+                print(f"⚡️ [AI 확장] {ai_keywords}")
+                if ai_keywords:
+                    _expand_cache_put(clean_question, ai_keywords)
         except Exception as e:
             print(f"⚠️ AI 확장 실패: {e}")
 
     # ---------------------------------------------------------
     # 4. 최종 합체
     # ---------------------------------------------------------
-    final_keywords = list(set(ai_keywords + fallback_keywords + refined_user_keywords))
+    final_keywords = list(set(ai_keywords + dictionary_keywords + fallback_keywords + refined_user_keywords))
     
     # [최종 필터링]
     # "지원", "서비스", "센터" 같은 너무나 일반적인 단어는
     # 다른 구체적인 키워드(예: "양육수당")가 있다면 제거합니다.
     # 그래야 검색 결과가 "지원"이라는 단어 하나 때문에 "특수교육 가족 지원" 같은 엉뚱한 걸 잡지 않습니다.
-    GENERIC_TERMS = ["지원", "서비스", "센터", "복지", "신청", "방법", "문의", "대상"]
-    
-    filtered_keywords = [k for k in final_keywords if len(k) >= 1 and k.lower() not in STOP_WORDS]
+    filtered_keywords = [k for k in final_keywords if len(k) >= 1 and k.lower() not in _EXPAND_STOP_WORDS]
     
     # 구체적인 키워드가 있는지 확인 (일반적이지 않은 단어)
-    has_specific = any(k not in GENERIC_TERMS for k in filtered_keywords)
+    has_specific = any(k not in _EXPAND_GENERIC_TERMS for k in filtered_keywords)
     
     if has_specific:
         # 구체적인 단어가 있다면 일반적인 단어 제거
-        filtered_keywords = [k for k in filtered_keywords if k not in GENERIC_TERMS]
+        filtered_keywords = [k for k in filtered_keywords if k not in _EXPAND_GENERIC_TERMS]
         
     return filtered_keywords
 
 
-def rerank_search_results(question: str, candidates: list) -> list:
+def rerank_search_results(question: str, candidates: list, extracted_info: Optional[dict] = None) -> list:
     """
     [Upgrade] 중복 정의 버그 수정 및 심사 기준 + 다국어 의도 파악 통합 버전
+    [수정] 로컬 점수로 먼저 정렬하고, 상위 2개가 애매할 때만 LLM 랭킹 호출 (local_rerank)
     """
-    if not candidates or not LLM_MODEL: return candidates
-
-    # [최적화] SQL에서 이미 키워드 가산점으로 정렬되었으므로 상위 15개만 봅니다.
+    if not candidates: return candidates
+
+    local = rank_locally(question, candidates, extracted_info, title_match=check_title_match)
+    record_decision(local.confident)
+    if local.confident:
+        print(f"⚡ [Rerank] 로컬 순위 사용 (LLM 생략, 차이 {local.margin:.3f})")
+        return local.ranked
+    if not len(GENAI_POOL):
+        return local.ranked
+
+    # [신규] 같은 질문 + 같은 후보 순서 + 같은 인덱스 버전이면 이전 LLM 랭킹 재사용
+    cache_key = RERANK_CACHE.key(question, local.ranked, _current_index_version())
+    cached = RERANK_CACHE.get(cache_key, local.ranked)
+    if cached is not None:
+        print(f"♻️ [Rerank] 랭킹 캐시 사용 (차이 {local.margin:.3f})")
+        return cached
+
+    print(f"🤔 [Rerank] 상위 후보가 애매함 (차이 {local.margin:.3f}) → LLM 랭킹")
+    reranked = _llm_rerank(question, local.ranked)
+    if reranked is None:
+        return local.ranked
+    RERANK_CACHE.put(cache_key, reranked)
+    return reranked
+
+def _llm_rerank(question: str, candidates: list) -> Optional[list]:
+    """Gemini 랭킹 (실패하면 None)"""
+    # [최적화] 로컬 점수로 이미 정렬되었으므로 상위 15개만 봅니다.
     ranking_candidates = candidates[:15]
     
     # AI에게 보낼 후보 목록 텍스트 생성
@@ -1276,7 +1912,7 @@ def rerank_search_results(question: str, candidates: list) -> list:
 
     try:
         # 타임아웃 15초
-        response = generate_content_safe(LLM_MODEL, prompt, timeout=120)
+        response = generate_content_safe(None, prompt, timeout=120, site="gemini.rerank")
         
         # 숫자만 추출
         raw_indices = [int(s) for s in re.findall(r'\b\d+\b', response.text.strip())]
@@ -1300,8 +1936,8 @@ def rerank_search_results(question: str, candidates: list) -> list:
 
     except Exception as e:
         print(f"⚠️ AI 랭킹 실패: {e}")
-        # 실패하면 SQL 점수 순서 그대로 반환
-        return candidates
+        # 실패하면 None → 호출부가 로컬 점수 순서 사용 (실패 결과는 캐시하지 않음)
+        return None
     
 # [utils.py] 파일 맨 아래에 추가
 
@@ -1313,7 +1949,11 @@ def get_supabase_pages_by_ids(page_ids: list) -> list:
     """ID 목록으로 Supabase 데이터 조회 (동기 버전)"""
     if not page_ids or not supabase: return []
     try:
-        response = supabase.table("site_pages").select("*").in_("page_id", page_ids).execute()
+        # [수정] select("*")는 청크마다 임베딩/본문까지 받으므로 표시에 쓰는 metadata만
+        response = SUPABASE_RETRY.call(
+            lambda: supabase.table("site_pages").select("page_id,metadata").in_("page_id", page_ids).execute(),
+            site="supabase.pages_by_ids"
+        )
         
         # 중복 제거 및 정렬
         unique_pages = {item['page_id']: item['metadata'] for item in response.data}
@@ -1617,15 +2257,22 @@ def format_search_results(pages_metadata: list) -> str:
 def check_semantic_cache(query_embedding: list) -> str | None:
     """
     Worker용 동기 캐시 조회 함수
+    [수정] 호출마다 이벤트 루프를 새로 만들지 않고 동기 Supabase 클라이언트로 직접 조회
+    (워커의 답변 캐시는 answer_cache.SemanticAnswerCache → ANSWER_CACHE 사용)
     """
-    import asyncio
-    
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
+    if supabase is None:
+        return None
     try:
-        return loop.run_until_complete(check_semantic_cache_async(query_embedding))
-    finally:
-        loop.close()
+        response = supabase.rpc(
+            "match_chat_cache",
+            {"query_embedding": query_embedding, "match_threshold": 0.92, "match_count": 1}
+        ).execute()
+        if response.data:
+            print(f"♻️ [Semantic Cache] 의미가 같은 질문 발견! (유사도: {response.data[0]['similarity']:.4f})")
+            return response.data[0]['answer']
+    except Exception as e:
+        print(f"⚠️ 캐시 확인 중 오류: {e}")
+    return None
 
 # [삭제됨] get_gemini_embedding 중복 정의 - 진짜 동기 버전은 파일 상단에 있음 (line ~270)
 
@@ -1639,7 +2286,10 @@ async def check_semantic_cache_async(query_embedding: list) -> str | None:
     try:
         # [★수정★] 기준을 0.92 -> 0.98로 대폭 상향합니다.
         # 0.98 이상이어야만 '같은 질문'으로 인정하고 캐시를 반환합니다.
-        response = await supabase_async.rpc(
+        client = await get_supabase_async()
+        if client is None:
+            return None
+        response = await client.rpc(
             "match_chat_cache",
             {
                 "query_embedding": query_embedding,
@@ -1668,7 +2318,10 @@ async def save_semantic_cache_async(question: str, answer: str, embedding: list)
             "answer": answer,
             "embedding": embedding
         }
-        await supabase_async.table("chat_cache").insert(data).execute()
+        client = await get_supabase_async()
+        if client is None:
+            return
+        await client.table("chat_cache").insert(data).execute()
         print("💾 [Semantic Cache] 새로운 대화 기억 저장 완료")
     except Exception as e:
         print(f"⚠️ 캐시 저장 실패: {e}")
@@ -1691,209 +2344,421 @@ def save_semantic_cache(question: str, answer: str, embedding: list):
 # [utils.py] 맨 아래 search_supabase 함수 교체
 
 # 원래 동기 함수 복구 (Worker 호환성)
-def search_supabase(question: str, extracted_info: dict, keywords: list = []) -> list:
+# --- [신규] 로컬 벡터 인덱스 (질문마다 hybrid_search_v3 RPC를 호출하지 않도록) ---
+LOCAL_VECTOR_INDEX = os.getenv("LOCAL_VECTOR_INDEX", "true").lower() == "true"
+
+def _read_search_index_version() -> Optional[str]:
+    version = redis_client.get(INDEX_VERSION_KEY)
+    return version.decode('utf-8') if version else None
+
+SEARCH_INDEX = VectorIndex(
+    lambda: fetch_site_pages(supabase),
+    version_fn=_read_search_index_version if redis_client else None,
+    bm25_loader=lambda: load_bm25_artifact(redis_client),
+) if (LOCAL_VECTOR_INDEX and supabase) else None
+
+def _current_index_version() -> Optional[str]:
+    """랭킹 캐시 키용 인덱스 버전 (로컬 인덱스가 적재돼 있으면 그 버전, 아니면 게시된 버전)"""
+    if SEARCH_INDEX is not None and SEARCH_INDEX.version:
+        return SEARCH_INDEX.version
+    try:
+        return _read_search_index_version() if redis_client else None
+    except Exception:
+        return None
+
+# [신규] LLM 랭킹 결과 캐시 (rank:*)
+RERANK_CACHE = RerankCache(redis_client)
+
+# [신규] 의미 기반 답변 캐시 (워커 메모리 벡터 인덱스 + sem:* Redis 미러, SEMANTIC_CACHE=false면 비활성)
+ANSWER_CACHE = SemanticAnswerCache(redis_client, version_fn=_current_index_version) if SEMANTIC_CACHE_ENABLED else None
+
+def _search_local_index(params: dict) -> Optional[list]:
+    """로컬 인덱스가 준비됐으면 검색 결과, 아니면 None (호출부가 RPC로 폴백)"""
+    if SEARCH_INDEX is None:
+        return None
+    if not SEARCH_INDEX.ready:
+        SEARCH_INDEX.maybe_refresh()  # 아직 적재 전이면 백그라운드 적재 시작
+        return None
+    try:
+        return SEARCH_INDEX.search(
+            params["query_embedding"],
+            match_threshold=params["match_threshold"],
+            match_count=params["match_count"],
+            filter_category=params.get("filter_category"),
+            keywords=params.get("keywords_arr"),
+            query_text=params.get("query_text"),
+            user_age=params.get("user_age"),
+            slim=bool(params.get("slim")),
+        )
+    except Exception as e:
+        print(f"⚠️ [SearchIndex] 로컬 검색 실패 → RPC 폴백: {e}")
+        return None
+
+def _rpc_params(params: dict) -> dict:
+    # hybrid_search_v3는 나이 인자가 없으므로 빼고 호출 후 같은 규칙으로 거름 (v3 폴백 경로만 조회 후 필터링)
+    return {k: v for k, v in params.items() if k not in ("user_age", "slim")}
+
+def _slim_rpc_params(params: dict) -> dict:
+    # [수정] hybrid_search_slim은 user_age를 받아 LIMIT 전에 나이 조건을 적용 (sql/hybrid_search_slim.sql)
+    return {k: v for k, v in params.items() if k != "slim"}
+
+# [신규] 슬림 검색 (sql/hybrid_search_slim.sql): 후보마다 전체 metadata(다국어 제목/요약 8개)와 본문 전체를 받지 않음
+# DB에 함수가 아직 없으면 한 번 경고하고 hybrid_search_v3 + 로컬 투영으로 폴백 (결과 모양은 같음)
+SEARCH_SLIM = os.getenv("SEARCH_SLIM", "true").lower() == "true"
+_slim_rpc_state = {"available": True}
+
+def _slim_rpc_missing(e: Exception) -> bool:
+    text = str(e)
+    return "hybrid_search_slim" in text or "PGRST202" in text
+
+def _slim_rpc_failed(e: Exception):
+    _slim_rpc_state["available"] = False
+    print(f"⚠️ [Search] hybrid_search_slim 함수 없음(또는 user_age 인자 없는 이전 버전) → hybrid_search_v3 + 투영으로 폴백 "
+          f"(sql/hybrid_search_slim.sql 적용 필요): {e}")
+
+def hybrid_search(params: dict) -> list:
     """
-    [Upgrade v2] 확정적 카테고리 매핑 + 제목 매칭 부스트
+    [신규] hybrid_search_v3와 같은 인자/결과 (+ user_age, slim). 로컬 인덱스 우선, 없으면 Supabase RPC
+    나이 조건: 로컬 인덱스 / hybrid_search_slim은 순위 계산 전에 적용, hybrid_search_v3 폴백만 조회 후 거름
     """
-    # 1. 임베딩 생성
-    query_embedding = get_gemini_embedding(question)
-    if not query_embedding: return []
+    local = _search_local_index(params)
+    if local is not None:
+        return local
+    slim = bool(params.get("slim"))
+    if slim and _slim_rpc_state["available"]:
+        try:
+            rows = SUPABASE_RETRY.call(
+                lambda: supabase.rpc("hybrid_search_slim", _slim_rpc_params(params)).execute(),
+                site="supabase.hybrid_search"
+            ).data
+            return [slim_row_from_rpc(r) for r in rows]
+        except Exception as e:
+            if not _slim_rpc_missing(e):
+                raise
+            _slim_rpc_failed(e)
+    rows = SUPABASE_RETRY.call(
+        lambda: supabase.rpc("hybrid_search_v3", _rpc_params(params)).execute(),
+        site="supabase.hybrid_search"
+    ).data
+    if slim:
+        rows = [slim_row(r) for r in rows]
+    return filter_rows_by_age(rows, params.get("user_age"))
+
+async def hybrid_search_async(params: dict) -> list:
+    """[신규] hybrid_search의 비동기 버전 (로컬 검색은 수 ms라 이벤트 루프에서 바로 실행)"""
+    local = _search_local_index(params)
+    if local is not None:
+        return local
+    client = await get_supabase_async()
+    if client is None:
+        raise RuntimeError("Supabase Async 클라이언트가 없습니다")
+    slim = bool(params.get("slim"))
+    if slim and _slim_rpc_state["available"]:
+        try:
+            response = await SUPABASE_RETRY.call_async(
+                lambda: client.rpc("hybrid_search_slim", _slim_rpc_params(params)).execute(),
+                site="supabase.hybrid_search"
+            )
+            return [slim_row_from_rpc(r) for r in response.data]
+        except Exception as e:
+            if not _slim_rpc_missing(e):
+                raise
+            _slim_rpc_failed(e)
+    response = await SUPABASE_RETRY.call_async(
+        lambda: client.rpc("hybrid_search_v3", _rpc_params(params)).execute(),
+        site="supabase.hybrid_search"
+    )
+    rows = [slim_row(r) for r in response.data] if slim else response.data
+    return filter_rows_by_age(rows, params.get("user_age"))
+
+# [신규] 화면에 나가는 결과만 표시용 메타데이터 조회 (요청 언어의 제목/요약만)
+DISPLAY_META_FIELDS = ("page_id", "title", "category", "sub_category_list", "start_age", "end_age", "page_url", "pre_summary")
+
+def _display_fields(lang: str) -> tuple:
+    if lang and lang != "ko":
+        return DISPLAY_META_FIELDS + (f"title_{lang}", f"pre_summary_{lang}")
+    return DISPLAY_META_FIELDS
+
+def fetch_display_metadata(page_ids: list, lang: str = "ko") -> dict:
+    """page_id → 표시용 메타데이터 (로컬 인덱스 → 없으면 Supabase에서 필요한 JSON 필드만 선택)"""
+    fields = _display_fields(lang)
+    found = {}
+    if SEARCH_INDEX is not None and SEARCH_INDEX.ready:
+        for pid, meta in SEARCH_INDEX.page_metadata(page_ids).items():
+            found[pid] = {k: meta.get(k) for k in fields}
+    missing = [pid for pid in page_ids if pid and pid not in found]
+    if missing and supabase:
+        columns = "page_id," + ",".join(f"{k}:metadata->{k}" for k in fields if k != "page_id")
+        try:
+            rows = SUPABASE_RETRY.call(
+                lambda: supabase.table("site_pages").select(columns).in_("page_id", missing).execute(),
+                site="supabase.pages_by_ids"
+            ).data
+            for row in rows:
+                found.setdefault(row["page_id"], row)
+        except Exception as e:
+            print(f"⚠️ [Hydrate] 표시용 메타데이터 조회 실패 (슬림 필드로 표시): {e}")
+    return found
+
+def hydrate_display_results(docs: list, lang: str = "ko") -> list:
+    """
+    슬림 검색 결과 중 화면에 나갈 문서에 표시용 메타데이터를 채운 복사본 반환
+    (인덱스의 공유 메타데이터를 번역 단계가 덮어쓰지 않도록 항상 새 dict)
+    """
+    page_ids = [(doc.get("metadata") or {}).get("page_id") or doc.get("page_id") for doc in docs]
+    found = fetch_display_metadata([pid for pid in page_ids if pid], lang)
+    hydrated = []
+    for doc, pid in zip(docs, page_ids):
+        meta = dict(doc.get("metadata") or {})
+        meta.update({k: v for k, v in (found.get(pid) or {}).items() if v is not None})
+        hydrated.append(dict(doc, metadata=meta))
+    return hydrated
+
+# ============================================
+# [신규] 1차(카테고리 필터) / 2차(전체) 검색 동시 실행
+# ============================================
+# 1차 결과가 부족할 때만 2차를 보내면 RPC 왕복이 직렬로 두 번 걸림
+# → 두 검색을 동시에 보내고, 1차가 충분하면 2차 결과는 버림
+SEARCH_PARALLEL_PHASES = os.getenv("SEARCH_PARALLEL_PHASES", "true").lower() == "true"
+SEARCH_FILTERED_ENOUGH = 3  # 1차 결과가 이 개수 이상이면 2차 생략
+_SEARCH_EXECUTOR = concurrent.futures.ThreadPoolExecutor(max_workers=8, thread_name_prefix="search")
+
+_search_phase_stats = {"searches": 0, "parallel": 0, "global_used": 0, "global_dropped": 0,
+                       "filtered_ms": 0.0, "global_ms": 0.0, "wall_ms": 0.0, "saved_ms": 0.0}
+_search_phase_lock = threading.Lock()
+
+
+def _search_phases_parallel(has_filtered: bool) -> bool:
+    # 로컬 인덱스 검색은 수 ms CPU 작업이라 동시 실행 이득이 없음 (RPC 왕복일 때만 병렬)
+    local_ready = SEARCH_INDEX is not None and SEARCH_INDEX.ready
+    return has_filtered and SEARCH_PARALLEL_PHASES and not local_ready
+
+
+def _merge_search_results(results: list, global_results: list) -> list:
+    # 중복 제거 및 합치기
+    existing_ids = {r['id'] for r in results}
+    for doc in global_results:
+        if doc['id'] not in existing_ids:
+            results.append(doc)
+    return results
+
+
+def _record_search_phases(timings: dict, wall_ms: float, parallel: bool, global_used: bool):
+    filtered_ms = timings.get("filtered", 0.0)
+    global_ms = timings.get("global", 0.0) if global_used else 0.0
+    # 직렬이었다면 걸렸을 시간 - 실제 시간 (2차를 버린 경우는 직렬에서도 1차만 실행했으므로 0)
+    saved_ms = max(0.0, filtered_ms + global_ms - wall_ms) if parallel and global_used else 0.0
+    with _search_phase_lock:
+        stats = _search_phase_stats
+        stats["searches"] += 1
+        stats["parallel"] += int(parallel)
+        stats["global_used"] += int(global_used)
+        stats["global_dropped"] += int(parallel and not global_used)
+        stats["filtered_ms"] += filtered_ms
+        stats["global_ms"] += global_ms
+        stats["wall_ms"] += wall_ms
+        stats["saved_ms"] += saved_ms
+    mode = "병렬" if parallel else "직렬"
+    first = f"{filtered_ms:.0f}ms" if "filtered" in timings else "없음"
+    second = f"{global_ms:.0f}ms" if global_used else ("버림" if parallel else "생략")
+    print(f"⏱️ [Search] {mode} 1차 {first} / 2차 {second} / 합계 {wall_ms:.0f}ms (절약 {saved_ms:.0f}ms)")
+
+
+def get_search_phase_stats() -> dict:
+    """[신규] 검색 단계별 누적 시간 (/admin/stats 노출용, 평균 ms)"""
+    with _search_phase_lock:
+        stats = dict(_search_phase_stats)
+    searches = stats["searches"] or 1
+    global_used = stats["global_used"] or 1
+    return {
+        "searches": stats["searches"],
+        "parallel": stats["parallel"],
+        "global_used": stats["global_used"],
+        "global_dropped": stats["global_dropped"],
+        "avg_filtered_ms": round(stats["filtered_ms"] / searches, 1),
+        "avg_global_ms": round(stats["global_ms"] / global_used, 1),
+        "avg_wall_ms": round(stats["wall_ms"] / searches, 1),
+        "avg_saved_ms": round(stats["saved_ms"] / searches, 1),
+    }
+
+
+def _run_search_phases(filtered_params: Optional[dict], global_params: dict) -> list:
+    """
+    1차(filtered_params, 카테고리 없으면 None) → 결과 부족 시 2차(global_params).
+    병렬 모드면 2차를 스레드 풀에 미리 보내 두고, 1차가 충분하면 그 결과를 버림.
+    """
+    timings = {}
+
+    def timed(phase: str, params: dict) -> list:
+        start = time.perf_counter()
+        try:
+            return hybrid_search(params)
+        finally:
+            timings[phase] = (time.perf_counter() - start) * 1000
+
+    wall_start = time.perf_counter()
+    parallel = _search_phases_parallel(filtered_params is not None)
+    global_future = _SEARCH_EXECUTOR.submit(timed, "global", global_params) if parallel else None
 
-    # 2. 검색어 확장
-    if not keywords:
-        keywords = expand_search_query(question)
-    
-    final_query_text = " ".join(keywords)
-    
-    # [NEW] 확정적 카테고리 우선 사용 (LLM 의존성 제거)
-    deterministic_category = get_deterministic_category(question)
-    ai_category = deterministic_category or extracted_info.get("category")
-    
-    print(f"🔍 [Search] 쿼리: {question} / 확정카테고리: {deterministic_category} / AI카테고리: {extracted_info.get('category')}")
-    
     results = []
-    
-    # --- 1차 시도 (카테고리 필터 + 키워드 부스트) ---
-    if ai_category:
+    if filtered_params is not None:
         try:
-            response = supabase.rpc(
-                "hybrid_search_v3",
-                {
-                    "query_text": final_query_text,
-                    "query_embedding": query_embedding,
-                    "match_threshold": 0.45,
-                    "match_count": 15,
-                    "filter_category": ai_category,
-                    "keywords_arr": keywords
-                }
-            ).execute()
-            results = response.data
+            results = timed("filtered", filtered_params)
         except Exception as e:
             print(f"⚠️ 1차 검색 실패: {e}")
 
-    # --- 2차 시도 (결과 부족 시 전체 검색) ---
-    if not ai_category or len(results) < 3:
+    global_used = filtered_params is None or len(results) < SEARCH_FILTERED_ENOUGH
+    if global_used:
         try:
-            response = supabase.rpc(
-                "hybrid_search_v3",
-                {
-                    "query_text": final_query_text,
-                    "query_embedding": query_embedding,
-                    "match_threshold": 0.4, 
-                    "match_count": 20,
-                    "filter_category": None,
-                    "keywords_arr": keywords
-                }
-            ).execute()
-            
-            existing_ids = {r['id'] for r in results}
-            for doc in response.data:
-                if doc['id'] not in existing_ids:
-                    results.append(doc)
-                    
+            global_results = global_future.result() if global_future else timed("global", global_params)
+            _merge_search_results(results, global_results)
         except Exception as e:
             print(f"⚠️ 2차 검색 실패: {e}")
+    elif global_future:
+        global_future.cancel()  # 아직 시작 전이면 취소, 진행 중이면 결과만 버림
 
-        user_age = extracted_info.get("age")
-    
-        if user_age is not None and isinstance(user_age, int) and results:
-            filtered_results = []
-            for doc in results:
-                meta = doc.get("metadata", {})
-                start_age = meta.get("start_age")
-                end_age = meta.get("end_age")
-                doc_age_range = f"{start_age}-{end_age}" if start_age and end_age else None
-                
-                if doc_age_range:
-                    try:
-                        doc_start, doc_end = map(int, doc_age_range.split("-"))
-                        if doc_start <= user_age <= doc_end:
-                            filtered_results.append(doc)
-                    except:
-                        pass
-            
-            if filtered_results:
-                results = filtered_results[:15]
-    
-    # ============================================
-    # [NEW] 제목 매칭 기반 정렬 (관련성 높은 문서 상위 배치)
-    # ============================================
-    if results:
-        matched_results = []
-        unmatched_results = []
-        
-        for doc in results:
-            title = doc.get("title", "") or doc.get("metadata", {}).get("title", "")
-            if check_title_match(question, title):
-                matched_results.append(doc)
-            else:
-                unmatched_results.append(doc)
-        
-        # 제목 매칭된 문서를 앞에 배치
-        results = matched_results + unmatched_results
-        print(f"📊 [Title Filter] 제목 매칭: {len(matched_results)}개 / 비매칭: {len(unmatched_results)}개")
-    
+    _record_search_phases(timings, (time.perf_counter() - wall_start) * 1000, parallel, global_used)
     return results
 
-async def search_supabase_async(question: str, extracted_info: dict, keywords: list = []) -> list:
-    """
-    [Upgrade] 키워드 리스트를 SQL에 직접 전달하여 정확도 향상
-    """
-    # 1. 임베딩 생성 (비동기)
-    query_embedding = await get_gemini_embedding_async(question)
-    if not query_embedding: return []
 
-    # 2. 검색어 확장 (만약 입력된 keywords가 없으면 여기서 생성)
-    if not keywords:
-        keywords = expand_search_query(question)
-    
-    final_query_text = " ".join(keywords)
-    ai_category = extracted_info.get("category")
-    
-    # 디버깅 출력
-    print(f"🔍 [Search] 키워드: {keywords} / 카테고리: {ai_category}")
+async def _run_search_phases_async(filtered_params: Optional[dict], global_params: dict) -> list:
+    """_run_search_phases의 비동기 버전 (2차는 Task로 먼저 보내 두고, 1차가 충분하면 취소)"""
+    timings = {}
+
+    async def timed(phase: str, params: dict) -> list:
+        start = time.perf_counter()
+        try:
+            return await hybrid_search_async(params)
+        finally:
+            timings[phase] = (time.perf_counter() - start) * 1000
+
+    wall_start = time.perf_counter()
+    parallel = _search_phases_parallel(filtered_params is not None)
+    global_task = None
+    if parallel:
+        global_task = asyncio.ensure_future(timed("global", global_params))
+        # 취소/버린 Task의 예외가 "never retrieved" 경고로 남지 않도록
+        global_task.add_done_callback(lambda t: t.cancelled() or t.exception())
 
     results = []
-    
-    # --- 1차 시도 (카테고리 필터 + 키워드 부스트) ---
-    if ai_category:
+    if filtered_params is not None:
         try:
-            response = await supabase_async.rpc(
-                "hybrid_search_v3",
-                {
-                    "query_text": final_query_text,
-                    "query_embedding": query_embedding,
-                    "match_threshold": 0.45,  # 기준 점수
-                    "match_count": 15,
-                    "filter_category": ai_category,
-                    "keywords_arr": keywords  # [핵심] 키워드 배열 전달
-                }
-            ).execute()
-            results = response.data
+            results = await timed("filtered", filtered_params)
         except Exception as e:
             print(f"⚠️ 1차 검색 실패: {e}")
 
-    # --- 2차 시도 (결과 부족 시 전체 검색 + 키워드 부스트) ---
-    if not ai_category or len(results) < 3:
-        msg = "🔄 [Fallback] 전체 검색 진행..." if ai_category else "🌍 [Global] 전체 검색 진행..."
-        print(msg)
+    global_used = filtered_params is None or len(results) < SEARCH_FILTERED_ENOUGH
+    if global_used:
         try:
-            response = await supabase_async.rpc(
-                "hybrid_search_v3",
-                {
-                    "query_text": final_query_text,
-                    "query_embedding": query_embedding,
-                    "match_threshold": 0.4, 
-                    "match_count": 20,
-                    "filter_category": None, # 필터 해제
-                    "keywords_arr": keywords # [핵심] 키워드 배열 전달
-                }
-            ).execute()
-            
-            # 중복 제거 및 합치기
-            existing_ids = {r['id'] for r in results}
-            for doc in response.data:
-                if doc['id'] not in existing_ids:
-                    results.append(doc)
-                    
+            global_results = await global_task if global_task else await timed("global", global_params)
+            _merge_search_results(results, global_results)
         except Exception as e:
             print(f"⚠️ 2차 검색 실패: {e}")
+    elif global_task:
+        global_task.cancel()
+
+    _record_search_phases(timings, (time.perf_counter() - wall_start) * 1000, parallel, global_used)
+    return results
 
-        # [★신규 추가] 나이(월령) 기반 필터링 로직
-        user_age = extracted_info.get("age")
+def _user_age(extracted_info: dict) -> Optional[int]:
+    age = extracted_info.get("age")
+    return age if isinstance(age, int) and not isinstance(age, bool) else None
+
+def _search_phase_params(question: str, extracted_info: dict, keywords: list, query_embedding: list,
+                         slim: bool) -> Tuple[Optional[dict], dict]:
+    """[신규] 1차(카테고리 필터) / 2차(전체) 검색 인자 (동기/비동기 공통)"""
+    final_query_text = " ".join(keywords)
     
-        # 나이 정보가 있고, 검색 결과도 있다면 필터링 시도
-        if user_age is not None and isinstance(user_age, int) and results:
-            filtered_results = []
-            for doc in results:
-                meta = doc.get("metadata", {})
-                start_age = meta.get("start_age")
-                end_age = meta.get("end_age")
-            
-                # 나이 제한이 없는 문서(None)는 무조건 포함 (안전책)
-                if start_age is None and end_age is None:
-                    filtered_results.append(doc)
-                    continue
-                
-                try:
-                    s = int(start_age) if start_age is not None else 0
-                    e = int(end_age) if end_age is not None else 1000
-                
-                    # 범위 안에 들면 합격
-                    if s <= user_age <= e:
-                        filtered_results.append(doc)
-                except:
-                    filtered_results.append(doc) # 에러나면 그냥 포함
-        
-            # [안전장치] 필터링했더니 결과가 남았다면 -> 교체
-            if filtered_results:
-                print(f"🧹 [Age Filter] {len(results)}개 -> {len(filtered_results)}개로 정제됨")
-                results = filtered_results
-            # 결과가 0개가 되어버렸다면? -> 원본 유지 (필터링 취소)
-            else:
-                print(f"⚠️ [Age Filter] 필터링 결과가 0개여서 원본 유지")
+    # [NEW] 확정적 카테고리 우선 사용 (LLM 의존성 제거)
+    deterministic_category = get_deterministic_category(question)
+    ai_category = deterministic_category or extracted_info.get("category")
+    
+    print(f"🔍 [Search] 쿼리: {question} / 확정카테고리: {deterministic_category} / AI카테고리: {extracted_info.get('category')}")
+    
+    # [수정] 나이(월령) 조건은 검색 단계에서 후보를 좁히는 데 사용 (동기/비동기 동일 규칙)
+    user_age = _user_age(extracted_info)
+
+    # --- 1차 시도 (카테고리 필터 + 키워드 부스트) / 2차 시도 (결과 부족 시 전체 검색) ---
+    filtered_params = {
+        "query_text": final_query_text,
+        "query_embedding": query_embedding,
+        "match_threshold": 0.45,
+        "match_count": 15,
+        "filter_category": ai_category,
+        "keywords_arr": keywords,
+        "user_age": user_age,
+        "slim": slim
+    } if ai_category else None
+    global_params = {
+        "query_text": final_query_text,
+        "query_embedding": query_embedding,
+        "match_threshold": 0.4, 
+        "match_count": 20,
+        "filter_category": None,
+        "keywords_arr": keywords,
+        "user_age": user_age,
+        "slim": slim
+    }
+    return filtered_params, global_params
 
+def _sort_by_title_match(question: str, results: list) -> list:
+    # ============================================
+    # [NEW] 제목 매칭 기반 정렬 (관련성 높은 문서 상위 배치)
+    # ============================================
+    if not results:
         return results
+    matched_results = []
+    unmatched_results = []
+    
+    for doc in results:
+        title = doc.get("title", "") or doc.get("metadata", {}).get("title", "")
+        if check_title_match(question, title):
+            matched_results.append(doc)
+        else:
+            unmatched_results.append(doc)
+    
+    # 제목 매칭된 문서를 앞에 배치
+    print(f"📊 [Title Filter] 제목 매칭: {len(matched_results)}개 / 비매칭: {len(unmatched_results)}개")
+    return matched_results + unmatched_results
+
+def search_supabase(question: str, extracted_info: dict, keywords: list = [],
+                    query_embedding: Optional[list] = None, slim: bool = False) -> list:
+    """
+    [Upgrade v2] 확정적 카테고리 매핑 + 제목 매칭 부스트
+    [수정] query_embedding을 받으면 임베딩 생성 생략 (워커가 키워드 확장과 동시에 미리 계산)
+    [신규] slim=True면 슬림 행(제목/카테고리/나이/본문 미리보기) 반환 → 표시 결과는 hydrate_display_results로 채움
+    """
+    # 1. 임베딩 생성
+    if query_embedding is None:
+        query_embedding = get_gemini_embedding(question)
+    if not query_embedding: return []
+
+    # 2. 검색어 확장
+    if not keywords:
+        keywords = expand_search_query(question, ai_keywords=extracted_info.get("search_keywords"))
+    
+    filtered_params, global_params = _search_phase_params(question, extracted_info, keywords, query_embedding, slim)
+    results = _run_search_phases(filtered_params, global_params)
+    return _sort_by_title_match(question, results)
+
+async def search_supabase_async(question: str, extracted_info: dict, keywords: list = [],
+                                query_embedding: Optional[list] = None, slim: bool = False) -> list:
+    """
+    [Upgrade] 키워드 리스트를 SQL에 직접 전달하여 정확도 향상
+    [수정] 동기 버전과 같은 규칙 (확정 카테고리, 제목 매칭 정렬, 미리 계산한 임베딩, 슬림 결과)
+    """
+    # 1. 임베딩 생성 (비동기)
+    if query_embedding is None:
+        query_embedding = await get_gemini_embedding_async(question)
+    if not query_embedding: return []
+
+    # 2. 검색어 확장 (만약 입력된 keywords가 없으면 여기서 생성)
+    if not keywords:
+        keywords = await asyncio.to_thread(expand_search_query, question, extracted_info.get("search_keywords"))
+    
+    filtered_params, global_params = _search_phase_params(question, extracted_info, keywords, query_embedding, slim)
+    results = await _run_search_phases_async(filtered_params, global_params)
+    return _sort_by_title_match(question, results)
 
 # --- 6. 헬퍼 함수들 ---
 
@@ -1951,7 +2816,7 @@ def summarize_content_with_llm(content: str, language: str = "ko") -> str:
 {content}
 
 {lang_name} 번역:"""
-        response = generate_content_safe(client, prompt, timeout=10)
+        response = generate_content_safe(client, prompt, timeout=10, site="gemini.translate_summary")
         return response.text.strip() if hasattr(response, 'text') else str(response)
     except Exception as e:
         print(f"⚠️ 번역 실패: {e}")
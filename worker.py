@@ -1,24 +1,44 @@
 import os
 import json
 import time
+import signal
+import asyncio
+import argparse
 import traceback
 import gc
 import logging
-from typing import List, Dict, Any, Tuple, Optional
+import threading
+import concurrent.futures
+from typing import List, Dict, Any, Tuple, Optional, Callable
 from supabase import create_client
 from dotenv import load_dotenv
+from coalescing import release_inflight, release_inflight_async, detect_answer_language  # [신규] 동일 질문 병합 키 해제
+from pipeline import Stage, Finish, JobTrace, run_stages, run_stages_async  # [신규] 단계 의존성 그래프
+from answer_cache import answer_context  # [신규] 의미 기반 답변 캐시 조건 (언어 + 나이/대상/검색어)
+from supervisor import PreforkSupervisor, HeartbeatPublisher, WORKER_PROCESSES  # [신규] 멀티 프로세스 워커
+from job_queue import JobQueue, QueuedJob  # [신규] 작업 큐 백엔드 (list / stream)
+from job_results import store_result, store_result_async  # [신규] 작업별 결과 키 (TTL + 압축)
 
 # 기본 utils 임포트
 try:
     from utils import (
         search_supabase,       
+        search_supabase_async,
         expand_search_query,   
+        get_gemini_embedding,
+        get_gemini_embedding_async,
         rerank_search_results, 
         format_search_results, 
+        hydrate_display_results,
+        SEARCH_SLIM,
         get_llm_client,
         generate_content_safe,
         summarize_content_with_llm,  # [추가] 다국어 번역에 필요
+        NOTION_RETRY,
+        SEARCH_INDEX,
+        ANSWER_CACHE,
         redis_client,
+        redis_async_client,
         supabase,
         notion
     )
@@ -28,12 +48,21 @@ except ImportError as e:
     # Vercel에서는 sys.exit() 대신 에러를 기록하고 계속 진행
     logger.error(f"Utils import failed: {e}")
     search_supabase = None
+    search_supabase_async = None
     expand_search_query = None
+    get_gemini_embedding = None
+    get_gemini_embedding_async = None
     rerank_search_results = None
     format_search_results = None
+    hydrate_display_results = None
+    SEARCH_SLIM = False
     get_llm_client = None
     generate_content_safe = None
+    NOTION_RETRY = None
+    SEARCH_INDEX = None
+    ANSWER_CACHE = None
     redis_client = None
+    redis_async_client = None
     supabase = None
     notion = None
 
@@ -49,8 +78,7 @@ load_dotenv()
 
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY")
-JOB_QUEUE_KEY = "chatbot:job_queue"
-JOB_RESULTS_KEY = "chatbot:job_results"
+JOB_QUEUE = JobQueue()  # [수정] BLPOP 직접 호출 대신 (JOB_QUEUE_BACKEND=stream이면 ack/회수/DLQ)
 NOTION_LOG_DB_ID = "2bf8ade502108000b6d6f4ad4d4d52b2"
 
 logger.info("[Worker] 클라이언트 초기화 중...")
@@ -124,7 +152,7 @@ def translate_titles_batch(titles: List[str], target_lang_code: str) -> List[str
     
     try:
         # 타임아웃 40초 (내용이 좀 더 많으므로)
-        response = generate_content_safe(client, prompt, timeout=40)
+        response = generate_content_safe(client, prompt, timeout=40, site="gemini.translate_titles")
         
         # [수정] 응답 객체 처리 방식 통일
         if hasattr(response, 'text'):
@@ -151,17 +179,85 @@ def translate_titles_batch(titles: List[str], target_lang_code: str) -> List[str
         return titles
 
 # --- 메인 처리 함수 ---
-def process_job(job_data: Dict[str, Any]) -> Tuple[str, List[str], int]:
-    start_time = time.time()
-    question = job_data.get("question", "")
-    ai_category = job_data.get("ai_category")
+def _dedupe_results(raw_results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    seen_ids = set()
+    unique_results = []
+    for doc in raw_results:
+        meta = doc.get("metadata", {})
+        pid = meta.get("page_id") or meta.get("page_url") or meta.get("title")
+        if pid and pid not in seen_ids:
+            seen_ids.add(pid)
+            unique_results.append(doc)
+    return unique_results
 
-    logger.info(f"▶️ 작업 시작: {question}")
+def _translate_display_results(display_results: List[Dict[str, Any]], target_lang_code: str, ui_text: dict):
+    """[다국어 번역 적용] 본문 + 카테고리 + ★제목(Batch)★"""
+    logger.info(f"🌍 [Worker] 언어 감지: {target_lang_code} -> 내용/제목/UI 번역 시작")
+    
+    # 1. 제목 번역 (Pre-translated 확인 -> 없으면 Batch)
+    docs_needing_title = []
+    for i, doc in enumerate(display_results):
+        meta = doc.get("metadata", {})
+        # DB에 저장된 번역이 있는지 확인
+        pre_title = meta.get(f"title_{target_lang_code}")
+        if pre_title:
+            doc["metadata"]["title"] = pre_title
+        else:
+            docs_needing_title.append((i, meta.get("title", "")))
 
-    try:
-        # [Step 1] 키워드 추출
+    # 필요한 것만 Batch 번역
+    if docs_needing_title:
+        titles_to_translate = [t[1] for t in docs_needing_title]
+        translated_titles = translate_titles_batch(titles_to_translate, target_lang_code)
+        for (idx, _), new_title in zip(docs_needing_title, translated_titles):
+            display_results[idx]["metadata"]["title"] = new_title
+    
+    # 2. 본문 및 카테고리 번역
+    for i, doc in enumerate(display_results):
+        meta = doc.get("metadata", {})
+        original_summary = meta.get("pre_summary", "")
+        original_category = meta.get("category", "기타")
+        
+        # 카테고리 이름 번역 (사전 매핑)
+        translated_cat = ui_text["cats"].get(original_category, original_category)
+        doc["metadata"]["category"] = translated_cat
+
+        # 본문 번역 (Pre-translated 확인 -> 없으면 Realtime)
+        pre_summary_key = f"pre_summary_{target_lang_code}"
+        pre_summary_val = meta.get(pre_summary_key)
+
+        if pre_summary_val:
+            doc["metadata"]["pre_summary"] = pre_summary_val
+        else:
+            # Fallback: 실시간 번역
+            try:
+                translated_summary = summarize_content_with_llm(
+                    content=original_summary,  
+                    language=target_lang_code
+                )
+                doc["metadata"]["pre_summary"] = translated_summary
+            except Exception as e:
+                logger.warning(f"   ⚠️ 본문 실시간 번역 실패: {e}")
+
+def build_job_stages(question: str, extracted_info: Dict[str, Any], use_async: bool = False) -> List[Stage]:
+    """
+    [신규] process_job 단계 그래프
+    - 임베딩 / 키워드 확장 / 언어 감지는 서로 무관하므로 동시에 시작
+    - 검색은 임베딩과 키워드가 모두 준비되는 즉시 시작
+    - [신규] 임베딩 직후 의미 기반 답변 캐시 확인 → 적중하면 검색/랭킹/번역 없이 종료
+    - [신규] use_async: 임베딩/검색은 utils의 비동기 클라이언트로 (비동기 워커, run_stages_async 전용)
+    """
+    def embed(_):
+        try:
+            return get_gemini_embedding(question)
+        except Exception as e:
+            logger.error(f"❌ 임베딩 생성 실패: {e}")
+            return None
+
+    def expand(_):
+        # [Step 1] 키워드 추출 (search_keywords가 있으면 LLM 재호출 없이 규칙 후처리만)
         try:
-            target_keywords = expand_search_query(question)
+            target_keywords = expand_search_query(question, ai_keywords=extracted_info.get("search_keywords"))
         except Exception as e:
             logger.error(f"❌ 키워드 확장 실패: {e}")
             target_keywords = []
@@ -171,105 +267,65 @@ def process_job(job_data: Dict[str, Any]) -> Tuple[str, List[str], int]:
             if len(word) > 1 and word not in target_keywords:
                 target_keywords.append(word)
         logger.info(f"🗝️ [검색 키워드] {target_keywords}")
+        return target_keywords
+
+    def lang(_):
+        return detect_answer_language(question)
+
+    def cache(inputs):
+        if ANSWER_CACHE is None or not inputs["embed"]:
+            return None
+        context = answer_context(inputs["lang"], extracted_info)
+        hit = ANSWER_CACHE.lookup(inputs["embed"], context)
+        if hit is None:
+            return None
+        logger.info(f"♻️ [Answer Cache] 의미가 같은 질문의 답변 재사용 (유사도 {hit['similarity']:.3f}: {hit['question']})")
+        return Finish((hit["answer"], hit["page_ids"], len(hit["page_ids"])))
 
-        # [Step 2] 검색
-        extracted_info_mock = {"category": ai_category}
+    def retrieve(inputs):
+        # [Step 2] 검색 + [Step 3] 중복 제거 (None = 검색 오류)
         try:
-            raw_results = search_supabase(question, extracted_info_mock, keywords=target_keywords)
+            # 임베딩 실패 시 빈 리스트를 넘겨 검색 안에서 다시 생성하지 않음 (기존과 같이 결과 없음 처리)
+            raw_results = search_supabase(question, extracted_info, keywords=inputs["expand"],
+                                          query_embedding=inputs["embed"] or [], slim=SEARCH_SLIM)
         except Exception as e:
             logger.error(f"❌ Supabase 검색 실패: {type(e).__name__}: {e}")
             traceback.print_exc()  # 전체 스택 트레이스 출력
-            return f"시스템 오류가 발생했습니다. 잠시 후 다시 시도해주세요. 😥", [], 0
-
-        if not raw_results: 
-            return "관련 정보를 찾지 못했습니다. 😥", [], 0
-
-        # [Step 3] 중복 제거
-        seen_ids = set()
-        unique_results = []
-        for doc in raw_results:
-            meta = doc.get("metadata", {})
-            pid = meta.get("page_id") or meta.get("page_url") or meta.get("title")
-            if pid and pid not in seen_ids:
-                seen_ids.add(pid)
-                unique_results.append(doc)
-        candidates = unique_results
+            return None
+        return _dedupe_results(raw_results or [])
 
+    def rerank(inputs):
         # [Step 4] AI 랭킹
-        logger.info(f"🤖 Gemini에게 {len(candidates)}개 문서의 랭킹을 요청합니다.")
+        candidates = inputs["retrieve"]
+        if not candidates:
+            return candidates
+        logger.info(f"🤖 {len(candidates)}개 문서 랭킹 (로컬 점수 우선, 애매하면 Gemini)")
         try:
-            reranked_results = rerank_search_results(question, candidates)
+            reranked_results = rerank_search_results(question, candidates, extracted_info)
             if not reranked_results:
-                logger.warning("⚠️ AI 랭킹 결과 없음 -> 검색 엔진(SQL) 순서 사용")
+                logger.warning("⚠️ 랭킹 결과 없음 -> 검색 엔진(SQL) 순서 사용")
                 reranked_results = candidates
         except Exception as e:
             logger.error(f"❌ AI 랭킹 중 오류: {e}")
             reranked_results = candidates
+        return reranked_results
 
+    def assemble(inputs):
         # [Step 5] 최종 결과 조립
+        reranked_results = inputs["rerank"]
+        if reranked_results is None:
+            return f"시스템 오류가 발생했습니다. 잠시 후 다시 시도해주세요. 😥", [], 0
+        if not reranked_results: 
+            return "관련 정보를 찾지 못했습니다. 😥", [], 0
+
         display_count = min(len(reranked_results), 2)
-        display_results = reranked_results[:display_count]
-        
-        # 언어 감지 로직
-        target_lang_code = "ko" 
-        if "strictly in English" in question: target_lang_code = "en"
-        elif "strictly in Vietnamese" in question: target_lang_code = "vi"
-        elif "strictly in Chinese" in question: target_lang_code = "zh"
+        target_lang_code = inputs["lang"]
+        # [신규] 화면에 나갈 결과만 표시용 메타데이터(요청 언어 필드만) 조회 → 복사본이라 번역이 인덱스를 덮어쓰지 않음
+        display_results = hydrate_display_results(reranked_results[:display_count], target_lang_code)
         
         ui_text = UI_TRANSLATIONS.get(target_lang_code, UI_TRANSLATIONS["ko"])
-
-        # ==================================================================
-        # [다국어 번역 적용] 본문 + 카테고리 + ★제목(Batch)★
-        # ==================================================================
         if target_lang_code != "ko":
-            logger.info(f"🌍 [Worker] 언어 감지: {target_lang_code} -> 내용/제목/UI 번역 시작")
-            
-            # 1. 제목 번역 (Pre-translated 확인 -> 없으면 Batch)
-            docs_needing_title = []
-            for i, doc in enumerate(display_results):
-                meta = doc.get("metadata", {})
-                # DB에 저장된 번역이 있는지 확인
-                pre_title = meta.get(f"title_{target_lang_code}")
-                if pre_title:
-                    doc["metadata"]["title"] = pre_title
-                else:
-                    docs_needing_title.append((i, meta.get("title", "")))
-
-            # 필요한 것만 Batch 번역
-            if docs_needing_title:
-                titles_to_translate = [t[1] for t in docs_needing_title]
-                translated_titles = translate_titles_batch(titles_to_translate, target_lang_code)
-                for (idx, _), new_title in zip(docs_needing_title, translated_titles):
-                    display_results[idx]["metadata"]["title"] = new_title
-            
-            # 2. 본문 및 카테고리 번역
-            for i, doc in enumerate(display_results):
-                meta = doc.get("metadata", {})
-                original_summary = meta.get("pre_summary", "")
-                original_category = meta.get("category", "기타")
-                
-                # 카테고리 이름 번역 (사전 매핑)
-                translated_cat = ui_text["cats"].get(original_category, original_category)
-                doc["metadata"]["category"] = translated_cat
-
-                # 본문 번역 (Pre-translated 확인 -> 없으면 Realtime)
-                pre_summary_key = f"pre_summary_{target_lang_code}"
-                pre_summary_val = meta.get(pre_summary_key)
-
-                if pre_summary_val:
-                    doc["metadata"]["pre_summary"] = pre_summary_val
-                    # logger.debug(f"   ⚡️ [Pre-translated] Summary Used")
-                else:
-                    # Fallback: 실시간 번역
-                    try:
-                        translated_summary = summarize_content_with_llm(
-                            content=original_summary,  
-                            language=target_lang_code
-                        )
-                        doc["metadata"]["pre_summary"] = translated_summary
-                    except Exception as e:
-                        logger.warning(f"   ⚠️ 본문 실시간 번역 실패: {e}")
-        # ==================================================================
+            _translate_display_results(display_results, target_lang_code, ui_text)
 
         all_page_ids = [r.get("metadata", {}).get("page_id") for r in reranked_results]
         
@@ -285,75 +341,405 @@ def process_job(job_data: Dict[str, Any]) -> Tuple[str, List[str], int]:
 
         if len(reranked_results) > display_count:
             final_answer += f"<hr>{ui_text['footer_more']}"
+        return final_answer, all_page_ids, len(all_page_ids)
 
-        elapsed = time.time() - start_time
-        logger.info(f"✅ 답변 조립 완료 (소요시간: {elapsed:.2f}초)")
-        
-        # 로그 저장 (비동기적으로 실패해도 메인 로직 영향 없도록 함)
-        if notion and NOTION_LOG_DB_ID:
-            try:
-                final_category = ai_category if ai_category else "미분류"
-                notion.pages.create(
+    async def embed_async(_):
+        try:
+            return await get_gemini_embedding_async(question)
+        except Exception as e:
+            logger.error(f"❌ 임베딩 생성 실패: {e}")
+            return None
+
+    async def retrieve_async(inputs):
+        try:
+            raw_results = await search_supabase_async(question, extracted_info, keywords=inputs["expand"],
+                                                      query_embedding=inputs["embed"] or [], slim=SEARCH_SLIM)
+        except Exception as e:
+            logger.error(f"❌ Supabase 검색 실패: {type(e).__name__}: {e}")
+            traceback.print_exc()
+            return None
+        return _dedupe_results(raw_results or [])
+
+    if use_async:
+        embed, retrieve = embed_async, retrieve_async
+
+    return [
+        Stage("embed", embed),
+        Stage("expand", expand),
+        Stage("lang", lang),
+        Stage("cache", cache, deps=("embed", "lang")),
+        Stage("retrieve", retrieve, deps=("embed", "expand", "cache")),
+        Stage("rerank", rerank, deps=("retrieve",)),
+        Stage("assemble", assemble, deps=("rerank", "lang")),
+    ]
+
+def _finish_job(question: str, ai_category: Optional[str], extracted_info: Dict[str, Any],
+                results: Dict[str, Any], trace: JobTrace, start_time: float) -> Tuple[str, List[str], int]:
+    """단계 결과 → (답변, page_ids, 개수) + 답변 캐시 저장 + Notion 질문 로그 (동기/비동기 공통)"""
+    final_answer, all_page_ids, total_found = results[trace.finished_by or "assemble"]
+    target_keywords = results.get("expand") or []
+
+    # [신규] 새로 만든 답변은 의미 기반 캐시에 저장 (오류/결과 없음 답변은 제외)
+    if ANSWER_CACHE is not None and not trace.finished_by and total_found and results.get("embed"):
+        ANSWER_CACHE.put(results["embed"], answer_context(results["lang"], extracted_info),
+                         question, final_answer, all_page_ids)
+
+    elapsed = time.time() - start_time
+    logger.info(f"✅ 답변 조립 완료 (소요시간: {elapsed:.2f}초)")
+    logger.info(f"⏱️ [Trace] {trace.summary()}")
+    if not total_found:
+        return final_answer, all_page_ids, total_found
+    
+    # 로그 저장 (비동기적으로 실패해도 메인 로직 영향 없도록 함)
+    if notion and NOTION_LOG_DB_ID:
+        try:
+            final_category = ai_category if ai_category else "미분류"
+            NOTION_RETRY.call(
+                lambda: notion.pages.create(
                     parent={"database_id": NOTION_LOG_DB_ID},
                     properties={
                         "질문": {"title": [{"text": {"content": question}}]},
                         "카테고리": {"select": {"name": final_category}},
                         "키워드": {"multi_select": [{"name": k} for k in target_keywords[:5]]}
                     }
-                )
-            except Exception as e:
-                logger.warning(f"⚠️ Notion 로그 저장 실패: {e}")
-                
-        return final_answer, all_page_ids, len(all_page_ids)
+                ),
+                site="notion.query_log"
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Notion 로그 저장 실패: {e}")
+            
+    return final_answer, all_page_ids, total_found
 
+_JOB_FAILED_ANSWER = ("죄송합니다. 오류가 발생하여 답변을 드릴 수 없습니다. 😥", [], 0)
+
+def _job_inputs(job_data: Dict[str, Any]) -> Tuple[str, Optional[str], Dict[str, Any]]:
+    question = job_data.get("question", "")
+    ai_category = job_data.get("ai_category")
+    # [수정] API의 의도 추출 결과 재사용 (구버전 job에는 없을 수 있음)
+    extracted_info = dict(job_data.get("extracted_info") or {})
+    extracted_info.setdefault("category", ai_category)
+    return question, ai_category, extracted_info
+
+def process_job(job_data: Dict[str, Any]) -> Tuple[str, List[str], int]:
+    start_time = time.time()
+    question, ai_category, extracted_info = _job_inputs(job_data)
+    logger.info(f"▶️ 작업 시작: {question}")
+
+    # [신규] 단계별 시작/종료 시각 (작업 결과의 "trace"로 저장)
+    trace = JobTrace()
+    try:
+        results = run_stages(build_job_stages(question, extracted_info), trace)
+        return _finish_job(question, ai_category, extracted_info, results, trace, start_time)
     except Exception as e:
         logger.error(f"🔥 작업 처리 중 치명적 오류: {e}")
         traceback.print_exc()
-        return "죄송합니다. 오류가 발생하여 답변을 드릴 수 없습니다. 😥", [], 0
+        return _JOB_FAILED_ANSWER
+    finally:
+        job_data["trace"] = trace.to_dict()
+
+async def process_job_async(job_data: Dict[str, Any]) -> Tuple[str, List[str], int]:
+    """[신규] 비동기 워커용 process_job (같은 단계 그래프, 임베딩/검색은 비동기 클라이언트)"""
+    start_time = time.time()
+    question, ai_category, extracted_info = _job_inputs(job_data)
+    logger.info(f"▶️ 작업 시작: {question}")
+
+    trace = JobTrace()
+    try:
+        results = await run_stages_async(build_job_stages(question, extracted_info, use_async=True), trace)
+        # 답변 캐시 저장 / Notion 로그는 동기 I/O이므로 스레드에서
+        return await asyncio.to_thread(_finish_job, question, ai_category, extracted_info, results, trace, start_time)
+    except Exception as e:
+        logger.error(f"🔥 작업 처리 중 치명적 오류: {e}")
+        traceback.print_exc()
+        return _JOB_FAILED_ANSWER
+    finally:
+        job_data["trace"] = trace.to_dict()
+
+def _job_timing(job_data: Dict[str, Any], picked_at: float) -> Dict[str, Any]:
+    """[신규] 작업별 대기/처리 시간 (enqueued_at은 API가 넣음, 구버전 job에는 없음)"""
+    enqueued_at = job_data.get("enqueued_at")
+    timing = {"process_ms": round((time.time() - picked_at) * 1000, 1)}
+    if enqueued_at:
+        timing["queue_ms"] = round((picked_at - enqueued_at) * 1000, 1)
+    return timing
+
+def _build_result(job_data: Dict[str, Any], answer: Tuple[str, List[str], int], timing: Dict[str, Any]) -> dict:
+    answer_text, all_ids, total_found = answer
+    return {
+        "status": "complete",
+        "answer": answer_text,
+        "last_result_ids": all_ids, 
+        "total_found": total_found,
+        "trace": job_data.get("trace"),  # [신규] 단계별 시작/종료 시각
+        "timing": timing                 # [신규] 큐 대기 / 처리 시간
+    }
+
+def _log_job_done(job_data: Dict[str, Any], timing: Dict[str, Any], in_flight: int = 1):
+    queue = f"대기 {timing['queue_ms']:.0f}ms / " if "queue_ms" in timing else ""
+    logger.info(f"💾 완료: {job_data.get('question')} ({queue}처리 {timing['process_ms']:.0f}ms, 동시 {in_flight}건)")
+
+# [신규] 워커 실행 통계 (완료/실패 건수, 동시 처리 수, 처리 시간 합계, 마지막 루프 시각)
+_runtime_stats = {"jobs": 0, "failed": 0, "in_flight": 0, "max_in_flight": 0, "process_ms": 0.0, "queue_ms": 0.0,
+                  "loop_at": None}
+_runtime_lock = threading.Lock()
+
+def _tick(heartbeat: Optional[Callable[[], None]] = None):
+    """[신규] 워커 루프가 살아 있음을 기록 (관리 프로세스의 멈춤 감지 + Redis 하트비트)"""
+    _runtime_stats["loop_at"] = round(time.time(), 1)
+    if heartbeat is not None:
+        heartbeat()
+
+def _record_job(timing: Dict[str, Any], ok: bool = True):
+    with _runtime_lock:
+        _runtime_stats["jobs"] += 1
+        _runtime_stats["failed"] += 0 if ok else 1
+        _runtime_stats["process_ms"] += timing["process_ms"]
+        _runtime_stats["queue_ms"] += timing.get("queue_ms", 0.0)
+
+def _track_in_flight(delta: int) -> int:
+    with _runtime_lock:
+        _runtime_stats["in_flight"] += delta
+        _runtime_stats["max_in_flight"] = max(_runtime_stats["max_in_flight"], _runtime_stats["in_flight"])
+        return _runtime_stats["in_flight"]
+
+def get_worker_runtime_stats() -> dict:
+    with _runtime_lock:
+        stats = dict(_runtime_stats)
+    jobs, process_ms, queue_ms = stats["jobs"], stats.pop("process_ms"), stats.pop("queue_ms")
+    stats["avg_process_ms"] = round(process_ms / jobs, 1) if jobs else 0.0
+    stats["avg_queue_ms"] = round(queue_ms / jobs, 1) if jobs else 0.0
+    return stats
+
+# --- [신규] 큐에서 꺼낸 작업 처리 (결과 저장 → 병합 키 해제 → ack 순서) ---
+_DEAD_LETTER_MESSAGE = "요청을 처리하지 못했습니다. 잠시 후 다시 질문해 주세요."
+
+def _parse_job(job: QueuedJob) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """(job_data, 처리 불가 사유). 사유가 있으면 DLQ로 보냄"""
+    if job.payload is None:
+        return None, "스트림에서 삭제된 메시지"
+    try:
+        job_data = json.loads(job.payload.decode('utf-8'))
+    except ValueError as e:
+        return None, f"잘못된 작업 형식: {e}"
+    if job.deliveries > JOB_QUEUE.max_deliveries:
+        # 처리 도중 워커가 계속 죽는 작업 (OOM 등) → 다시 시도하지 않음
+        return job_data, f"배달 {job.deliveries}회 (최대 {JOB_QUEUE.max_deliveries}회) 초과"
+    if job.deliveries > 1:
+        logger.warning(f"♻️ 회수된 작업 재처리: {job_data.get('job_id')} (배달 {job.deliveries}회)")
+    return job_data, None
+
+def _save_result(job_data: Dict[str, Any], final_result: dict):
+    job_id = job_data.get("job_id")
+    # [수정] 하나의 해시(chatbot:job_results)에 무기한 쌓지 않고 작업별 키에 TTL과 함께 저장
+    store_result(redis_client, job_id, final_result)
+    # [신규] 결과 저장 후 병합 키 해제 (합류한 요청들은 같은 job_id로 결과를 받아감)
+    release_inflight(redis_client, job_data.get("coalesce_key"), job_id)
+
+async def _save_result_async(redis_conn, job_data: Dict[str, Any], final_result: dict):
+    job_id = job_data.get("job_id")
+    await store_result_async(redis_conn, job_id, final_result)
+    await release_inflight_async(redis_conn, job_data.get("coalesce_key"), job_id)
+
+def _handle_job(job: QueuedJob):
+    job_data, poison = _parse_job(job)
+    if poison:
+        logger.error(f"☠️ 작업을 DLQ로 이동: {poison}")
+        if job_data and job_data.get("job_id"):
+            # 사용자가 시간 초과까지 기다리지 않도록 오류 결과 저장
+            _save_result(job_data, {"status": "error", "message": _DEAD_LETTER_MESSAGE})
+        JOB_QUEUE.dead_letter(redis_client, job, poison)
+        _record_job({"process_ms": 0.0}, ok=False)
+        return
+
+    picked_at = time.time()
+    answer = process_job(job_data)
+    timing = _job_timing(job_data, picked_at)
+    _save_result(job_data, _build_result(job_data, answer, timing))
+    # [신규] 결과가 저장된 뒤에만 ack (그 전에 워커가 죽으면 다른 워커가 회수)
+    JOB_QUEUE.ack(redis_client, job)
+
+    _log_job_done(job_data, timing)
+    _record_job(timing, ok=answer is not _JOB_FAILED_ANSWER)
 
 # --- 메인 루프 ---
-def start_worker():
+def start_worker(stop_event: Optional[threading.Event] = None, heartbeat: Optional[Callable[[], None]] = None):
+    """
+    동기 워커: 작업 1건씩 처리
+    [수정] stop_event가 설정되면 처리 중인 작업을 마치고 종료 (SIGTERM)
+    [수정] heartbeat: 큐 대기(1초)마다 호출 → 작업 1건이 WORKER_STUCK_SECONDS보다 오래 걸리면 멈춘 것으로 판단됨
+    [수정] stream 큐: 처리 중인 작업의 임대는 백그라운드 스레드가 연장 (오래 걸리는 작업이 회수되지 않도록)
+    """
+    stop_event = stop_event or threading.Event()
     logger.info(f"🚀 Worker 가동! (PID: {os.getpid()})")
+
+    # [신규] 로컬 검색 인덱스 적재 (실패해도 Supabase RPC로 검색 가능)
+    if SEARCH_INDEX is not None:
+        SEARCH_INDEX.load()
     
     # Redis 연결 재시도 로직
-    while True:
+    while not stop_event.is_set():
+        _tick(heartbeat)
         try:
             if redis_client.ping():
                 break
         except Exception:
             logger.warning("⏳ Redis 연결 대기 중...")
             time.sleep(2)
+    JOB_QUEUE.start_renewer(redis_client)
             
-    while True:
+    while not stop_event.is_set():
+        _tick(heartbeat)
         try:
             # 타임아웃 1초로 설정하여 주기적으로 루프 탈출 (종료 시그널 처리 등 가능)
-            result = redis_client.blpop(JOB_QUEUE_KEY, timeout=1)
-            if result:
-                _, job_json = result
-                job_data = json.loads(job_json.decode('utf-8'))
-                
-                answer_text, all_ids, total_found = process_job(job_data)
-
-                final_result = {
-                    "status": "complete",
-                    "answer": answer_text,
-                    "last_result_ids": all_ids, 
-                    "total_found": total_found 
-                }
-                
-                # 결과 저장 시 만료 시간(TTL) 설정 권장 (예: 1시간)
-                job_id = job_data.get("job_id")
-                redis_client.hset(JOB_RESULTS_KEY, job_id, json.dumps(final_result).encode('utf-8'))
-                # redis_client.expire(f"job:{job_id}", 3600) # (선택사항)
-                
-                logger.info(f"💾 완료: {job_data.get('question')}")
-
-                del job_data, answer_text, final_result
+            job = JOB_QUEUE.pop(redis_client, timeout=1)
+            if job:
+                try:
+                    _handle_job(job)
+                finally:
+                    JOB_QUEUE.release(job)  # 실패해 ack하지 못한 작업은 연장을 멈춰 다른 워커가 회수
+                del job
                 gc.collect()
 
         except Exception as e:
             logger.error(f"🔥 Worker Loop Error: {e}")
             time.sleep(1)
+    logger.info(f"👋 Worker 종료 (PID: {os.getpid()}, {get_worker_runtime_stats()})")
+
+# --- [신규] 비동기 워커 (작업 N건 동시 처리) ---
+# 작업 1건은 대부분 LLM/Supabase/Notion 응답을 기다리는 시간이므로, 한 프로세스에서 여러 작업을 동시에 진행
+WORKER_CONCURRENCY = int(os.getenv("WORKER_CONCURRENCY", "8"))
+# 종료 신호 후 처리 중인 작업을 기다리는 최대 시간 (초)
+WORKER_SHUTDOWN_GRACE_SECONDS = float(os.getenv("WORKER_SHUTDOWN_GRACE_SECONDS", "60"))
+
+async def _handle_job_async(redis_conn, job: QueuedJob):
+    picked_at = time.time()
+    in_flight = _track_in_flight(+1)
+    try:
+        job_data, poison = _parse_job(job)
+        if poison:
+            logger.error(f"☠️ 작업을 DLQ로 이동: {poison}")
+            if job_data and job_data.get("job_id"):
+                await _save_result_async(redis_conn, job_data, {"status": "error", "message": _DEAD_LETTER_MESSAGE})
+            await JOB_QUEUE.dead_letter_async(redis_conn, job, poison)
+            _record_job({"process_ms": 0.0}, ok=False)
+            return
+        answer = await process_job_async(job_data)
+        timing = _job_timing(job_data, picked_at)
+        await _save_result_async(redis_conn, job_data, _build_result(job_data, answer, timing))
+        await JOB_QUEUE.ack_async(redis_conn, job)
+        _log_job_done(job_data, timing, in_flight)
+        _record_job(timing, ok=answer is not _JOB_FAILED_ANSWER)
+    except Exception as e:
+        # ack하지 않음 → stream 모드면 가시성 시간 후 다른 워커가 회수
+        logger.error(f"🔥 작업 결과 저장 실패: {e}")
+        traceback.print_exc()
+    finally:
+        JOB_QUEUE.release(job)
+        _track_in_flight(-1)
+
+async def _tick_loop(redis_conn, heartbeat: Optional[Callable[[], None]]):
+    # 이벤트 루프가 막히면(동기 호출이 루프를 점유) 하트비트가 끊김
+    # [수정] 종료 대기 중에도 계속 실행 (처리 중인 작업의 임대 연장), 워커 종료 시 취소됨
+    while True:
+        _tick(heartbeat)
+        try:
+            await JOB_QUEUE.renew_async(redis_conn)
+        except Exception as e:
+            logger.warning(f"⚠️ 작업 임대 연장 실패: {e}")
+        await asyncio.sleep(1)
+
+async def start_worker_async(concurrency: int = WORKER_CONCURRENCY, stop_event: Optional[asyncio.Event] = None,
+                             redis_conn=None, heartbeat: Optional[Callable[[], None]] = None):
+    """
+    [신규] 비동기 워커: 세마포어로 동시 처리 작업을 concurrency건으로 제한
+    - 빈 슬롯이 생겨야 큐에서 꺼냄 (꺼낸 작업이 프로세스 안에서 대기하지 않고, 나머지는 다른 워커가 가져감)
+    - SIGTERM/SIGINT: 새 작업을 꺼내지 않고 처리 중인 작업을 WORKER_SHUTDOWN_GRACE_SECONDS까지 기다린 뒤 종료
+    - heartbeat: 이벤트 루프에서 1초마다 호출 (같은 주기로 stream 작업 임대 연장)
+    """
+    redis_conn = redis_conn or redis_async_client
+    stop_event = stop_event or asyncio.Event()
+    loop = asyncio.get_running_loop()
+    # 동기 단계(키워드 확장/랭킹/번역/Notion)는 asyncio.to_thread로 실행 → 작업당 최대 3단계 동시
+    loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=concurrency * 4, thread_name_prefix="job"))
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        try:
+            loop.add_signal_handler(sig, stop_event.set)
+        except (NotImplementedError, RuntimeError, ValueError):
+            pass  # 메인 스레드가 아니거나 지원하지 않는 플랫폼
+
+    logger.info(f"🚀 Async Worker 가동! (PID: {os.getpid()}, 동시 처리 {concurrency}건)")
+    if SEARCH_INDEX is not None:
+        await asyncio.to_thread(SEARCH_INDEX.load)
+
+    slots = asyncio.Semaphore(concurrency)
+    tasks = set()
+    ticker = asyncio.create_task(_tick_loop(redis_conn, heartbeat))
+
+    def _done(task: asyncio.Task):
+        tasks.discard(task)
+        slots.release()
+
+    while not stop_event.is_set():
+        await slots.acquire()
+        try:
+            # 타임아웃 1초: 종료 신호를 주기적으로 확인
+            job = await JOB_QUEUE.pop_async(redis_conn, timeout=1)
+        except Exception as e:
+            slots.release()
+            logger.error(f"🔥 Worker Loop Error: {e}")
+            await asyncio.sleep(1)
+            continue
+        if not job:
+            slots.release()
+            continue
+        task = asyncio.create_task(_handle_job_async(redis_conn, job))
+        tasks.add(task)
+        task.add_done_callback(_done)
+
+    if tasks:
+        logger.info(f"⏳ 종료 대기: 처리 중인 작업 {len(tasks)}건 (최대 {WORKER_SHUTDOWN_GRACE_SECONDS:.0f}초)")
+        _, pending = await asyncio.wait(tasks, timeout=WORKER_SHUTDOWN_GRACE_SECONDS)
+        for task in pending:
+            task.cancel()
+        if pending:
+            logger.warning(f"⚠️ 종료 시간 초과로 작업 {len(pending)}건 중단")
+    ticker.cancel()
+    logger.info(f"👋 Async Worker 종료 (PID: {os.getpid()}, {get_worker_runtime_stats()})")
+
+def _run_sync_with_signals(heartbeat: Optional[Callable[[], None]] = None):
+    stop_event = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop_event.set())
+    start_worker(stop_event, heartbeat)
+
+def run_worker(args, slot: int = 0, generation: int = 0, heartbeat: Optional[Callable[[], None]] = None):
+    """[신규] 워커 1개 실행 + Redis 하트비트 기록 (단독 실행 / 관리 프로세스의 자식 공통)"""
+    publisher = HeartbeatPublisher(redis_client, get_worker_runtime_stats, {
+        "mode": args.mode, "concurrency": args.concurrency if args.mode == "async" else 1,
+        "slot": slot, "generation": generation,
+    })
+    publisher.start()
+    try:
+        if args.mode == "async":
+            asyncio.run(start_worker_async(args.concurrency, heartbeat=heartbeat))
+        else:
+            _run_sync_with_signals(heartbeat)
+    finally:
+        publisher.stop()
+
+def parse_worker_args(argv=None):
+    parser = argparse.ArgumentParser(description="챗봇 작업 워커")
+    parser.add_argument("--mode", choices=["sync", "async"], default=os.getenv("WORKER_MODE", "sync"),
+                        help="sync: 작업 1건씩 / async: 작업 여러 건 동시 처리")
+    parser.add_argument("--concurrency", type=int, default=WORKER_CONCURRENCY, help="async 모드의 동시 처리 작업 수")
+    parser.add_argument("--processes", type=int, default=WORKER_PROCESSES,
+                        help="2 이상이면 관리 프로세스가 워커를 fork하고 멈춤/비정상 종료 시 재시작")
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
-    start_worker()
\ No newline at end of file
+    args = parse_worker_args()
+    if args.processes > 1:
+        PreforkSupervisor(lambda slot, generation, heartbeat: run_worker(args, slot, generation, heartbeat),
+                          args.processes, shutdown_grace=WORKER_SHUTDOWN_GRACE_SECONDS).run()
+    else:
+        run_worker(args)